@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务记录内存占用对比：旧版的dict任务（内嵌raw_result）与TaskRecord（原始响应另存）
+
+用法: python bench_task_memory.py [任务数量]
+"""
+
+import sys
+import json
+import tracemalloc
+from datetime import datetime
+
+from sora import TaskRecord
+
+
+def sample_task(index):
+    """与图生视频任务保存的字段一致的样例数据"""
+    task_id = f"video_{index:08d}_{'a' * 24}"
+    return {
+        'id': task_id,
+        'type': '图生视频',
+        'prompt': f"一只橘猫在窗台上晒太阳，镜头缓慢推进，第{index}号",
+        'image': f"image_{index}.png",
+        'image_path': f"D:/images/image_{index}.png",
+        'image_url': f"https://cdn.example.com/uploads/{index:08d}.png",
+        'model': 'sora-2',
+        'orientation': 'portrait',
+        'size': 'large',
+        'duration': 10,
+        'status': 'completed',
+        'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'video_url': f"https://cdn.example.com/videos/{task_id}.mp4",
+        'error': None,
+        'raw_result': {
+            'id': task_id,
+            'object': 'video',
+            'model': 'sora-2',
+            'status': 'queued',
+            'progress': 0,
+            'created_at': 1760000000 + index,
+            'size': '720x1280',
+            'seconds': '10',
+            'quality': 'standard',
+            'detail': {'input': {'images': [f"https://cdn.example.com/uploads/{index:08d}.png"]}},
+        },
+        'submission_key': f"{index:064x}",
+    }
+
+
+def measure(build, count):
+    """返回build构造count个任务后平均每个任务占用的字节数"""
+    # 与数据库读取时一样，每个任务都从JSON文本解析得到
+    rows = [json.dumps(sample_task(index), ensure_ascii=False) for index in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tasks = [build(json.loads(row)) for row in rows]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del tasks
+    return total / count
+
+
+def compact(task):
+    task.pop('raw_result', None)
+    return TaskRecord(task, 1)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    dict_bytes = measure(lambda task: task, count)
+    record_bytes = measure(compact, count)
+    print(f"任务数量: {count}")
+    print(f"dict任务（内嵌raw_result）: {dict_bytes:,.0f} 字节/任务")
+    print(f"TaskRecord（原始响应另存）: {record_bytes:,.0f} 字节/任务")
+    print(f"减少: {(1 - record_bytes / dict_bytes) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,19 +7,51 @@ import sys
 import os
 import json
 import requests
+from requests.adapters import HTTPAdapter
+import urllib3
+import urllib.parse
 import threading
 import time
+import asyncio
+import functools
+import email.utils
+import random
+import hashlib
+import hmac
+import xml.etree.ElementTree as ET
+import mimetypes
+import heapq
+import itertools
+import queue
+import sqlite3
+import multiprocessing
+import zlib
+import tempfile
+import uuid
+from collections import deque, OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
+import copy
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 
+# 上传前的图片缩放和重新编码需要Pillow，未安装时直接上传原图
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+    ImageOps = None
+
 # 应用版本信息
 APP_VERSION = "v1.0.1"
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, 
                               QHBoxLayout, QLabel, QLineEdit as OriginalLineEdit, QTextEdit as OriginalTextEdit, QPushButton, 
-                              QComboBox, QListWidget, QListWidgetItem, QProgressBar,
+                              QComboBox, QListWidget, QListWidgetItem, QListView, QProgressBar,
                               QFileDialog, QMessageBox, QGroupBox, QScrollArea, QCheckBox,
-                              QSpinBox, QFormLayout, QSplitter, QFrame, QMenu, QAction)
+                              QSpinBox, QFormLayout, QSplitter, QFrame, QMenu, QAction, QDateEdit)
 from PyQt5.QtCore import QCoreApplication
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, pyqtSlot, QMetaObject, Q_ARG, QUrl
+from PyQt5.QtCore import Qt, QObject, QThread, QTimer, QAbstractListModel, QModelIndex, QDate, pyqtSignal, pyqtSlot, QMetaObject, Q_ARG, QUrl
 from PyQt5.QtGui import QFont, QPalette, QColor, QIcon, QPainter, QBrush, QPen
 
 # 现代UI组件样式类
@@ -429,272 +461,3204 @@ def handle_exception(exc_type, exc_value, exc_traceback):
 
 sys.excepthook = handle_exception
 
-class SoraVideoGenerator:
-    def __init__(self, api_key, base_url):
-        self.api_key = api_key
-        self.base_url = base_url.rstrip('/')
-        self.headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Authorization': f'Bearer {api_key}'
+# 配置文件路径
+CONFIG_FILE = 'sora_app_config.json'
+SUBMISSIONS_FILE = 'sora_submissions.jsonl'
+LEGACY_SUBMISSIONS_FILE = 'sora_submissions.json'
+UPLOAD_CACHE_FILE = 'sora_uploads.json'
+IMAGE_CACHE_DIR = 'sora_image_cache'
+TASKS_DB_FILE = 'sora_tasks.db'
+# 已结束的任务状态，这些任务不再自动查询
+TERMINAL_TASK_STATUSES = ('completed', 'failed', 'cancelled', 'canceled', 'error')
+
+# 网络相关的默认配置，可通过配置文件中的"network"字段覆盖
+NETWORK_DEFAULTS = {
+    'pool_connections': 10,  # 缓存的主机连接池数量（API主机、图床主机等）
+    'pool_maxsize': 32,  # 每个主机连接池中保持的最大连接数，应不小于并发工作线程数
+    'pool_block': False,  # 连接池耗尽时是否阻塞等待空闲连接
+    'keep_alive': True,  # 是否启用HTTP keep-alive复用连接
+    'endpoint_cache_ttl': 86400,  # API路径发现缓存的有效期（秒）
+    'async_max_concurrency': 64,  # 异步客户端同时进行中的请求上限
+    'async_limit_per_host': 32,  # 异步客户端对单个主机同时进行中的请求上限
+    # 各类请求的令牌桶限流参数：rate为每秒请求数，burst为允许的突发请求数
+    'rate_limits': {
+        'create': {'rate': 2.0, 'burst': 3},
+        'query': {'rate': 10.0, 'burst': 10},
+        'upload': {'rate': 4.0, 'burst': 4}
+    },
+    'rate_limit_backoff': 5.0,  # 收到429但没有Retry-After头时的暂停秒数
+    'upload_concurrency': 4,  # 表格导入时同时上传的图片数（仍受upload限流）
+    # 重试策略：指数退避+全抖动，max_elapsed为单个请求（含重试）的最长总耗时
+    'retry': {
+        'max_attempts': 4,
+        'base_delay': 0.5,
+        'max_delay': 8.0,
+        'max_elapsed': 60.0
+    },
+    # 熔断器：同一接口连续失败failure_threshold次后，reset_timeout秒内快速失败
+    'circuit_breaker': {
+        'failure_threshold': 5,
+        'reset_timeout': 30.0
+    },
+    # 任务状态轮询：按任务年龄和预计生成时间安排下次查询，已结束的任务不再自动查询
+    'polling': {
+        'min_interval': 10.0,  # 预计即将完成时的查询间隔（秒）
+        'max_interval': 120.0,  # 查询间隔上限（秒）
+        'concurrency': 8,  # 每轮同时进行的查询数
+        # 各模型生成10秒视频的预计耗时（秒），按时长等比例放大
+        'expected_seconds': {'sora-2': 180.0, 'sora-2-pro': 480.0}
+    },
+    # 上传前的图片预处理（需要Pillow）：缩放到目标分辨率、去除元数据、重新编码
+    'image_preprocess': {
+        'enabled': True,
+        'min_bytes': 1024 * 1024,  # 小于该大小的图片直接上传
+        'max_dimension': {'large': 1920, 'small': 1280},  # 按尺寸的长边上限（像素）
+        'format': 'JPEG',  # JPEG或WEBP
+        'quality': 85,
+        'workers': 2  # 预处理进程数
+    },
+    # 图片上传后端，backend为imageproxy（默认图床）、multipart（自定义上传接口）或s3（S3兼容对象存储）
+    # 每个后端有独立的连接池（pool_maxsize）和同时上传数上限（concurrency）
+    'upload_backend': {
+        'backend': 'imageproxy',
+        'imageproxy': {
+            'url': 'https://imageproxy.zhongzhuan.chat/api/upload',
+            'pool_maxsize': 8,
+            'concurrency': 4,
+            'timeout': 120
+        },
+        'multipart': {
+            'url': '',  # 接收multipart/form-data文件上传的地址
+            'field_name': 'file',  # 文件字段名
+            'url_field': 'url',  # 响应JSON中图片URL的字段，嵌套字段用点分隔（如data.url）
+            'headers': {},  # 附加请求头，如认证信息
+            'pool_maxsize': 8,
+            'concurrency': 4,
+            'timeout': 120
+        },
+        's3': {
+            'endpoint': 'http://127.0.0.1:9000',  # S3兼容服务地址（如本地MinIO）
+            'bucket': '',
+            'region': 'us-east-1',
+            'access_key': '',
+            'secret_key': '',
+            'prefix': 'sora/',  # 对象键前缀
+            'public_base_url': '',  # 公开访问的地址前缀，为空时返回预签名的GET地址
+            'presign_expires': 604800,  # 预签名地址有效期（秒），S3最长7天
+            'multipart_threshold': 16 * 1024 * 1024,  # 超过该大小使用分片上传
+            'part_size': 8 * 1024 * 1024,  # 分片大小，S3要求至少5MB
+            'pool_maxsize': 8,
+            'concurrency': 4,
+            'timeout': 120
         }
-        # 图片上传URL（从文档中获取）
-        self.upload_url = "https://imageproxy.zhongzhuan.chat/api/upload"
+    },
+    # 图片上传缓存：按文件内容的SHA-256复用已上传的URL
+    'upload_cache': {
+        'enabled': True,
+        'ttl': 7 * 86400,  # 缓存的URL有效期（秒）
+        'validate': False  # 复用前是否先发HEAD请求确认URL仍可访问
+    },
+    # 视频下载队列：手动下载优先于自动下载，同时下载的数量不超过max_parallel
+    'download': {
+        'max_parallel': 3,
+        'max_retries': 3,  # 连接错误或超时时的最大尝试次数
+        'chunk_size': 256 * 1024,
+        'timeout': [10, 60],  # 连接超时和读取超时（秒）
+        'pool_maxsize': 8
+    },
+    # 提交请求的自适应并发控制参数
+    'adaptive_concurrency': {
+        'initial': 2,  # 初始并发窗口
+        'min': 1,
+        'max': 16,
+        'decrease_factor': 0.5,  # 过载时窗口缩小的倍数
+        'latency_target': 15.0,  # p95延迟超过该秒数时停止扩大窗口
+        'error_rate_threshold': 0.1  # 近期过载比例超过该值时停止扩大窗口
+    }
+}
 
-    def create_video(self, prompt, model="sora-2", orientation="portrait", 
-                    size="large", duration=15, images=None):
-        """创建视频任务"""
-        if images is None:
-            images = []
-        
-        logging.info(f"开始创建视频任务，使用base_url: {self.base_url}")
-        
-        # 确保使用正确的URL格式 - 无论用户输入什么base_url，都提取协议和主机名部分
-        import re
-        url_pattern = re.compile(r'^(https?://[^/]+)')
-        match = url_pattern.match(self.base_url)
-        
-        if match:
-            # 只保留协议和主机名部分，然后构建标准的API路径
-            protocol_host = match.group(1)
-            url = f"{protocol_host}/v1/video/create"
-            logging.info(f"成功提取协议和主机名: {protocol_host}，构建标准API路径: {url}")
+
+def merge_network_config(network_config):
+    """把用户的网络配置合并到默认值上，字典类型的配置项（如rate_limits）按键逐项合并"""
+    merged = json.loads(json.dumps(NETWORK_DEFAULTS))
+    for key, value in (network_config or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            for sub_key, sub_value in value.items():
+                if isinstance(sub_value, dict) and isinstance(merged[key].get(sub_key), dict):
+                    merged[key][sub_key].update(sub_value)
+                else:
+                    merged[key][sub_key] = sub_value
         else:
-            # 如果无法提取，使用已知的正确格式
-            url = "https://api.sora2.email/v1/video/create"  # 硬编码回退URL
-            logging.error(f"无法从base_url提取协议和主机名: {self.base_url}，使用回退URL: {url}")
+            merged[key] = value
+    return merged
 
-        logging.info(f"最终使用的API URL: {url}")
-              
-        # 根据模型类型限制最大时长，但尊重用户选择
-        if model == "sora-2-pro":
-            if size == "large":
-                size = "large"  # sora-2-pro的large是1080p
-            # sora-2-pro最大支持15秒，如果用户选择的时长超过15秒，则限制为15秒
-            if duration > 15:
-                logging.info(f"用户选择的时长{duration}秒超过sora-2-pro支持的最大时长，限制为15秒")
-                duration = 15
-        else:  # sora-2
-            if size == "large":
-                size = "large"  # sora-2的large可能是720p
-            # 注意：API文档中schema描述sora-2只支持10秒，但example中使用了15秒
-            # 这里保留用户选择的时长，让API决定是否接受
-            logging.info(f"sora-2模型使用用户选择的时长: {duration}秒")
-        
-        # 确保duration是整数类型
-        if isinstance(duration, str):
+
+class PooledHttpSession:
+    """共享的HTTP连接池会话
+
+    基于requests.Session，为每个主机维护独立的keep-alive连接池，
+    所有工作线程共用同一个实例，避免每次请求都重新建立TCP+TLS连接。
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=32, pool_block=False, keep_alive=True):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.session = requests.Session()
+        # 重试由上层逻辑控制，这里不让urllib3自动重试
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=0
+        )
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+        self.session.headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        self._lock = threading.Lock()
+        self._request_count = 0
+        logging.info(f"HTTP连接池已创建: 主机池数量={pool_connections}, 每主机最大连接数={pool_maxsize}, keep-alive={keep_alive}")
+
+    def request(self, method, url, **kwargs):
+        """通过共享会话发送请求"""
+        with self._lock:
+            self._request_count += 1
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self):
+        """返回连接复用统计信息
+
+        reused表示复用已有连接完成的请求数，按主机分别统计在hosts中。
+        """
+        hosts = {}
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
             try:
-                duration = int(duration)
-            except ValueError:
-                duration = 10  # 默认10秒
-                logging.error(f"无效的时长值: {duration}, 使用默认值10秒")
-        
-        data = {
-            "model": model,
-            "orientation": orientation,
-            "prompt": prompt,
-            "size": size,
-            "duration": duration,
-            "images": images
+                pool = pools[key]
+            except KeyError:
+                # 连接池可能在遍历期间被淘汰
+                continue
+            host_stats = hosts.setdefault(pool.host, {'requests': 0, 'connections': 0, 'reused': 0})
+            host_stats['requests'] += pool.num_requests
+            host_stats['connections'] += pool.num_connections
+            host_stats['reused'] += max(0, pool.num_requests - pool.num_connections)
+
+        total_requests = sum(h['requests'] for h in hosts.values())
+        total_connections = sum(h['connections'] for h in hosts.values())
+        with self._lock:
+            session_requests = self._request_count
+        return {
+            'session_requests': session_requests,
+            'requests': total_requests,
+            'connections': total_connections,
+            'reused': max(0, total_requests - total_connections),
+            'reuse_ratio': (total_requests - total_connections) / total_requests if total_requests else 0.0,
+            'hosts': hosts
         }
-               
-        logging.info(f"创建视频任务: {model}, {orientation}, {size}, {duration}秒")
+
+    def close(self):
+        """关闭会话并释放所有连接"""
         try:
-            # 优化超时设置，减少单个请求的最大等待时间
-            logging.info(f"准备发送请求到API: {url}")
-            logging.info(f"请求参数: model={model}, orientation={orientation}, size={size}, duration={duration}秒")
-            logging.info(f"请求数据大小: {len(json.dumps(data))} 字节")
-            
-            # 减少超时时间，提高响应性
-            response = requests.post(url, headers=self.headers, json=data, timeout=30)
-            response.raise_for_status()
-                      
-            # 详细记录响应信息
-            logging.info(f"API响应状态码: {response.status_code}")
-            
-            # 检查响应状态码
-            if response.status_code == 404:
-                logging.error(f"404错误 - API路径不存在: {url}")
-                logging.error(f"404响应内容: {response.text}")
-                # 尝试使用另一种可能的API路径格式
-                alternative_url = f"{protocol_host}/video/create" if match else "https://api.sora2.email/video/create"
-                logging.info(f"尝试使用替代API路径: {alternative_url}")
-                response = requests.post(alternative_url, headers=self.headers, json=data, timeout=60)
-                logging.info(f"替代路径响应状态码: {response.status_code}")
-            
-            # 记录响应内容（限制长度避免日志过大）
-            response_text = response.text
-            if len(response_text) > 1000:
-                response_text = response_text[:1000] + "... (截断，总长度: " + str(len(response.text)) + " 字节)"
-            logging.info(f"API响应内容: {response_text}")
-             
-            response.raise_for_status()
-            result = response.json()
-            logging.info(f"视频任务创建成功，任务ID: {result.get('id')}")
-            return result
-        except requests.exceptions.RequestException as e:
-            error_message = f"API请求失败: {e}"
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    error_message += f" - 错误详情: {error_data}"
-                except:
-                      # 记录响应文本但限制长度
-                    error_text = e.response.text
-                    if len(error_text) > 500:
-                        error_text = error_text[:500] + "... (截断)"
-                    error_message += f" - 响应内容: {error_text}"
-                error_message += f" - 状态码: {e.response.status_code}"
-            logging.error(error_message)
-            raise
-    
-    def query_task(self, task_id):
-        """查询任务状态"""
-         # 根据查询任务.txt文档，使用正确的API路径格式
-        base_url = self.base_url.strip()
-         
-        # 提取协议和主机名部分
-        if base_url.startswith("http://") or base_url.startswith("https://"):
-            # 分割协议和主机名+路径
-            protocol_end = base_url.find("://") + 3
-            host_part = base_url[protocol_end:].split('/')[0]
-            protocol = base_url[:protocol_end]
+            self.session.close()
+        except Exception as e:
+            logging.warning(f"关闭HTTP会话失败: {e}")
+
+
+class TokenBucketRateLimiter:
+    """线程安全的令牌桶限流器
+
+    按请求类型（create/query/upload）分别维护令牌桶，所有API请求都先取令牌再发送。
+    服务端返回429或带Retry-After的响应时，对应类型暂停发放令牌直到指定时间。
+    """
+
+    def __init__(self, rates, default_backoff=5.0):
+        # rates: {kind: {'rate': 每秒令牌数, 'burst': 桶容量}}
+        self.default_backoff = default_backoff
+        self._lock = threading.Lock()
+        self._buckets = {}
+        now = time.monotonic()
+        for kind, conf in rates.items():
+            rate = max(float(conf.get('rate', 1.0)), 0.001)
+            burst = max(float(conf.get('burst', 1)), 1.0)
+            self._buckets[kind] = {
+                'rate': rate,
+                'burst': burst,
+                'tokens': burst,
+                'updated': now,
+                'blocked_until': 0.0
+            }
+
+    def _reserve(self, kind):
+        """预占一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            bucket = self._buckets.get(kind)
+            if bucket is None:
+                return 0.0
+            now = time.monotonic()
+            bucket['tokens'] = min(bucket['burst'], bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+            bucket['updated'] = now
+            bucket['tokens'] -= 1
+            wait = -bucket['tokens'] / bucket['rate'] if bucket['tokens'] < 0 else 0.0
+            return max(wait, bucket['blocked_until'] - now)
+
+    def _blocked_for(self, kind):
+        with self._lock:
+            bucket = self._buckets.get(kind)
+            return max(0.0, bucket['blocked_until'] - time.monotonic()) if bucket else 0.0
+
+    def acquire(self, kind):
+        """阻塞直到拿到令牌"""
+        wait = self._reserve(kind)
+        while wait > 0:
+            time.sleep(wait)
+            # 等待期间可能收到429，需要继续等到暂停结束
+            wait = self._blocked_for(kind)
+
+    def pause(self, kind, delay):
+        """暂停指定类型的令牌发放delay秒"""
+        with self._lock:
+            bucket = self._buckets.get(kind)
+            if bucket is None:
+                return
+            now = time.monotonic()
+            bucket['blocked_until'] = max(bucket['blocked_until'], now + delay)
+            # 丢弃已积累的令牌，暂停结束后按速率平滑恢复
+            bucket['tokens'] = min(bucket['tokens'], 0.0)
+        logging.warning(f"限流器: [{kind}] 暂停发放令牌 {delay:.1f} 秒")
+
+    @staticmethod
+    def parse_retry_after(value):
+        """解析Retry-After头，支持秒数和HTTP日期两种格式"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+        except Exception:
+            return None
+
+    def observe(self, kind, status_code, headers):
+        """根据响应状态码和Retry-After头调整限流，返回暂停的秒数（未暂停返回None）"""
+        retry_after = self.parse_retry_after(headers.get('Retry-After') if headers else None)
+        if status_code == 429:
+            delay = retry_after if retry_after is not None else self.default_backoff
+        elif retry_after is not None and status_code in (502, 503, 504):
+            delay = retry_after
         else:
-            # 如果没有协议，默认使用https
-            protocol = "https://"
-            host_part = base_url.split('/')[0]
-        
-         # 根据API文档，构建正确的查询任务URL
-        # 尝试多种可能的路径格式
-        url_candidates = [
-            f"{protocol}{host_part}/v1/video/query",  # 标准RESTful格式
-            f"{protocol}{host_part}/v1videoquery",    # 文档中提到的格式
-            f"{protocol}{host_part}/video/query"       # 可能的简化格式
-        ]
-        
-        params = {"id": task_id}
-              
-        logging.info(f"查询任务状态: {task_id}")
-        logging.info(f"可用的URL候选: {url_candidates}")
-        
-        # 尝试每个URL，直到找到有效的一个
-        for url in url_candidates:
-            logging.info(f"尝试URL: {url}")
+            return None
+        self.pause(kind, delay)
+        return delay
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """熔断器打开时快速失败，不再发出请求"""
+
+
+class NetworkCounters:
+    """线程安全的计数器集合，用于重试和熔断统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+class RetryPolicy:
+    """指数退避重试策略，退避时间使用全抖动（0到上限之间均匀随机）"""
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=8.0, max_elapsed=60.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_elapsed = max_elapsed
+
+    def backoff(self, attempt):
+        """第attempt次重试前的等待秒数"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """单个接口的熔断器
+
+    连续失败达到阈值后打开，期间请求直接抛出CircuitOpenError；
+    超过reset_timeout后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, counters=None):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.counters = counters or NetworkCounters()
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def before_request(self):
+        """请求前检查熔断状态，不允许请求时抛出CircuitOpenError"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            now = time.monotonic()
+            if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+                logging.info(f"熔断器 [{self.name}] 进入半开状态，放行探测请求")
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            remaining = max(0.0, self.reset_timeout - (now - self._opened_at))
+        self.counters.increment('breaker_rejected')
+        raise CircuitOpenError(f"接口 {self.name} 暂时不可用（熔断中，约 {remaining:.0f} 秒后重试）")
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logging.info(f"熔断器 [{self.name}] 探测成功，恢复关闭状态")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+                opened = True
+            else:
+                opened = False
+            failures = self._failures
+        if opened:
+            self.counters.increment('breaker_opened')
+            logging.error(f"熔断器 [{self.name}] 打开: 连续失败 {failures} 次，{self.reset_timeout:.0f} 秒内快速失败")
+
+    def release_probe(self):
+        """请求因与接口无关的原因中断（如取消上传、读取本地文件出错）时释放探测名额，不改变状态"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+
+class AdaptiveConcurrencyController:
+    """提交请求的自适应并发控制（AIMD）
+
+    在p95延迟和错误率都正常时按加法逐步扩大同时进行中的提交数，
+    遇到429、5xx或超时时按乘法缩小窗口，从而在不预先知道服务端容量的
+    情况下尽快完成大批量提交，又不会压垮较慢的服务端。
+    """
+
+    def __init__(self, initial=2, min_window=1, max_window=16, decrease_factor=0.5,
+                 latency_target=15.0, error_rate_threshold=0.1, sample_size=50):
+        self.min_window = max(1, int(min_window))
+        self.max_window = max(self.min_window, int(max_window))
+        self.decrease_factor = decrease_factor
+        self.latency_target = latency_target
+        self.error_rate_threshold = error_rate_threshold
+        self._window = float(min(max(initial, self.min_window), self.max_window))
+        self._in_flight = 0
+        self._samples = deque(maxlen=sample_size)  # (延迟秒数, 是否过载)
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def window(self):
+        with self._cond:
+            return self._window
+
+    @property
+    def in_flight(self):
+        with self._cond:
+            return self._in_flight
+
+    def acquire(self):
+        """等待直到当前窗口允许再发出一个请求"""
+        with self._cond:
+            while self._in_flight >= int(self._window):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self, latency, overloaded):
+        """请求结束后记录延迟和结果，并调整窗口"""
+        with self._cond:
+            self._in_flight -= 1
+            self._samples.append((latency, overloaded))
+            now = time.monotonic()
+            if overloaded:
+                # 同一波过载只缩小一次，冷却时间取近期p95延迟（至少1秒）
+                if now - self._last_decrease >= max(1.0, self._p95()):
+                    old_window = self._window
+                    self._window = max(self.min_window, self._window * self.decrease_factor)
+                    self._last_decrease = now
+                    logging.warning(f"自适应并发: 检测到过载，窗口 {old_window:.1f} -> {self._window:.1f}")
+            elif self._p95() <= self.latency_target and self._error_rate() <= self.error_rate_threshold:
+                # 每个窗口的请求全部成功后窗口加1
+                self._window = min(self.max_window, self._window + 1.0 / self._window)
+            self._cond.notify_all()
+
+    def _p95(self):
+        latencies = sorted(latency for latency, _ in self._samples)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def _error_rate(self):
+        if not self._samples:
+            return 0.0
+        return sum(1 for _, overloaded in self._samples if overloaded) / len(self._samples)
+
+    def get_stats(self):
+        with self._cond:
+            return {
+                'window': self._window,
+                'in_flight': self._in_flight,
+                'max_window': self.max_window,
+                'p95_latency': self._p95(),
+                'error_rate': self._error_rate()
+            }
+
+
+# 配置文件由设置页（GUI线程）和API路径缓存（工作线程）共同写入，读-改-写必须串行
+_config_file_lock = threading.RLock()
+
+
+def update_config_file(update, path=CONFIG_FILE):
+    """在锁内读取配置文件，调用update(config)就地修改后原子地写回，保留其他配置项"""
+    with _config_file_lock:
+        config = {}
+        if os.path.exists(path):
             try:
-                response = requests.get(url, headers=self.headers, params=params, timeout=30)
-                
-                # 添加详细的响应日志
-                logging.info(f"URL {url} 响应状态码: {response.status_code}")
-                
-                # 对于200响应，处理结果
-                if response.status_code == 200:
-                    result = response.json()
-                    
-                    # 添加更详细的日志记录
-                    task_status = result.get('status')
-                    video_url = result.get('video_url', 'None')
-                    thumbnail_url = result.get('thumbnail_url', 'None')
-                    
-                    # 特殊处理可能的嵌套响应结构
-                    if 'detail' in result and isinstance(result['detail'], dict):
-                        detail_status = result['detail'].get('status')
-                        if detail_status:
-                            # 更新任务状态为detail中的status值
-                            result['status'] = detail_status
-                            task_status = detail_status
-                            logging.info(f"发现嵌套状态信息，更新状态为: {detail_status}")
-                    
-                    # 日志记录
-                    logging.info(f"任务状态查询结果 - ID: {task_id}, 状态: {task_status}")
-                    if video_url:
-                        logging.info(f"视频URL: {video_url[:50]}...")
-                    if thumbnail_url:
-                        logging.info(f"缩略图URL: {thumbnail_url[:50]}...")
-                    
-                    # 记录完整响应以供调试
-                    logging.debug(f"完整响应数据: {json.dumps(result, ensure_ascii=False)}")
-                    return result
-                
-                # 如果是404，继续尝试下一个URL
-                elif response.status_code == 404:
-                    logging.warning(f"URL {url} 返回404错误，尝试下一个URL")
-                    continue
-                
-                # 其他错误状态码
-                else:
-                    logging.error(f"URL {url} 返回错误状态码: {response.status_code}")
-                    try:
-                        error_content = response.json()
-                        logging.error(f"错误详情: {error_content}")
-                    except:
-                        logging.error(f"响应内容: {response.text[:200]}...")
-                    # 继续尝试下一个URL
-                    continue
-                    
-            except requests.exceptions.RequestException as e:
-                error_message = f"URL {url} 请求异常: {str(e)}"
-                logging.error(error_message)
-                # 继续尝试下一个URL
-                continue
-        
-        # 所有URL都失败
-        error_message = f"所有查询URL都尝试失败: {url_candidates}"
-        logging.error(error_message)
-        raise Exception(error_message)
-    
-    def upload_file(self, file_path):
-        """上传文件到图床，返回图片URL"""
-        # 使用文档中指定的图片上传URL
-        url = "https://imageproxy.zhongzhuan.chat/api/upload"
-        
-        # 确保文件存在
-        if not os.path.exists(file_path):
-            error_message = f"文件不存在: {file_path}"
-            logging.error(error_message)
-            raise FileNotFoundError(error_message)
-        
-        logging.info(f"准备上传文件: {file_path} 到图床API: {url}")
-        
+                with open(path, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+            except Exception as e:
+                logging.error(f"读取已有配置失败: {e}")
+        update(config)
+        # 先写临时文件再替换，写入中途出错也不会留下截断的配置文件
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+
+class EndpointResolver:
+    """API路径发现缓存
+
+    不同中转服务的API路径不完全一致，这里按base_url记录探测成功的路径，
+    并带TTL持久化到配置文件中。只有缓存的路径返回404时才重新探测。
+    """
+
+    def __init__(self, config_path=CONFIG_FILE, ttl=86400):
+        self.config_path = config_path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache = self._load()
+
+    def _load(self):
         try:
-            with open(file_path, 'rb') as file:
-                files = {'file': (os.path.basename(file_path), file)}
-                
-                logging.debug(f"开始发送POST请求到图床API")
-                response = requests.post(url, files=files, timeout=120)
-                
-                logging.debug(f"图床API响应状态码: {response.status_code}")
-                logging.debug(f"图床API响应内容: {response.text}")
-                
-                response.raise_for_status()
-                
-                # 解析JSON响应
-                result = response.json()
-                logging.debug(f"解析后的JSON响应: {result}")
-                
-                # 检查响应格式是否正确
-                if not isinstance(result, dict) or 'url' not in result:
-                    error_message = f"无效的响应格式，缺少'url'字段: {result}"
-                    logging.error(error_message)
-                    raise ValueError(error_message)
-                
-                image_url = result['url']
-                logging.info(f"图片上传成功，获取到URL: {image_url}")
-                return image_url
-                
-        except json.JSONDecodeError:
-            error_message = f"无法解析响应为JSON: {response.text}"
-            logging.error(error_message)
-            raise
-        except requests.exceptions.RequestException as e:
-            error_message = f"上传文件失败: {e}"
-            if hasattr(e, 'response') and e.response is not None:
-                error_message += f" - 响应内容: {e.response.text}"
-            logging.error(error_message)
-            raise
+            if os.path.exists(self.config_path):
+                with open(self.config_path, 'r', encoding='utf-8') as f:
+                    cache = json.load(f).get('endpoint_cache', {})
+                if isinstance(cache, dict):
+                    return cache
         except Exception as e:
-            logging.error(f"上传过程中发生未知错误: {e}")
+            logging.warning(f"读取API路径缓存失败: {e}")
+        return {}
+
+    def _persist(self):
+        with self._lock:
+            cache = json.loads(json.dumps(self._cache))
+        try:
+            update_config_file(lambda config: config.update(endpoint_cache=cache), self.config_path)
+        except Exception as e:
+            logging.warning(f"保存API路径缓存失败: {e}")
+
+    def get(self, base_url, kind):
+        """返回缓存的可用路径，不存在或已过期时返回None"""
+        with self._lock:
+            entry = self._cache.get(base_url, {}).get(kind)
+        if not entry:
+            return None
+        if time.time() - entry.get('resolved_at', 0) > self.ttl:
+            logging.info(f"API路径缓存已过期: {base_url} [{kind}] -> {entry.get('path')}")
+            return None
+        return entry.get('path')
+
+    def order_candidates(self, base_url, kind, candidates):
+        """把缓存的路径排在候选列表最前面"""
+        cached = self.get(base_url, kind)
+        if cached:
+            return [cached] + [path for path in candidates if path != cached]
+        return list(candidates)
+
+    def remember(self, base_url, kind, path):
+        """记录探测成功的路径"""
+        with self._lock:
+            entry = self._cache.get(base_url, {}).get(kind)
+            if entry and entry.get('path') == path and time.time() - entry.get('resolved_at', 0) <= self.ttl:
+                return
+            self._cache.setdefault(base_url, {})[kind] = {'path': path, 'resolved_at': time.time()}
+        logging.info(f"已缓存API路径: {base_url} [{kind}] -> {path}")
+        self._persist()
+
+    def invalidate(self, base_url, kind):
+        """缓存的路径失效（返回404）时清除，下次调用重新探测"""
+        with self._lock:
+            removed = self._cache.get(base_url, {}).pop(kind, None)
+        if removed:
+            logging.warning(f"API路径缓存失效，将重新探测: {base_url} [{kind}] -> {removed.get('path')}")
+            self._persist()
+
+
+class SubmissionUnknownError(Exception):
+    """上次提交的结果未知：请求可能已被服务端受理，自动重新提交可能重复计费"""
+
+
+class SubmissionLedger:
+    """提交记录，防止同一个任务被重复提交（重复计费）
+
+    每个任务按参数和批次行号生成稳定的提交键，请求发出前先记为pending，
+    创建成功后记录远程任务ID，重新运行同一批次时直接复用。请求确定未被受理时记为failed，可以重新提交；
+    超时、5xx或进程中断留下的pending记为unknown，不会自动重新发送，需要用户确认后换新的批次重新生成。
+    记录以追加方式写入JSON Lines文件，每次更新只写一行，加载时合并并清理过期记录。
+    """
+
+    UNCERTAIN_STATUSES = frozenset(('pending', 'unknown'))
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path=SUBMISSIONS_FILE, retention=30 * 86400, legacy_path=None):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._entries = self._load(legacy_path)
+        self._file = None
+
+    @classmethod
+    def shared(cls, path=SUBMISSIONS_FILE):
+        """同一文件只使用一个实例，所有生成器和界面共享"""
+        with cls._instances_lock:
+            ledger = cls._instances.get(path)
+            if ledger is None:
+                ledger = cls(path, legacy_path=LEGACY_SUBMISSIONS_FILE if path == SUBMISSIONS_FILE else None)
+                cls._instances[path] = ledger
+            return ledger
+
+    @staticmethod
+    def make_key(row_id, prompt, model, orientation, size, duration, images=None):
+        """根据任务参数和批次行号生成提交键"""
+        payload = json.dumps({
+            'row': row_id,
+            'prompt': prompt,
+            'model': model,
+            'orientation': orientation,
+            'size': size,
+            'duration': int(duration),
+            'images': list(images or [])
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _load(self, legacy_path):
+        entries = {}
+        try:
+            if legacy_path and os.path.exists(legacy_path) and not os.path.exists(self.path):
+                # 旧版把所有记录保存在一个JSON对象中
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+                if isinstance(legacy, dict):
+                    entries.update(legacy)
+                logging.info(f"已迁移旧版提交记录 {len(entries)} 条: {legacy_path} -> {self.path}")
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # 写入中断留下的半行
+                            continue
+                        entries[record.pop('key')] = record
+        except Exception as e:
+            logging.warning(f"读取提交记录失败: {e}")
+        # 清理过期的记录，上次运行中断时仍为pending的提交结果未知
+        cutoff = time.time() - self.retention
+        entries = {key: entry for key, entry in entries.items() if entry.get('updated_at', 0) >= cutoff}
+        for entry in entries.values():
+            if entry.get('status') == 'pending':
+                entry['status'] = 'unknown'
+        self._compact(entries)
+        return entries
+
+    def _compact(self, entries):
+        """把合并后的记录重写为每个提交键一行"""
+        try:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for key, entry in entries.items():
+                    f.write(json.dumps(dict(entry, key=key), ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning(f"整理提交记录失败: {e}")
+
+    def _append(self, key, entry):
+        # 调用方持有self._lock
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(dict(entry, key=key), ensure_ascii=False) + '\n')
+            self._file.flush()
+        except Exception as e:
+            logging.warning(f"保存提交记录失败: {e}")
+
+    def _update(self, key, **fields):
+        with self._lock:
+            entry = self._entries.setdefault(key, {'status': 'pending', 'task_id': None, 'attempts': 0})
+            entry.update(fields, updated_at=time.time())
+            self._append(key, entry)
+
+    def task_id(self, key):
+        """返回提交键对应的远程任务ID，尚未创建成功时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.get('task_id') if entry else None
+
+    def is_uncertain(self, key):
+        """该提交键的上次请求可能已被受理但没有拿到任务ID"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return bool(entry) and not entry.get('task_id') and entry.get('status') in self.UNCERTAIN_STATUSES
+
+    def count_created(self, keys):
+        """统计已经创建成功的提交键数量"""
+        with self._lock:
+            return sum(1 for key in keys if self._entries.get(key, {}).get('task_id'))
+
+    def count_uncertain(self, keys):
+        """统计上次提交结果未知的提交键数量"""
+        return sum(1 for key in keys if self.is_uncertain(key))
+
+    def mark_pending(self, key):
+        """请求发出前记录提交键"""
+        with self._lock:
+            attempts = self._entries.get(key, {}).get('attempts', 0) + 1
+        self._update(key, status='pending', attempts=attempts)
+
+    def mark_created(self, key, task_id):
+        """创建成功后记录远程任务ID"""
+        self._update(key, status='created', task_id=task_id)
+
+    def mark_failed(self, key):
+        """请求确定未被受理（未送达或被拒绝），可以重新提交"""
+        self._update(key, status='failed')
+
+    def mark_unknown(self, key):
+        """请求可能已被受理但没有拿到结果，不再自动重新提交"""
+        self._update(key, status='unknown')
+
+
+def assign_submission_keys(task_queue, batch_id):
+    """为任务队列中的每个任务生成提交键，行号使用batch_index或队列顺序
+
+    图片优先取原始路径（表格中填写的本地路径或URL），提交键不依赖上传后得到的地址，
+    上传前就能确定，重新上传得到不同地址时也不会变。
+    """
+    for index, task_info in enumerate(task_queue, 1):
+        images = task_info.get("images")
+        if images is None:
+            image = task_info.get("original_path") or task_info.get("image_url") or task_info.get("image_file")
+            images = [image] if image else []
+        row_id = f"{batch_id}#{task_info.get('batch_index', index)}"
+        task_info["submission_key"] = SubmissionLedger.make_key(
+            row_id, task_info["prompt"], task_info["model"], task_info["orientation"],
+            task_info["size"], task_info["duration"], images
+        )
+    return task_queue
+
+
+def assign_table_submission_keys(task_queue, file_path):
+    """为表格导入的任务生成提交键
+
+    批次标识取表格文件路径，行号取表格中的行，重新导入同一表格时已提交成功的行会复用原任务。
+    """
+    return assign_submission_keys(task_queue, f"table:{os.path.abspath(file_path)}")
+
+
+def confirm_table_resubmission(parent, task_queue, file_path):
+    """表格中有已提交过的任务时询问是否跳过，需在GUI线程调用
+
+    如果用户选择重新生成，则使用新的批次标识重新生成提交键。
+    """
+    batch_id = f"table:{os.path.abspath(file_path)}"
+    keys = [task_info["submission_key"] for task_info in task_queue]
+    ledger = SubmissionLedger.shared()
+    created = ledger.count_created(keys)
+    uncertain = ledger.count_uncertain(keys)
+    if created or uncertain:
+        notice = f"该表格中有{created}个任务已经提交过。"
+        if uncertain:
+            notice += f"\n另有{uncertain}个任务上次提交时超时或中断，结果未知（可能已创建并计费），继续导入时这些行会标记为失败，请先在服务商后台确认。"
+        reply = QMessageBox.question(
+            parent,
+            "继续上次导入",
+            f"{notice}\n选择\"是\"跳过已提交的任务（不会重复计费），选择\"否\"全部重新生成。",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.Yes
+        )
+        if reply != QMessageBox.Yes:
+            assign_submission_keys(task_queue, f"{batch_id}@{datetime.now().strftime('%Y%m%d%H%M%S%f')}")
+    return task_queue
+
+
+class UploadCancelled(Exception):
+    """上传被用户取消"""
+
+
+class FileBodyStream:
+    """流式的请求体：文件中的一段，前后可以附加固定的字节
+
+    作为文件对象传给requests的data参数，发送时按固定大小的块从磁盘读取，
+    无论文件多大、同时上传多少个，每个上传只占用一个块的内存。
+    每次读取时检查cancel_event，设置后抛出UploadCancelled中断发送；
+    progress(已发送字节数, 总字节数) 按PROGRESS_INTERVAL节流回调（在发送线程中）。
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    PROGRESS_INTERVAL = 0.2
+
+    def __init__(self, file_path, offset=0, length=None, head=b'', tail=b'', progress=None, cancel_event=None):
+        self.file_path = file_path
+        self.progress = progress
+        self.cancel_event = cancel_event
+        self._head = head
+        self._tail = tail
+        self._offset = offset
+        self._file_size = os.path.getsize(file_path) - offset if length is None else length
+        self.total = len(self._head) + self._file_size + len(self._tail)
+        self._file = open(file_path, 'rb')
+        self._file.seek(offset)
+        self._position = 0
+        self._last_report = 0.0
+
+    def __len__(self):
+        return self.total
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=0):
+        """只支持回到开头（重试时重新发送）"""
+        if offset != 0 or whence != 0:
+            raise OSError("FileBodyStream只支持seek(0)")
+        self._file.seek(self._offset)
+        self._position = 0
+        return 0
+
+    def read(self, size=-1):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise UploadCancelled(f"上传已取消: {self.file_path}")
+        if size is None or size < 0:
+            size = self.total - self._position
+        data = bytearray()
+        head_end = len(self._head)
+        file_end = head_end + self._file_size
+        while len(data) < size and self._position < self.total:
+            need = size - len(data)
+            if self._position < head_end:
+                piece = self._head[self._position:self._position + need]
+            elif self._position < file_end:
+                piece = self._file.read(min(need, self.CHUNK_SIZE, file_end - self._position))
+                if not piece:
+                    raise OSError(f"上传过程中文件被截断: {self.file_path}")
+            else:
+                offset = self._position - file_end
+                piece = self._tail[offset:offset + need]
+            data += piece
+            self._position += len(piece)
+        self._report()
+        return bytes(data)
+
+    def _report(self):
+        if not self.progress:
+            return
+        now = time.monotonic()
+        if self._position < self.total and now - self._last_report < self.PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        try:
+            self.progress(self._position, self.total)
+        except Exception as e:
+            logging.debug(f"上传进度回调出错: {e}")
+
+    def close(self):
+        self._file.close()
+
+
+class MultipartFileStream(FileBodyStream):
+    """流式的multipart/form-data请求体，只包含一个文件字段"""
+
+    def __init__(self, file_path, field_name='file', progress=None, cancel_event=None):
+        self.boundary = os.urandom(16).hex()
+        filename = os.path.basename(file_path).replace('"', '%22')
+        mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        head = (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{filename}"\r\n'
+            f'Content-Type: {mime_type}\r\n\r\n'
+        ).encode('utf-8')
+        tail = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+        super().__init__(file_path, head=head, tail=tail, progress=progress, cancel_event=cancel_event)
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+
+def extract_field(data, path):
+    """按点分隔的路径从嵌套的字典中取值，不存在时返回None"""
+    for key in path.split('.'):
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+class UploadBackend(ABC):
+    """图片上传后端的基类
+
+    每个后端有独立的连接池和同时上传数上限。请求通过send发送（生成器传入的_send，
+    带限流、重试和熔断），send为None时直接用后端自己的连接池发送。
+    upload返回可供视频生成接口访问的图片URL。
+    """
+
+    name = 'base'
+
+    def __init__(self, config, send=None, keep_alive=True):
+        self.config = config
+        self._send_func = send
+        self.timeout = config.get('timeout', 120)
+        self.http = PooledHttpSession(
+            pool_connections=2,
+            pool_maxsize=int(config.get('pool_maxsize', 8)),
+            keep_alive=keep_alive
+        )
+        self._slots = threading.BoundedSemaphore(max(1, int(config.get('concurrency', 4))))
+
+    @property
+    def cache_namespace(self):
+        """上传缓存的命名空间，切换上传目标后不会复用其他后端的URL"""
+        return self.name
+
+    def send(self, method, url, idempotent=True, rewind_files=(), **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if self._send_func is None:
+            return self.http.request(method, url, **kwargs)
+        return self._send_func('upload', method, url, idempotent=idempotent,
+                               rewind_files=rewind_files, http=self.http, **kwargs)
+
+    def upload(self, file_path, progress=None, cancel_event=None):
+        with self._slots:
+            if cancel_event is not None and cancel_event.is_set():
+                raise UploadCancelled(f"上传已取消: {file_path}")
+            return self._upload(file_path, progress, cancel_event)
+
+    @abstractmethod
+    def _upload(self, file_path, progress, cancel_event):
+        """上传文件并返回图片URL，由各后端实现"""
+
+    def get_stats(self):
+        return self.http.get_stats()
+
+    def close(self):
+        self.http.close()
+
+
+class MultipartUploadBackend(UploadBackend):
+    """通用的multipart/form-data上传接口，响应JSON中包含图片URL"""
+
+    name = 'multipart'
+
+    @property
+    def cache_namespace(self):
+        return f"{self.name}:{self.config['url']}"
+
+    def _upload(self, file_path, progress, cancel_event):
+        url = self.config['url']
+        if not url:
+            raise ValueError("未配置上传地址（upload_backend.multipart.url）")
+        logging.info(f"准备上传文件: {file_path} 到 {url}")
+        with MultipartFileStream(file_path, field_name=self.config.get('field_name', 'file'),
+                                 progress=progress, cancel_event=cancel_event) as body:
+            headers = dict(self.config.get('headers') or {})
+            headers['Content-Type'] = body.content_type
+            logging.debug(f"开始发送POST请求到 {url}，请求体 {body.total} 字节")
+            response = self.send('POST', url, rewind_files=(body,), data=body, headers=headers)
+        logging.debug(f"上传接口响应状态码: {response.status_code}")
+        logging.debug(f"上传接口响应内容: {response.text}")
+        response.raise_for_status()
+        return SoraVideoGenerator._parse_upload_result(response.json(), self.config.get('url_field', 'url'))
+
+
+class ImageProxyUploadBackend(MultipartUploadBackend):
+    """默认图床（imageproxy），字段名file，响应中的url为图片地址"""
+
+    name = 'imageproxy'
+
+    @property
+    def cache_namespace(self):
+        # 与未区分后端时的缓存键保持一致
+        return ''
+
+
+class S3UploadBackend(UploadBackend):
+    """S3兼容对象存储（AWS S3、MinIO等）
+
+    使用SigV4查询参数签名（预签名URL），小文件一次PUT，大文件分片上传；
+    对象键为前缀加文件内容的SHA-256，同一张图片总是写到同一个对象。
+    """
+
+    name = 's3'
+
+    def __init__(self, config, send=None, keep_alive=True):
+        super().__init__(config, send, keep_alive)
+        parsed = urllib.parse.urlsplit(config['endpoint'].rstrip('/'))
+        self.scheme = parsed.scheme or 'http'
+        self.host = parsed.netloc
+        self.base_path = parsed.path
+
+    @property
+    def cache_namespace(self):
+        return f"{self.name}:{self.config['endpoint']}/{self.config['bucket']}"
+
+    def object_path(self, key):
+        """路径风格的对象地址（MinIO默认使用路径风格）"""
+        return f"{self.base_path}/{self.config['bucket']}/{urllib.parse.quote(key, safe='/~')}"
+
+    def presign(self, method, key, query=None, expires=None):
+        """生成SigV4预签名URL，只签名host头，请求体不参与签名（UNSIGNED-PAYLOAD）"""
+        config = self.config
+        amz_date = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+        date_stamp = amz_date[:8]
+        scope = f"{date_stamp}/{config['region']}/s3/aws4_request"
+        params = {key_: str(value) for key_, value in (query or {}).items()}
+        params.update({
+            'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+            'X-Amz-Credential': f"{config['access_key']}/{scope}",
+            'X-Amz-Date': amz_date,
+            'X-Amz-Expires': str(int(expires or config['presign_expires'])),
+            'X-Amz-SignedHeaders': 'host'
+        })
+        canonical_query = '&'.join(
+            f"{urllib.parse.quote(name, safe='-_.~')}={urllib.parse.quote(value, safe='-_.~')}"
+            for name, value in sorted(params.items())
+        )
+        path = self.object_path(key)
+        canonical_request = '\n'.join([method, path, canonical_query, f"host:{self.host}\n", 'host', 'UNSIGNED-PAYLOAD'])
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256', amz_date, scope, hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+        ])
+        signing_key = ('AWS4' + config['secret_key']).encode('utf-8')
+        for part in (date_stamp, config['region'], 's3', 'aws4_request'):
+            signing_key = hmac.new(signing_key, part.encode('utf-8'), hashlib.sha256).digest()
+        signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+        return f"{self.scheme}://{self.host}{path}?{canonical_query}&X-Amz-Signature={signature}"
+
+    def public_url(self, key):
+        base = self.config.get('public_base_url')
+        if base:
+            return f"{base.rstrip('/')}/{urllib.parse.quote(key, safe='/~')}"
+        return self.presign('GET', key, expires=min(int(self.config['presign_expires']), 604800))
+
+    @staticmethod
+    def _check(response, action):
+        # S3的部分接口在出错时也会返回200，需要检查响应中的Error元素
+        if response.status_code >= 300 or b'<Error>' in response.content[:512]:
+            raise requests.exceptions.HTTPError(
+                f"S3 {action} 失败 ({response.status_code}): {response.text[:500]}", response=response
+            )
+
+    def _upload(self, file_path, progress, cancel_event):
+        config = self.config
+        if not config['bucket'] or not config['access_key']:
+            raise ValueError("未配置S3存储桶或访问密钥（upload_backend.s3）")
+        key = f"{config.get('prefix', '')}{UploadCache.file_digest(file_path)}{os.path.splitext(file_path)[1].lower()}"
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        size = os.path.getsize(file_path)
+        logging.info(f"准备上传文件: {file_path} 到S3对象 {config['bucket']}/{key}（{size} 字节）")
+        if size > int(config['multipart_threshold']):
+            self._multipart_upload(file_path, key, size, content_type, progress, cancel_event)
+        else:
+            with FileBodyStream(file_path, progress=progress, cancel_event=cancel_event) as body:
+                response = self.send('PUT', self.presign('PUT', key), rewind_files=(body,), data=body,
+                                     headers={'Content-Type': content_type})
+            self._check(response, "PUT")
+        image_url = self.public_url(key)
+        logging.info(f"图片上传成功，获取到URL: {image_url}")
+        return image_url
+
+    def _multipart_upload(self, file_path, key, size, content_type, progress, cancel_event):
+        part_size = max(5 * 1024 * 1024, int(self.config['part_size']))
+        response = self.send('POST', self.presign('POST', key, {'uploads': ''}), idempotent=False,
+                             headers={'Content-Type': content_type})
+        self._check(response, "CreateMultipartUpload")
+        upload_id = ET.fromstring(response.content).findtext('{*}UploadId')
+        if not upload_id:
+            raise ValueError(f"S3未返回UploadId: {response.text[:500]}")
+        try:
+            parts = []
+            for number, offset in enumerate(range(0, size, part_size), 1):
+                length = min(part_size, size - offset)
+                part_progress = None
+                if progress:
+                    # 把分片内的进度换算成整个文件的进度
+                    part_progress = lambda sent, total, base=offset: progress(base + min(sent, total), size)
+                with FileBodyStream(file_path, offset=offset, length=length,
+                                    progress=part_progress, cancel_event=cancel_event) as body:
+                    response = self.send('PUT', self.presign('PUT', key, {'partNumber': number, 'uploadId': upload_id}),
+                                         rewind_files=(body,), data=body)
+                self._check(response, f"UploadPart {number}")
+                parts.append((number, response.headers.get('ETag', '')))
+                logging.debug(f"S3分片 {number} 上传完成: {offset + length}/{size} 字节")
+            complete = ''.join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>" for number, etag in parts
+            )
+            response = self.send('POST', self.presign('POST', key, {'uploadId': upload_id}),
+                                 data=f"<CompleteMultipartUpload>{complete}</CompleteMultipartUpload>".encode('utf-8'),
+                                 headers={'Content-Type': 'application/xml'})
+            self._check(response, "CompleteMultipartUpload")
+        except BaseException:
+            # 失败或取消时放弃分片上传，释放服务端已保存的分片
+            try:
+                self.send('DELETE', self.presign('DELETE', key, {'uploadId': upload_id}))
+            except Exception as e:
+                logging.warning(f"放弃S3分片上传失败: {e}")
+            raise
+
+
+UPLOAD_BACKENDS = {
+    'imageproxy': ImageProxyUploadBackend,
+    'multipart': MultipartUploadBackend,
+    's3': S3UploadBackend
+}
+
+
+def create_upload_backend(network_config, send=None):
+    """按网络配置中的upload_backend创建上传后端"""
+    settings = network_config['upload_backend']
+    name = settings.get('backend', 'imageproxy')
+    backend_class = UPLOAD_BACKENDS.get(name)
+    if backend_class is None:
+        logging.warning(f"未知的上传后端 {name}，使用默认图床")
+        name, backend_class = 'imageproxy', ImageProxyUploadBackend
+    logging.info(f"图片上传后端: {name}")
+    return backend_class(settings.get(name, {}), send=send, keep_alive=network_config['keep_alive'])
+
+
+class UploadCache:
+    """图片上传缓存，按文件内容的SHA-256记录图床返回的URL
+
+    同一张图片（无论文件名和路径）再次上传时只需计算一次哈希，不产生网络请求。
+    哈希按块流式计算，大文件不会整个读入内存。
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    _file_lock = threading.Lock()
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path=UPLOAD_CACHE_FILE, ttl=7 * 86400):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._digest_locks = {}
+        self._entries = self._load()
+
+    @classmethod
+    def shared(cls, path=UPLOAD_CACHE_FILE, ttl=7 * 86400):
+        """同一文件只使用一个实例，所有生成器共享"""
+        with cls._instances_lock:
+            cache = cls._instances.get(path)
+            if cache is None:
+                cache = cls(path, ttl)
+                cls._instances[path] = cache
+            cache.ttl = ttl
+            return cache
+
+    @classmethod
+    def file_digest(cls, file_path):
+        """流式计算文件内容的SHA-256"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+                if isinstance(entries, dict):
+                    cutoff = time.time() - self.ttl
+                    return {key: entry for key, entry in entries.items() if entry.get('uploaded_at', 0) >= cutoff}
+        except Exception as e:
+            logging.warning(f"读取上传缓存失败: {e}")
+        return {}
+
+    def _persist(self):
+        with UploadCache._file_lock:
+            try:
+                with self._lock:
+                    data = json.dumps(self._entries, ensure_ascii=False)
+                tmp_path = self.path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logging.warning(f"保存上传缓存失败: {e}")
+
+    @contextmanager
+    def lock_for(self, digest):
+        """同一内容的上传互斥，并发上传同一张图片时只有第一个真正发送
+
+        锁按使用者计数，最后一个使用者退出后移除，锁的数量不随上传过的图片数增长。
+        """
+        with self._lock:
+            holder = self._digest_locks.get(digest)
+            if holder is None:
+                holder = self._digest_locks[digest] = [threading.Lock(), 0]
+            holder[1] += 1
+        try:
+            with holder[0]:
+                yield
+        finally:
+            with self._lock:
+                holder[1] -= 1
+                if holder[1] == 0:
+                    del self._digest_locks[digest]
+
+    def get(self, digest):
+        """返回未过期的URL，没有时返回None"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if not entry:
+                return None
+            if time.time() - entry.get('uploaded_at', 0) > self.ttl:
+                del self._entries[digest]
+                return None
+            return entry.get('url')
+
+    def put(self, digest, url, size=None):
+        with self._lock:
+            self._entries[digest] = {'url': url, 'size': size, 'uploaded_at': time.time()}
+        self._persist()
+
+    def discard(self, digest):
+        """URL已失效时删除缓存"""
+        with self._lock:
+            removed = self._entries.pop(digest, None) is not None
+        if removed:
+            self._persist()
+
+
+def _preprocess_image(source_path, output_path, box, image_format, quality):
+    """在子进程中缩放并重新编码图片，返回 (原尺寸, 新尺寸)
+
+    按EXIF方向转正后缩放到box以内，保存时不写入EXIF等元数据。
+    """
+    with Image.open(source_path) as image:
+        original_size = image.size
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P') and image_format == 'JPEG':
+            # JPEG不支持透明通道，铺白底
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        elif image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB')
+        image.thumbnail(box, Image.LANCZOS)
+        # 同一张图片可能同时被多个任务处理，每次写入独立的临时文件再原子替换
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, format=image_format, quality=quality, optimize=True)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return original_size, image.size
+
+
+class ImagePreprocessor:
+    """上传前的图片预处理
+
+    相机原图通常有20-40MB，而生成视频只需要约1080p的输入。大图片在进程池中按目标方向
+    缩放、去除元数据并重新编码，结果按原图内容的SHA-256缓存在磁盘上，同一张图片只处理一次。
+    没有安装Pillow、图片较小或处理后反而更大时，直接使用原图。
+    """
+
+    EXTENSIONS = {'JPEG': '.jpg', 'WEBP': '.webp'}
+
+    def __init__(self, config, cache_dir=IMAGE_CACHE_DIR):
+        self.config = config
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._pool = None
+        self._stats = {'processed': 0, 'cached': 0, 'skipped': 0, 'failed': 0,
+                       'original_bytes': 0, 'output_bytes': 0, 'seconds': 0.0}
+
+    @property
+    def available(self):
+        return Image is not None and self.config['enabled']
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=max(1, int(self.config['workers'])))
+            return self._pool
+
+    def target_box(self, orientation, size):
+        """目标方向和尺寸对应的最大宽高"""
+        long_side = int(self.config['max_dimension'].get(size, max(self.config['max_dimension'].values())))
+        short_side = long_side * 9 // 16
+        return (short_side, long_side) if orientation == 'portrait' else (long_side, short_side)
+
+    def prepare(self, file_path, orientation='portrait', size='large'):
+        """返回实际要上传的文件路径（预处理后的缓存文件或原图）"""
+        if not self.available:
+            return file_path
+        try:
+            original_bytes = os.path.getsize(file_path)
+            if original_bytes < int(self.config['min_bytes']):
+                self._record('skipped')
+                return file_path
+            image_format = str(self.config['format']).upper()
+            if image_format not in self.EXTENSIONS:
+                image_format = 'JPEG'
+            quality = int(self.config['quality'])
+            box = self.target_box(orientation, size)
+            digest = UploadCache.file_digest(file_path)
+            output_path = os.path.join(
+                self.cache_dir, f"{digest}_{box[0]}x{box[1]}_q{quality}{self.EXTENSIONS[image_format]}"
+            )
+            if os.path.exists(output_path):
+                output_bytes = os.path.getsize(output_path)
+                if output_bytes >= original_bytes:
+                    # 之前处理后没有变小，仍上传原图，不计入节省
+                    self._record('skipped')
+                    return file_path
+                self._record('cached', original_bytes, output_bytes)
+                return output_path
+            os.makedirs(self.cache_dir, exist_ok=True)
+            started = time.monotonic()
+            original_size, new_size = self._executor().submit(
+                _preprocess_image, file_path, output_path, box, image_format, quality
+            ).result()
+            elapsed = time.monotonic() - started
+            output_bytes = os.path.getsize(output_path)
+            if output_bytes >= original_bytes:
+                logging.info(f"图片预处理后没有变小，上传原图: {file_path}")
+                self._record('skipped')
+                return file_path
+            self._record('processed', original_bytes, output_bytes, elapsed)
+            logging.info(
+                f"图片预处理: {os.path.basename(file_path)} {original_size[0]}x{original_size[1]} "
+                f"{original_bytes / 1048576:.1f}MB -> {new_size[0]}x{new_size[1]} {output_bytes / 1048576:.2f}MB，"
+                f"节省 {(1 - output_bytes / original_bytes) * 100:.0f}%，耗时 {elapsed:.2f} 秒"
+            )
+            return output_path
+        except Exception as e:
+            logging.warning(f"图片预处理失败，上传原图: {file_path} - {e}")
+            self._record('failed')
+            return file_path
+
+    def _record(self, outcome, original_bytes=0, output_bytes=0, seconds=0.0):
+        with self._lock:
+            self._stats[outcome] += 1
+            self._stats['original_bytes'] += original_bytes
+            self._stats['output_bytes'] += output_bytes
+            self._stats['seconds'] += seconds
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def log_stats(self):
+        stats = self.get_stats()
+        if not stats['processed'] and not stats['cached']:
+            return
+        saved = stats['original_bytes'] - stats['output_bytes']
+        logging.info(
+            f"图片预处理统计: 处理 {stats['processed']} 张，复用缓存 {stats['cached']} 张，"
+            f"跳过 {stats['skipped']} 张，失败 {stats['failed']} 张；"
+            f"{stats['original_bytes'] / 1048576:.1f}MB -> {stats['output_bytes'] / 1048576:.1f}MB，"
+            f"少上传 {saved / 1048576:.1f}MB（{saved / stats['original_bytes'] * 100:.0f}%），"
+            f"处理耗时 {stats['seconds']:.1f} 秒"
+        )
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+
+class SoraVideoGenerator:
+    # 各接口的候选路径，按优先级排列
+    CREATE_PATHS = ['/v1/video/create', '/video/create']
+    QUERY_PATHS = ['/v1/video/query', '/v1videoquery', '/video/query']
+
+    def __init__(self, api_key, base_url, network_config=None, rate_limiter=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.headers = {
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'Authorization': f'Bearer {api_key}'
+        }
+        # 合并网络配置，未配置的项使用默认值
+        self.network_config = merge_network_config(network_config)
+
+        # 所有API请求和图片上传共用一个连接池会话，跨线程复用连接
+        self.http = PooledHttpSession(
+            pool_connections=self.network_config['pool_connections'],
+            pool_maxsize=self.network_config['pool_maxsize'],
+            pool_block=self.network_config['pool_block'],
+            keep_alive=self.network_config['keep_alive']
+        )
+        # 按base_url缓存探测到的API路径，避免每次请求都尝试无效路径
+        self.endpoints = EndpointResolver(ttl=self.network_config['endpoint_cache_ttl'])
+        # 提交记录，带提交键的创建请求可以安全地重试和重新运行
+        self.submissions = SubmissionLedger.shared()
+        # 图片上传缓存，相同内容的图片不再重复上传
+        self.upload_cache_config = self.network_config['upload_cache']
+        self.upload_cache = UploadCache.shared(ttl=self.upload_cache_config['ttl'])
+        # 上传前的图片缩放和重新编码
+        self.image_preprocessor = ImagePreprocessor(self.network_config['image_preprocess'])
+        # 图片上传后端，使用独立的连接池，请求仍经过限流、重试和熔断
+        self.uploader = create_upload_backend(self.network_config, send=self._send)
+        # 正在使用该实例的批量任务和轮询数，替换后等它们都结束再释放资源
+        self._lease_lock = threading.Lock()
+        self._leases = 0
+        self._retired = False
+        # asyncio接口，首次使用时创建
+        self._async_client = None
+        # 所有API请求共用的限流器，替代固定的time.sleep节流
+        self.rate_limiter = rate_limiter or TokenBucketRateLimiter(
+            self.network_config['rate_limits'],
+            default_backoff=self.network_config['rate_limit_backoff']
+        )
+        # 重试策略和按接口划分的熔断器
+        retry = self.network_config['retry']
+        self.retry_policy = RetryPolicy(
+            max_attempts=retry['max_attempts'],
+            base_delay=retry['base_delay'],
+            max_delay=retry['max_delay'],
+            max_elapsed=retry['max_elapsed']
+        )
+        self.retry_stats = NetworkCounters()
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+        # 提交请求的自适应并发控制，同一生成器的所有提交线程共用
+        adaptive = self.network_config['adaptive_concurrency']
+        self.submit_controller = AdaptiveConcurrencyController(
+            initial=adaptive['initial'],
+            min_window=adaptive['min'],
+            max_window=adaptive['max'],
+            decrease_factor=adaptive['decrease_factor'],
+            latency_target=adaptive['latency_target'],
+            error_rate_threshold=adaptive['error_rate_threshold']
+        )
+
+    @staticmethod
+    def is_overload_error(error):
+        """判断异常是否表示服务端过载（429、5xx、超时或连接失败）"""
+        if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+            return True
+        response = getattr(error, 'response', None)
+        if response is not None:
+            return response.status_code == 429 or response.status_code >= 500
+        return False
+
+    @staticmethod
+    def _is_unsent_error(error):
+        """判断请求是否确定没有到达服务端（连接建立阶段失败），这类错误对任何请求都可以安全重试"""
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+            reason = getattr(error.args[0], 'reason', error.args[0])
+            return isinstance(reason, (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError))
+        return False
+
+    def _is_retryable(self, error=None, status_code=None, idempotent=True):
+        """判断一次失败是否可以重试
+
+        查询、上传等幂等请求在超时、连接错误、429和5xx时重试；
+        创建任务不是幂等的，只在请求确定未被受理（连接失败或429）时重试，避免重复计费。
+        """
+        if error is not None:
+            if isinstance(error, CircuitOpenError):
+                return False
+            if self._is_unsent_error(error):
+                return True
+            return idempotent and isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+        if status_code == 429:
+            return True
+        return idempotent and status_code in (500, 502, 503, 504)
+
+    def _breaker_for(self, kind, url):
+        """每个接口（请求类型+主机）一个熔断器"""
+        key = f"{kind}:{urllib.parse.urlsplit(url).netloc}"
+        with self._breakers_lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                conf = self.network_config['circuit_breaker']
+                breaker = CircuitBreaker(key, conf['failure_threshold'], conf['reset_timeout'], self.retry_stats)
+                self._breakers[key] = breaker
+            return breaker
+
+    def _send(self, kind, method, url, idempotent=True, rewind_files=(), http=None, **kwargs):
+        """经过熔断器和限流器发送请求，可重试的失败按指数退避（全抖动）自动重试
+
+        rewind_files中的文件对象会在每次重试前回到开头，保证上传请求体完整。
+        http为发送请求的连接池，默认使用生成器的共享连接池（上传后端使用各自的连接池）。
+        """
+        http = http or self.http
+        breaker = self._breaker_for(kind, url)
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            breaker.before_request()
+            error, response, retry_after = None, None, None
+            try:
+                self.rate_limiter.acquire(kind)
+                response = http.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                error = e
+                breaker.record_failure()
+            except BaseException:
+                # 半开状态下这次请求是唯一的探测，不释放的话该接口会一直被拒绝
+                breaker.release_probe()
+                raise
+            else:
+                retry_after = self.rate_limiter.observe(kind, response.status_code, response.headers)
+                if retry_after is not None:
+                    logging.warning(f"服务端限流 ({response.status_code})，[{kind}] 请求暂停 {retry_after:.1f} 秒: {url}")
+                # 429说明服务端在正常工作，只是限流，不计入熔断失败
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+            if error is None and not self._is_retryable(status_code=response.status_code, idempotent=idempotent):
+                return response
+            if error is not None and not self._is_retryable(error=error, idempotent=idempotent):
+                raise error
+
+            failure = str(error) if error is not None else f"状态码 {response.status_code}"
+            delay = self.retry_policy.backoff(attempt)
+            elapsed = time.monotonic() - started
+            if attempt + 1 >= self.retry_policy.max_attempts or elapsed + delay > self.retry_policy.max_elapsed:
+                self.retry_stats.increment('retry_exhausted')
+                logging.error(f"[{kind}] 请求重试 {attempt} 次后仍失败，放弃: {url} - {failure}")
+                if error is not None:
+                    raise error
+                return response
+
+            attempt += 1
+            self.retry_stats.increment('retries')
+            logging.warning(f"[{kind}] 请求失败，{delay:.2f} 秒后进行第 {attempt} 次重试: {url} - {failure}")
+            if response is not None:
+                response.close()
+            # 限流暂停由限流器在下次取令牌时等待，这里只等待退避时间
+            time.sleep(delay)
+            for file in rewind_files:
+                file.seek(0)
+
+    def _api_root(self):
+        """从base_url中提取协议和主机名部分，无论用户输入什么路径"""
+        base_url = self.base_url.strip()
+        if base_url.startswith("http://") or base_url.startswith("https://"):
+            protocol_end = base_url.find("://") + 3
+            return base_url[:protocol_end] + base_url[protocol_end:].split('/')[0]
+        # 如果没有协议，默认使用https
+        return "https://" + base_url.split('/')[0]
+
+    def get_connection_stats(self):
+        """获取连接复用计数，用于确认连接池是否生效"""
+        return self.http.get_stats()
+
+    def log_connection_stats(self):
+        """将连接复用计数写入日志"""
+        stats = self.get_connection_stats()
+        logging.info(
+            f"连接池统计: 请求 {stats['requests']} 次, 新建连接 {stats['connections']} 个, "
+            f"复用 {stats['reused']} 次 (复用率 {stats['reuse_ratio']:.0%})"
+        )
+        for host, host_stats in stats['hosts'].items():
+            logging.debug(f"连接池统计 [{host}]: {host_stats}")
+        return stats
+
+    def log_retry_stats(self):
+        """将重试和熔断计数写入日志"""
+        counters = self.retry_stats.snapshot()
+        with self._breakers_lock:
+            states = {key: breaker.state for key, breaker in self._breakers.items()}
+        logging.info(
+            f"重试统计: 重试 {counters.get('retries', 0)} 次, 重试耗尽 {counters.get('retry_exhausted', 0)} 次, "
+            f"熔断打开 {counters.get('breaker_opened', 0)} 次, 熔断拒绝 {counters.get('breaker_rejected', 0)} 次, "
+            f"熔断器状态: {states}"
+        )
+        return counters
+
+    def log_network_stats(self):
+        """将连接池、重试和熔断统计写入日志"""
+        self.log_connection_stats()
+        self.log_retry_stats()
+        self.image_preprocessor.log_stats()
+        stats = self.uploader.get_stats()
+        logging.info(
+            f"上传后端连接池统计({self.uploader.name}): 请求 {stats['requests']} 次, "
+            f"新建连接 {stats['connections']} 个, 复用率 {stats['reuse_ratio']:.0%}"
+        )
+
+    def prepare_and_upload(self, file_path, orientation='portrait', size='large', progress=None, cancel_event=None):
+        """按目标方向和尺寸预处理图片后上传，返回图片URL"""
+        if cancel_event is not None and cancel_event.is_set():
+            raise UploadCancelled(f"上传已取消: {file_path}")
+        return self.upload_file(self.image_preprocessor.prepare(file_path, orientation, size), progress, cancel_event)
+
+    def acquire(self):
+        """登记一个使用者，与release成对调用，返回自身"""
+        with self._lease_lock:
+            self._leases += 1
+        return self
+
+    def release(self):
+        """使用者结束；实例已被替换且没有其他使用者时释放资源"""
+        with self._lease_lock:
+            self._leases -= 1
+            close_now = self._retired and self._leases == 0
+        if close_now:
+            self.close()
+
+    def retire(self):
+        """实例已被新设置替换：没有使用者时立即释放，否则由最后一个使用者释放"""
+        with self._lease_lock:
+            self._retired = True
+            close_now = self._leases == 0
+        if close_now:
+            self.close()
+        else:
+            logging.info(f"旧的API客户端仍有 {self._leases} 个使用者，结束后再释放连接池")
+
+    @property
+    def async_client(self):
+        """同一实例的asyncio接口（AsyncSoraVideoGenerator），首次使用时创建"""
+        with self._lease_lock:
+            if self._async_client is None:
+                self._async_client = AsyncSoraVideoGenerator(
+                    self,
+                    max_concurrency=self.network_config['async_max_concurrency'],
+                    limit_per_host=self.network_config['async_limit_per_host']
+                )
+            return self._async_client
+
+    def close(self):
+        """释放连接池"""
+        if self._async_client is not None:
+            self._async_client.close()
+        self.http.close()
+        self.uploader.close()
+        self.image_preprocessor.close()
+
+    @staticmethod
+    def _build_create_payload(prompt, model, orientation, size, duration, images):
+        """构建创建视频任务的请求数据"""
+        # 根据模型类型限制最大时长，但尊重用户选择
+        if model == "sora-2-pro":
+            if size == "large":
+                size = "large"  # sora-2-pro的large是1080p
+            # sora-2-pro最大支持15秒，如果用户选择的时长超过15秒，则限制为15秒
+            if duration > 15:
+                logging.info(f"用户选择的时长{duration}秒超过sora-2-pro支持的最大时长，限制为15秒")
+                duration = 15
+        else:  # sora-2
+            if size == "large":
+                size = "large"  # sora-2的large可能是720p
+            # 注意：API文档中schema描述sora-2只支持10秒，但example中使用了15秒
+            # 这里保留用户选择的时长，让API决定是否接受
+            logging.info(f"sora-2模型使用用户选择的时长: {duration}秒")
+        
+        # 确保duration是整数类型
+        if isinstance(duration, str):
+            try:
+                duration = int(duration)
+            except ValueError:
+                duration = 10  # 默认10秒
+                logging.error(f"无效的时长值: {duration}, 使用默认值10秒")
+        
+        data = {
+            "model": model,
+            "orientation": orientation,
+            "prompt": prompt,
+            "size": size,
+            "duration": duration,
+            "images": images
+        }
+        return data
+
+    def create_video(self, prompt, model="sora-2", orientation="portrait", 
+                    size="large", duration=15, images=None, submission_key=None):
+        """创建视频任务，同时进行中的提交数由自适应并发控制器限制
+
+        传入submission_key时，已经创建成功的提交直接返回原任务ID（结果中resumed为True），
+        否则请求前先记录提交键，并作为Idempotency-Key发送。上次提交结果未知的提交键不会
+        自动重新发送，抛出SubmissionUnknownError。
+        """
+        if submission_key:
+            existing_id = self.submissions.task_id(submission_key)
+            if existing_id:
+                logging.info(f"提交键已对应任务 {existing_id}，跳过重复创建")
+                return {'id': existing_id, 'resumed': True}
+            if self.submissions.is_uncertain(submission_key):
+                raise SubmissionUnknownError("上次提交超时或中断，结果未知（可能已创建并计费），请在服务商后台确认后再重新生成")
+            self.submissions.mark_pending(submission_key)
+        self.submit_controller.acquire()
+        started = time.monotonic()
+        overloaded = False
+        try:
+            result = self._create_video(prompt, model, orientation, size, duration, images, submission_key)
+            if submission_key:
+                if result.get('id'):
+                    self.submissions.mark_created(submission_key, result['id'])
+                else:
+                    self.submissions.mark_unknown(submission_key)
+            return result
+        except Exception as e:
+            overloaded = self.is_overload_error(e)
+            if submission_key:
+                if self._is_rejected_submission(e):
+                    self.submissions.mark_failed(submission_key)
+                else:
+                    logging.warning(f"提交结果未知，不会自动重新提交: {submission_key[:12]}... - {e}")
+                    self.submissions.mark_unknown(submission_key)
+            raise
+        finally:
+            self.submit_controller.release(time.monotonic() - started, overloaded)
+
+    def _is_rejected_submission(self, error):
+        """创建请求确定没有被受理：未送达、熔断拒绝，或服务端返回了429和其他4xx"""
+        if isinstance(error, CircuitOpenError) or self._is_unsent_error(error):
+            return True
+        response = getattr(error, 'response', None)
+        return isinstance(error, requests.exceptions.HTTPError) and response is not None and 400 <= response.status_code < 500
+
+    def _create_video(self, prompt, model, orientation, size, duration, images, submission_key=None):
+        """发送创建视频任务请求"""
+        if images is None:
+            images = []
+        # 不能确定服务端会按Idempotency-Key去重，创建请求只重试确定未送达的失败，避免重复计费
+        headers = self.headers
+        if submission_key:
+            headers = dict(self.headers, **{'Idempotency-Key': submission_key})
+        
+        logging.info(f"开始创建视频任务，使用base_url: {self.base_url}")
+        
+        # 只保留协议和主机名部分，然后按缓存的路径优先构建标准的API地址
+        api_root = self._api_root()
+        cached_path = self.endpoints.get(api_root, 'create')
+        paths = self.endpoints.order_candidates(api_root, 'create', self.CREATE_PATHS)
+        logging.info(f"创建接口候选路径: {[api_root + path for path in paths]}")
+              
+        data = self._build_create_payload(prompt, model, orientation, size, duration, images)
+        model, size, duration = data["model"], data["size"], data["duration"]
+               
+        logging.info(f"创建视频任务: {model}, {orientation}, {size}, {duration}秒")
+        try:
+            logging.info(f"请求参数: model={model}, orientation={orientation}, size={size}, duration={duration}秒")
+            logging.info(f"请求数据大小: {len(json.dumps(data))} 字节")
+            
+            response = None
+            for path in paths:
+                url = f"{api_root}{path}"
+                logging.info(f"准备发送请求到API: {url}")
+                # 减少超时时间，提高响应性
+                response = self._send('create', 'POST', url, idempotent=False, headers=headers, json=data, timeout=30)
+                logging.info(f"API响应状态码: {response.status_code}")
+                
+                # 404说明该路径不存在，请求未被受理，可以安全地尝试下一个路径
+                if response.status_code == 404:
+                    logging.error(f"404错误 - API路径不存在: {url}")
+                    logging.error(f"404响应内容: {response.text[:500]}")
+                    if path == cached_path:
+                        self.endpoints.invalidate(api_root, 'create')
+                    continue
+                break
+            
+            # 记录响应内容（限制长度避免日志过大）
+            response_text = response.text
+            if len(response_text) > 1000:
+                response_text = response_text[:1000] + "... (截断，总长度: " + str(len(response.text)) + " 字节)"
+            logging.info(f"API响应内容: {response_text}")
+             
+            response.raise_for_status()
+            result = response.json()
+            self.endpoints.remember(api_root, 'create', path)
+            logging.info(f"视频任务创建成功，任务ID: {result.get('id')}")
+            return result
+        except requests.exceptions.RequestException as e:
+            error_message = f"API请求失败: {e}"
+            if hasattr(e, 'response') and e.response is not None:
+                try:
+                    error_data = e.response.json()
+                    error_message += f" - 错误详情: {error_data}"
+                except:
+                      # 记录响应文本但限制长度
+                    error_text = e.response.text
+                    if len(error_text) > 500:
+                        error_text = error_text[:500] + "... (截断)"
+                    error_message += f" - 响应内容: {error_text}"
+                error_message += f" - 状态码: {e.response.status_code}"
+            logging.error(error_message)
+            raise
+    
+    @staticmethod
+    def _normalize_query_result(result):
+        """处理查询结果中可能的嵌套响应结构"""
+        if 'detail' in result and isinstance(result['detail'], dict):
+            detail_status = result['detail'].get('status')
+            if detail_status:
+                # 更新任务状态为detail中的status值
+                result['status'] = detail_status
+                logging.info(f"发现嵌套状态信息，更新状态为: {detail_status}")
+        return result
+    
+    def query_task(self, task_id):
+        """查询任务状态"""
+        # 根据查询任务.txt文档，使用正确的API路径格式
+        # 尝试多种可能的路径格式，缓存的可用路径排在最前面
+        api_root = self._api_root()
+        cached_path = self.endpoints.get(api_root, 'query')
+        paths = self.endpoints.order_candidates(api_root, 'query', self.QUERY_PATHS)
+        url_candidates = [f"{api_root}{path}" for path in paths]
+        
+        params = {"id": task_id}
+              
+        logging.info(f"查询任务状态: {task_id}")
+        logging.debug(f"可用的URL候选: {url_candidates}")
+        
+        # 尝试每个URL，直到找到有效的一个
+        for path in paths:
+            url = f"{api_root}{path}"
+            logging.info(f"尝试URL: {url}")
+            try:
+                response = self._send('query', 'GET', url, headers=self.headers, params=params, timeout=30)
+                
+                # 添加详细的响应日志
+                logging.info(f"URL {url} 响应状态码: {response.status_code}")
+                
+                # 对于200响应，处理结果
+                if response.status_code == 200:
+                    result = self._normalize_query_result(response.json())
+                    
+                    # 添加更详细的日志记录
+                    task_status = result.get('status')
+                    video_url = result.get('video_url', 'None')
+                    thumbnail_url = result.get('thumbnail_url', 'None')
+                    
+                    # 日志记录
+                    logging.info(f"任务状态查询结果 - ID: {task_id}, 状态: {task_status}")
+                    if video_url:
+                        logging.info(f"视频URL: {video_url[:50]}...")
+                    if thumbnail_url:
+                        logging.info(f"缩略图URL: {thumbnail_url[:50]}...")
+                    
+                    # 记录完整响应以供调试
+                    logging.debug(f"完整响应数据: {json.dumps(result, ensure_ascii=False)}")
+                    self.endpoints.remember(api_root, 'query', path)
+                    return result
+                
+                # 如果是404，继续尝试下一个URL；缓存的路径返回404时清除缓存重新探测
+                elif response.status_code == 404:
+                    logging.warning(f"URL {url} 返回404错误，尝试下一个URL")
+                    if path == cached_path:
+                        self.endpoints.invalidate(api_root, 'query')
+                    continue
+                
+                # 其他错误状态码
+                else:
+                    logging.error(f"URL {url} 返回错误状态码: {response.status_code}")
+                    try:
+                        error_content = response.json()
+                        logging.error(f"错误详情: {error_content}")
+                    except:
+                        logging.error(f"响应内容: {response.text[:200]}...")
+                    # 缓存的路径是已知可用的，其他错误说明是服务端问题，不再浪费请求尝试其他路径
+                    if path == cached_path:
+                        raise requests.exceptions.HTTPError(
+                            f"查询任务失败，状态码: {response.status_code}", response=response)
+                    # 继续尝试下一个URL
+                    continue
+                    
+            except (requests.exceptions.HTTPError, CircuitOpenError):
+                raise
+            except requests.exceptions.RequestException as e:
+                error_message = f"URL {url} 请求异常: {str(e)}"
+                logging.error(error_message)
+                if path == cached_path:
+                    raise
+                # 继续尝试下一个URL
+                continue
+        
+        # 所有URL都失败
+        error_message = f"所有查询URL都尝试失败: {url_candidates}"
+        logging.error(error_message)
+        raise Exception(error_message)
+    
+    @staticmethod
+    def _parse_upload_result(result, url_field='url'):
+        """从图床响应中提取图片URL"""
+        logging.debug(f"解析后的JSON响应: {result}")
+        
+        # 检查响应格式是否正确
+        image_url = extract_field(result, url_field)
+        if not image_url:
+            error_message = f"无效的响应格式，缺少'{url_field}'字段: {result}"
+            logging.error(error_message)
+            raise ValueError(error_message)
+        
+        logging.info(f"图片上传成功，获取到URL: {image_url}")
+        return image_url
+    
+    def _cached_upload_url(self, digest):
+        """返回可复用的已上传URL，开启校验时先用HEAD请求确认URL仍可访问"""
+        image_url = self.upload_cache.get(digest)
+        if not image_url or not self.upload_cache_config['validate']:
+            return image_url
+        try:
+            response = self.http.request('HEAD', image_url, timeout=10, allow_redirects=True)
+            response.close()
+            if response.status_code < 400:
+                return image_url
+            logging.info(f"缓存的图片URL已失效 ({response.status_code})，重新上传: {image_url}")
+        except requests.exceptions.RequestException as e:
+            logging.info(f"校验缓存的图片URL失败，重新上传: {e}")
+        self.upload_cache.discard(digest)
+        return None
+
+    def _upload_cache_key(self, digest):
+        """上传缓存的键：上传后端的命名空间加文件内容摘要"""
+        namespace = self.uploader.cache_namespace
+        return f"{namespace}|{digest}" if namespace else digest
+
+    def upload_file(self, file_path, progress=None, cancel_event=None):
+        """上传文件到配置的上传后端，返回图片URL
+
+        相同内容的文件在缓存有效期内直接返回上次上传得到的URL。
+        请求体按块流式发送，progress(已发送字节数, 总字节数)报告进度，
+        设置cancel_event可在发送途中取消（抛出UploadCancelled）。
+        """
+        # 确保文件存在
+        if not os.path.exists(file_path):
+            error_message = f"文件不存在: {file_path}"
+            logging.error(error_message)
+            raise FileNotFoundError(error_message)
+        
+        if not self.upload_cache_config['enabled']:
+            return self._upload_file(file_path, progress, cancel_event)
+        
+        digest = self._upload_cache_key(UploadCache.file_digest(file_path))
+        with self.upload_cache.lock_for(digest):
+            image_url = self._cached_upload_url(digest)
+            if image_url:
+                logging.info(f"图片内容已上传过，复用URL: {file_path} -> {image_url}")
+                return image_url
+            image_url = self._upload_file(file_path, progress, cancel_event)
+            self.upload_cache.put(digest, image_url, os.path.getsize(file_path))
+            return image_url
+    
+    def _upload_file(self, file_path, progress=None, cancel_event=None):
+        try:
+            return self.uploader.upload(file_path, progress, cancel_event)
+        except json.JSONDecodeError as e:
+            error_message = f"无法将上传响应解析为JSON: {e}"
+            logging.error(error_message)
+            raise
+        except UploadCancelled:
+            logging.info(f"上传已取消: {file_path}")
+            raise
+        except requests.exceptions.RequestException as e:
+            error_message = f"上传文件失败: {e}"
+            if hasattr(e, 'response') and e.response is not None:
+                error_message += f" - 响应内容: {e.response.text}"
+            logging.error(error_message)
+            raise
+        except Exception as e:
+            logging.error(f"上传过程中发生未知错误: {e}")
+            raise
+
+class AsyncSoraVideoGenerator:
+    """SoraVideoGenerator的asyncio接口
+
+    create_video / query_task / upload_file与同步客户端一致。请求仍由同步客户端发出，
+    经过提交记录、自适应并发、限流、重试和熔断；协程在独立的线程池中等待结果，不阻塞事件循环。
+    全局信号量限制同时进行中的请求数，每个主机（上传按后端区分）另有单独的上限。
+    """
+
+    def __init__(self, generator, max_concurrency=64, limit_per_host=32):
+        self.generator = generator
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.limit_per_host = max(1, min(int(limit_per_host), self.max_concurrency))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="sora-async")
+        self._lock = threading.Lock()
+        # 信号量属于创建它们的事件循环，首次在循环中使用时创建
+        self._loop = None
+        self._semaphore = None
+        self._host_semaphores = {}
+        self._stats = {'requests': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+    def _limits(self, host):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not loop:
+                self._loop = loop
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._host_semaphores = {}
+            host_semaphore = self._host_semaphores.get(host)
+            if host_semaphore is None:
+                host_semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.limit_per_host)
+            return self._semaphore, host_semaphore
+
+    async def _call(self, host, func, *args, **kwargs):
+        semaphore, host_semaphore = self._limits(host)
+        # 先取主机名额再取全局名额，等待某个主机时不占用其他主机可用的全局名额
+        async with host_semaphore:
+            async with semaphore:
+                with self._lock:
+                    self._stats['requests'] += 1
+                    self._stats['in_flight'] += 1
+                    self._stats['max_in_flight'] = max(self._stats['max_in_flight'], self._stats['in_flight'])
+                try:
+                    return await asyncio.get_running_loop().run_in_executor(
+                        self._executor, functools.partial(func, *args, **kwargs)
+                    )
+                finally:
+                    with self._lock:
+                        self._stats['in_flight'] -= 1
+
+    def _api_host(self):
+        return urllib.parse.urlsplit(self.generator._api_root()).netloc
+
+    async def create_video(self, prompt, model="sora-2", orientation="portrait",
+                           size="large", duration=15, images=None, submission_key=None):
+        """创建视频任务，参数和返回值与SoraVideoGenerator.create_video相同"""
+        return await self._call(self._api_host(), self.generator.create_video, prompt, model=model,
+                                orientation=orientation, size=size, duration=duration, images=images,
+                                submission_key=submission_key)
+
+    async def query_task(self, task_id):
+        """查询任务状态"""
+        return await self._call(self._api_host(), self.generator.query_task, task_id)
+
+    async def upload_file(self, file_path, progress=None, cancel_event=None):
+        """上传文件到配置的上传后端，返回图片URL"""
+        return await self._call(f"upload:{self.generator.uploader.name}", self.generator.upload_file,
+                                file_path, progress, cancel_event)
+
+    async def create_many(self, task_infos):
+        """并发提交多个任务，返回与输入顺序一致的结果列表（失败项为异常对象）"""
+        return await asyncio.gather(*(self.create_video(**task_info) for task_info in task_infos),
+                                    return_exceptions=True)
+
+    async def query_many(self, task_ids, limit=None):
+        """并发查询多个任务，返回与输入顺序一致的结果列表（失败项为异常对象）
+
+        limit限制本次调用同时进行中的查询数（如轮询并发数），不影响其他调用。
+        """
+        if not limit:
+            return await asyncio.gather(*(self.query_task(task_id) for task_id in task_ids), return_exceptions=True)
+        semaphore = asyncio.Semaphore(max(1, int(limit)))
+
+        async def query(task_id):
+            async with semaphore:
+                return await self.query_task(task_id)
+        return await asyncio.gather(*(query(task_id) for task_id in task_ids), return_exceptions=True)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        """释放线程池，进行中的请求由同步客户端的连接池关闭时结束"""
+        self._executor.shutdown(wait=False)
+
+
+class AsyncBridge(QObject):
+    """asyncio事件循环与Qt之间的桥接
+
+    事件循环运行在后台线程中，协程不会阻塞GUI线程。工作线程用run()等待协程结果；
+    submit()的回调callback(result, error)通过信号回到GUI线程执行，可以直接更新界面。
+    """
+
+    _result_ready = pyqtSignal(object, object, object)
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        """进程内共用的桥接实例"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        app = QCoreApplication.instance()
+        if parent is None and app is not None and QThread.currentThread() != app.thread():
+            # 回调要在GUI线程中执行，在工作线程中创建时移到GUI线程
+            self.moveToThread(app.thread())
+        self._result_ready.connect(self._dispatch)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="sora-asyncio", daemon=True)
+        self._thread.start()
+
+    def run(self, coro, timeout=None):
+        """执行协程并等待结果，只能在工作线程中调用（在GUI线程中调用会卡住界面）"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def submit(self, coro, callback=None):
+        """调度协程执行并返回concurrent.futures.Future，callback(result, error)在GUI线程中被调用"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if callback is not None:
+            future.add_done_callback(lambda f: self._on_done(f, callback))
+        return future
+
+    def _on_done(self, future, callback):
+        result, error = None, None
+        try:
+            result = future.result()
+        except BaseException as e:
+            error = e
+        self._result_ready.emit(callback, result, error)
+
+    @pyqtSlot(object, object, object)
+    def _dispatch(self, callback, result, error):
+        try:
+            callback(result, error)
+        except Exception as e:
+            logging.error(f"异步任务回调出错: {str(e)}", exc_info=True)
+
+    def shutdown(self):
+        """停止后台事件循环"""
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_MISSING = object()
+
+
+class TaskRecord(Mapping):
+    """某一版本任务数据的只读快照
+
+    常用字段存放在__slots__中，不为每个任务创建dict；状态、类型、模型等取值很少的字段
+    使用sys.intern，所有任务共用同一个字符串对象；不常见的字段放在_extra中。
+    支持dict的读取方式（get、[]、in），不能修改；需要修改时用to_dict()取得副本，
+    再通过TaskRegistry写回。原始API响应不在记录中，需要时用TaskRegistry.raw_result读取。
+    """
+
+    FIELDS = ('id', 'type', 'status', 'model', 'orientation', 'size', 'duration', 'prompt',
+              'created_time', 'video_url', 'thumbnail_url', 'error', 'error_message',
+              'image', 'image_path', 'image_url', 'auto_downloaded', 'submission_key')
+    INTERNED_FIELDS = frozenset(('type', 'status', 'model', 'orientation', 'size'))
+    __slots__ = FIELDS + ('_extra', 'version')
+    _FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self, data, version=0):
+        extra = None
+        for key, value in data.items():
+            if key in self.INTERNED_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            if key in self._FIELD_SET:
+                object.__setattr__(self, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        object.__setattr__(self, '_extra', extra)
+        object.__setattr__(self, 'version', version)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TaskRecord是只读的，请通过TaskRegistry修改任务")
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            value = getattr(self, key, _MISSING)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"TaskRecord({self.get('id')!r}, version={self.version})"
+
+    def to_dict(self):
+        """返回可修改的深拷贝"""
+        return copy.deepcopy({key: self[key] for key in self})
+
+
+class TaskRepository:
+    """基于SQLite（WAL模式）的任务存储
+
+    常用的筛选字段单独成列并建立索引，完整的任务数据以JSON保存在data列中。
+    每次状态变化只更新对应的一行，历史任务数量不再受限。
+    每行带有版本号，每次更新加1，读取结果为带版本号的只读快照（TaskRecord）。
+    体积较大的原始API响应（raw_result）压缩后存放在task_raw表中，只在查看任务详情时读取。
+    提示词和错误信息另建FTS5全文索引（trigram分词，支持中文子串搜索），
+    当前SQLite不支持FTS5时退化为LIKE查询。
+    """
+
+    # 单独成列的字段，其余字段只保存在data中
+    COLUMNS = ('id', 'type', 'status', 'model', 'orientation', 'size', 'duration',
+               'prompt', 'created_time', 'video_url', 'error')
+    # 不放在data中、单独压缩保存的字段
+    RAW_FIELD = 'raw_result'
+    # 未结束任务的筛选条件，与部分索引idx_tasks_active的条件保持一致
+    ACTIVE_WHERE = "status NOT IN (%s)" % ', '.join(f"'{status}'" for status in TERMINAL_TASK_STATUSES)
+    # 列表支持的排序方式，按插入顺序（seq）代表创建时间
+    ORDER_BY = {
+        'newest': 'seq DESC',
+        'oldest': 'seq ASC',
+        'status': 'status ASC, seq DESC'
+    }
+
+    def __init__(self, path=TASKS_DB_FILE):
+        self.path = path
+        self.fts_enabled = False
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_schema()
+
+    def _create_schema(self):
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                type TEXT,
+                status TEXT,
+                model TEXT,
+                orientation TEXT,
+                size TEXT,
+                duration INTEGER,
+                prompt TEXT,
+                created_time TEXT,
+                video_url TEXT,
+                error TEXT,
+                data TEXT NOT NULL,
+                updated_at REAL,
+                version INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
+            CREATE INDEX IF NOT EXISTS idx_tasks_type ON tasks(type);
+            CREATE INDEX IF NOT EXISTS idx_tasks_model ON tasks(model);
+            CREATE INDEX IF NOT EXISTS idx_tasks_orientation ON tasks(orientation);
+            CREATE INDEX IF NOT EXISTS idx_tasks_created_time ON tasks(created_time);
+            CREATE INDEX IF NOT EXISTS idx_tasks_status_seq ON tasks(status, seq DESC);
+            CREATE TABLE IF NOT EXISTS task_raw (
+                id TEXT PRIMARY KEY,
+                data BLOB NOT NULL
+            );
+            CREATE TRIGGER IF NOT EXISTS task_raw_delete AFTER DELETE ON tasks BEGIN
+                DELETE FROM task_raw WHERE id = old.id;
+            END;
+        """)
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if 'version' not in columns:
+            # 旧版数据库没有版本号列
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_active ON tasks(seq) WHERE {self.ACTIVE_WHERE}")
+        self._conn.commit()
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            self._move_raw_results()
+            self._conn.execute("PRAGMA user_version = 1")
+        self._create_fts()
+
+    def _move_raw_results(self):
+        """把旧版数据中内嵌的原始响应移到task_raw表"""
+        rows = self._conn.execute(
+            "SELECT id, data FROM tasks WHERE data LIKE ?", (f'%"{self.RAW_FIELD}"%',)
+        ).fetchall()
+        tasks = [json.loads(row['data']) for row in rows]
+        tasks = [task for task in tasks if self.RAW_FIELD in task]
+        if tasks:
+            with self._conn:
+                self._write_raw(tasks)
+                self._conn.executemany(
+                    "UPDATE tasks SET data = ? WHERE id = ?",
+                    [(self._data_json(task), task['id']) for task in tasks]
+                )
+            logging.info(f"已把 {len(tasks)} 个任务的原始响应移到task_raw表")
+
+    def _create_fts(self):
+        """创建提示词和错误信息的全文索引，并用触发器与tasks表保持同步"""
+        try:
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+            ).fetchone()
+            self._conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+                    prompt, error, content='tasks', content_rowid='seq', tokenize='trigram'
+                );
+                CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+                    INSERT INTO tasks_fts(rowid, prompt, error) VALUES (new.seq, new.prompt, new.error);
+                END;
+                CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+                    INSERT INTO tasks_fts(tasks_fts, rowid, prompt, error) VALUES ('delete', old.seq, old.prompt, old.error);
+                END;
+                CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF prompt, error ON tasks BEGIN
+                    INSERT INTO tasks_fts(tasks_fts, rowid, prompt, error) VALUES ('delete', old.seq, old.prompt, old.error);
+                    INSERT INTO tasks_fts(rowid, prompt, error) VALUES (new.seq, new.prompt, new.error);
+                END;
+            """)
+            if not exists:
+                # 已有数据的数据库首次建立全文索引
+                self._conn.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+            self._conn.commit()
+            self.fts_enabled = True
+        except sqlite3.Error as e:
+            logging.warning(f"当前SQLite不支持FTS5全文索引，提示词搜索将使用LIKE查询: {e}")
+
+    def _where(self, filters):
+        """把筛选条件转换为WHERE子句和参数
+
+        filters支持的键：status（'active'表示所有未结束的任务）、type、model、orientation、
+        date_from/date_to（'YYYY-MM-DD'，包含两端）、text（提示词和错误信息全文搜索）。
+        """
+        clauses, params = [], []
+        filters = filters or {}
+        status = filters.get('status')
+        if status == 'active':
+            clauses.append(self.ACTIVE_WHERE)
+        elif status:
+            clauses.append("status = ?")
+            params.append(status)
+        for column in ('type', 'model', 'orientation'):
+            if filters.get(column):
+                clauses.append(f"{column} = ?")
+                params.append(filters[column])
+        if filters.get('date_from'):
+            clauses.append("created_time >= ?")
+            params.append(f"{filters['date_from']} 00:00:00")
+        if filters.get('date_to'):
+            clauses.append("created_time <= ?")
+            params.append(f"{filters['date_to']} 23:59:59")
+        text = (filters.get('text') or '').strip()
+        if text:
+            # trigram分词至少需要3个字符，更短的关键词使用LIKE
+            if self.fts_enabled and len(text) >= 3:
+                clauses.append("seq IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)")
+                params.append('"' + text.replace('"', '""') + '"')
+            else:
+                clauses.append("(prompt LIKE ? ESCAPE '\\' OR error LIKE ? ESCAPE '\\')")
+                pattern = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                params.extend([pattern, pattern])
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    @classmethod
+    def _row_values(cls, task):
+        values = []
+        for column in cls.COLUMNS:
+            value = task.get(column)
+            if column == 'error':
+                # 查询接口返回的失败原因保存在error_message中，一起纳入搜索
+                value = value or task.get('error_message')
+            if column == 'error' and value is not None and not isinstance(value, str):
+                value = json.dumps(value, ensure_ascii=False)
+            values.append(value)
+        values.append(cls._data_json(task))
+        values.append(time.time())
+        return values
+
+    @classmethod
+    def _data_json(cls, task):
+        if cls.RAW_FIELD in task:
+            task = {key: value for key, value in task.items() if key != cls.RAW_FIELD}
+        return json.dumps(task, ensure_ascii=False)
+
+    def _write_raw(self, tasks):
+        rows = [
+            (task['id'], zlib.compress(json.dumps(task[self.RAW_FIELD], ensure_ascii=False).encode('utf-8')))
+            for task in tasks if task.get(self.RAW_FIELD) is not None
+        ]
+        if rows:
+            self._conn.executemany("INSERT OR REPLACE INTO task_raw (id, data) VALUES (?, ?)", rows)
+
+    def upsert_many(self, tasks):
+        """按任务ID插入或更新多行，在一个事务中完成，返回新插入（而不是覆盖）的任务数"""
+        tasks = [task for task in tasks if task.get('id')]
+        if not tasks:
+            return 0
+        columns = self.COLUMNS + ('data', 'updated_at')
+        placeholders = ', '.join('?' for _ in columns)
+        updates = ', '.join(f"{column}=excluded.{column}" for column in columns if column != 'id')
+        sql = (f"INSERT INTO tasks ({', '.join(columns)}) VALUES ({placeholders}) "
+               f"ON CONFLICT(id) DO UPDATE SET {updates}, version=tasks.version + 1")
+        task_ids = list(dict.fromkeys(task['id'] for task in tasks))
+        with self._lock:
+            with self._conn:
+                existing = 0
+                for start in range(0, len(task_ids), 500):
+                    chunk = task_ids[start:start + 500]
+                    existing += self._conn.execute(
+                        f"SELECT COUNT(*) FROM tasks WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+                    ).fetchone()[0]
+                self._conn.executemany(sql, [self._row_values(task) for task in tasks])
+                self._write_raw(tasks)
+        return len(task_ids) - existing
+
+    def upsert(self, task):
+        return self.upsert_many([task])
+
+    @staticmethod
+    def _snapshot(row):
+        return TaskRecord(json.loads(row['data']), row['version'])
+
+    def delete(self, task_id):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM tasks")
+
+    def count(self, filters=None):
+        where, params = self._where(filters)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM tasks{where}", params).fetchone()[0]
+
+    def load_all(self):
+        """按添加顺序返回所有任务"""
+        with self._lock:
+            rows = self._conn.execute("SELECT data, version FROM tasks ORDER BY seq").fetchall()
+        return [self._snapshot(row) for row in rows]
+
+    def load_active(self):
+        """返回所有未结束的任务（走部分索引，不扫描历史任务）"""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT data, version FROM tasks WHERE {self.ACTIVE_WHERE} ORDER BY seq").fetchall()
+        return [self._snapshot(row) for row in rows]
+
+    def page(self, order, offset, limit, filters=None):
+        """按排序方式和筛选条件返回一页任务，结果为 (seq, 任务) 列表
+
+        先只在索引上定位这一页的seq，再读取这些行的数据，翻到很深的页时也不必读取前面各行的data。
+        """
+        where, params = self._where(filters)
+        sql = f"SELECT seq FROM tasks{where} ORDER BY {self.ORDER_BY[order]} LIMIT ? OFFSET ?"
+        with self._lock:
+            seqs = [row['seq'] for row in self._conn.execute(sql, params + [limit, offset])]
+            if not seqs:
+                return []
+            rows = self._conn.execute(
+                f"SELECT seq, data, version FROM tasks WHERE seq IN ({', '.join('?' for _ in seqs)})", seqs
+            ).fetchall()
+        rows_by_seq = {row['seq']: row for row in rows}
+        return [(seq, self._snapshot(rows_by_seq[seq])) for seq in seqs if seq in rows_by_seq]
+
+    def find(self, filters=None):
+        """返回符合筛选条件的所有任务（批量操作使用），按添加顺序排列"""
+        where, params = self._where(filters)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT data, version FROM tasks{where} ORDER BY seq", params).fetchall()
+        return [self._snapshot(row) for row in rows]
+
+    def get_many(self, task_ids):
+        """按任务ID批量读取，返回 {任务ID: 任务快照}"""
+        task_ids = [task_id for task_id in task_ids if task_id]
+        result = {}
+        with self._lock:
+            # SQLite单条语句的参数个数有限，分批查询
+            for start in range(0, len(task_ids), 500):
+                chunk = task_ids[start:start + 500]
+                sql = f"SELECT data, version FROM tasks WHERE id IN ({', '.join('?' for _ in chunk)})"
+                for row in self._conn.execute(sql, chunk):
+                    task = self._snapshot(row)
+                    result[task.get('id')] = task
+        return result
+
+    def raw_result(self, task_id):
+        """读取并解压任务的原始API响应，没有时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM task_raw WHERE id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(row['data']).decode('utf-8'))
+        except (zlib.error, ValueError) as e:
+            logging.warning(f"读取任务 {task_id} 的原始响应失败: {e}")
+            return None
+
+    def seq_of(self, task_id):
+        """任务的序号（添加顺序），不存在时返回0"""
+        with self._lock:
+            row = self._conn.execute("SELECT seq FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return row['seq'] if row else 0
+
+    def exists(self, task_id):
+        return self.seq_of(task_id) > 0
+
+    def migrate_json(self, json_path):
+        """首次启动时导入旧版的JSON任务文件，导入后把原文件重命名为.migrated"""
+        if not os.path.exists(json_path) or self.count() > 0:
+            return 0
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                tasks = json.load(f)
+            if not isinstance(tasks, list):
+                return 0
+            self.upsert_many(tasks)
+            os.replace(json_path, json_path + '.migrated')
+            logging.info(f"已从 {json_path} 迁移 {len(tasks)} 个任务到 {self.path}")
+            return len(tasks)
+        except Exception as e:
+            logging.error(f"迁移任务文件失败: {e}")
+            return 0
+
+    def sync(self):
+        """执行WAL检查点，把已提交的数据同步到磁盘（空闲时调用）"""
+        try:
+            with self._lock:
+                self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        except sqlite3.Error as e:
+            logging.warning(f"任务数据库检查点失败: {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TaskRegistry:
+    """任务注册表：所有线程对任务的写入都经过这里
+
+    写操作由一把锁串行执行，任务按ID寻址而不是按界面上的行号；
+    读操作返回带版本号的只读快照（TaskRecord），界面拿到的数据不会被其他线程修改。
+    """
+
+    def __init__(self, repository):
+        self.repository = repository
+        self._write_lock = threading.RLock()
+        self._version = 0  # 每次写入加1
+
+    @property
+    def version(self):
+        return self._version
+
+    def add_many(self, tasks):
+        """添加新任务（ID已存在时覆盖），返回新插入的任务数"""
+        tasks = [dict(task) for task in tasks if task and task.get('id')]
+        if not tasks:
+            return 0
+        with self._write_lock:
+            inserted = self.repository.upsert_many(tasks)
+            self._version += 1
+        return inserted
+
+    def apply_updates(self, changes):
+        """把 {任务ID: 变化的字段} 合并到最新的任务数据上，返回更新后的快照列表
+
+        合并在写锁内基于数据库中的最新数据进行，不会覆盖其他线程同时写入的字段；
+        已被删除的任务直接跳过，不会被查询结果重新写回。
+        """
+        changes = {task_id: delta for task_id, delta in changes.items() if task_id and delta}
+        if not changes:
+            return []
+        with self._write_lock:
+            current = self.repository.get_many(list(changes))
+            merged = []
+            for task_id, delta in changes.items():
+                snapshot = current.get(task_id)
+                if snapshot is None:
+                    logging.info(f"任务 {task_id[:8]}... 已被删除，忽略本次更新")
+                    continue
+                task = snapshot.to_dict()
+                task.update(delta)
+                merged.append(task)
+            if not merged:
+                return []
+            self.repository.upsert_many(merged)
+            self._version += 1
+            latest = self.repository.get_many([task['id'] for task in merged])
+        return [latest[task['id']] for task in merged if task['id'] in latest]
+
+    def delete(self, task_id):
+        with self._write_lock:
+            self.repository.delete(task_id)
+            self._version += 1
+
+    def clear(self):
+        with self._write_lock:
+            self.repository.clear()
+            self._version += 1
+
+    def migrate_json(self, json_path):
+        with self._write_lock:
+            count = self.repository.migrate_json(json_path)
+            if count:
+                self._version += 1
+            return count
+
+    def get(self, task_id):
+        return self.repository.get_many([task_id]).get(task_id)
+
+    def get_many(self, task_ids):
+        return self.repository.get_many(task_ids)
+
+    def page(self, order, offset, limit, filters=None):
+        return self.repository.page(order, offset, limit, filters)
+
+    def count(self, filters=None):
+        return self.repository.count(filters)
+
+    def find(self, filters=None):
+        return self.repository.find(filters)
+
+    def load_active(self):
+        return self.repository.load_active()
+
+    def raw_result(self, task_id):
+        return self.repository.raw_result(task_id)
+
+    def seq_of(self, task_id):
+        return self.repository.seq_of(task_id)
+
+    def exists(self, task_id):
+        return self.repository.exists(task_id)
+
+    def sync(self):
+        self.repository.sync()
+
+
+class PollScheduler:
+    """任务状态轮询调度器
+
+    只跟踪未结束的任务，按下次查询时间放在优先队列中。查询间隔根据任务年龄和
+    该模型、时长的预计生成时间决定：预计完成前稀疏查询，接近预计完成时按最小间隔查询，
+    超时后按指数退避放慢。已结束的任务只在用户明确要求时重新查询。
+    """
+
+    TERMINAL_STATUSES = frozenset(TERMINAL_TASK_STATUSES)
+    # 本地生成的占位任务ID，服务端不存在，不需要查询
+    LOCAL_ID_PREFIXES = ('failed_', 'local_')
+
+    def __init__(self, min_interval=10.0, max_interval=120.0, expected_seconds=None):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.expected_seconds = expected_seconds or {}
+        self._lock = threading.Lock()
+        self._heap = []
+        self._versions = {}
+        self._forced = set()
+        self._seq = itertools.count()
+
+    @classmethod
+    def from_config(cls, network_config):
+        polling = merge_network_config(network_config)['polling']
+        return cls(polling['min_interval'], polling['max_interval'], polling['expected_seconds'])
+
+    @classmethod
+    def is_terminal(cls, task):
+        return task.get('status') in cls.TERMINAL_STATUSES
+
+    @classmethod
+    def is_pollable(cls, task):
+        task_id = task.get('id') or ''
+        return bool(task_id) and not task_id.startswith(cls.LOCAL_ID_PREFIXES)
+
+    def expected_for(self, task):
+        """该任务的预计生成耗时（秒）"""
+        base = self.expected_seconds.get(task.get('model'), max(self.expected_seconds.values() or [180.0]))
+        try:
+            duration = int(task.get('duration') or 10)
+        except (TypeError, ValueError):
+            duration = 10
+        return base * max(duration, 1) / 10.0
+
+    @staticmethod
+    def task_age(task, now=None):
+        """任务创建至今的秒数，无法解析创建时间时返回0"""
+        try:
+            created = datetime.strptime(task.get('created_time', ''), "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            return 0.0
+        return max(0.0, (now or time.time()) - created.timestamp())
+
+    def next_interval(self, task, now=None):
+        """根据任务年龄计算距下次查询的秒数"""
+        age = self.task_age(task, now)
+        expected = self.expected_for(task)
+        if age < expected * 0.5:
+            # 离预计完成还早，等到预计耗时的一半再开始密集查询
+            interval = expected * 0.5 - age
+        elif age < expected * 1.5:
+            interval = self.min_interval
+        else:
+            # 超过预计时间仍未完成，逐步放慢查询
+            overdue = (age - expected * 1.5) / max(expected, 1.0)
+            interval = self.min_interval * (2 ** min(overdue, 16))
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def track(self, task, now=None):
+        """加入或重新安排任务，已结束或本地占位的任务会被移出队列"""
+        task_id = task.get('id')
+        if not self.is_pollable(task) or self.is_terminal(task):
+            self.untrack(task_id)
+            return
+        now = now or time.time()
+        due = now + self.next_interval(task, now)
+        with self._lock:
+            version = self._versions.get(task_id, 0) + 1
+            self._versions[task_id] = version
+            heapq.heappush(self._heap, (due, next(self._seq), task_id, version))
+
+    def untrack(self, task_id):
+        with self._lock:
+            self._versions.pop(task_id, None)
+            self._forced.discard(task_id)
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+            self._versions.clear()
+            self._forced.clear()
+
+    def request(self, task_ids):
+        """明确要求在下一轮查询这些任务（包括已结束的任务）"""
+        with self._lock:
+            self._forced.update(task_id for task_id in task_ids if task_id)
+
+    def request_all_active(self):
+        """让所有未结束的任务在下一轮立即查询"""
+        with self._lock:
+            self._forced.update(self._versions)
+
+    def pop_due(self, now=None):
+        """取出到期需要查询的任务ID，调用方查询后应对每个任务重新调用track"""
+        now = now or time.time()
+        due_ids = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, task_id, version = heapq.heappop(self._heap)
+                # 任务被重新安排或移除后，旧的堆条目直接丢弃
+                if self._versions.get(task_id) == version:
+                    due_ids.append(task_id)
+            for task_id in self._forced:
+                if task_id not in due_ids:
+                    due_ids.append(task_id)
+            self._forced.clear()
+        return due_ids
+
+    @property
+    def active_count(self):
+        with self._lock:
+            return len(self._versions)
+
+
+class SingleFlightWorker:
+    """常驻的单飞工作线程
+
+    trigger()只设置一个待执行标记：执行期间或等待期间的多次触发会合并成一次，
+    同一时间最多只有一轮在执行。记录每轮耗时和被合并的触发次数。
+    """
+
+    def __init__(self, name, target):
+        self.name = name
+        self.target = target
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._pending = False
+        self._running = False
+        self._stats = {'sweeps': 0, 'skipped_ticks': 0, 'last_duration': 0.0, 'max_duration': 0.0, 'total_duration': 0.0}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        """请求执行一轮；已有待执行或正在执行的轮次时合并，返回是否被合并"""
+        with self._lock:
+            coalesced = self._pending or self._running
+            if coalesced:
+                self._stats['skipped_ticks'] += 1
+            self._pending = True
+        self._wakeup.set()
+        return coalesced
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    @property
+    def busy(self):
+        with self._lock:
+            return self._running
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            if self._stopped:
+                return
+            with self._lock:
+                if not self._pending:
+                    continue
+                self._pending = False
+                self._running = True
+            started = time.monotonic()
+            try:
+                self.target()
+            except Exception as e:
+                logging.error(f"[{self.name}] 执行出错: {str(e)}", exc_info=True)
+            finally:
+                duration = time.monotonic() - started
+                with self._lock:
+                    self._running = False
+                    self._stats['sweeps'] += 1
+                    self._stats['last_duration'] = duration
+                    self._stats['max_duration'] = max(self._stats['max_duration'], duration)
+                    self._stats['total_duration'] += duration
+                    stats = dict(self._stats)
+                logging.info(
+                    f"[{self.name}] 第 {stats['sweeps']} 轮完成，耗时 {duration:.2f} 秒，"
+                    f"平均 {stats['total_duration'] / stats['sweeps']:.2f} 秒，最长 {stats['max_duration']:.2f} 秒，"
+                    f"合并的触发 {stats['skipped_ticks']} 次"
+                )
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_duration'] = stats['total_duration'] / stats['sweeps'] if stats['sweeps'] else 0.0
+        return stats
+
+
+class StagedPipeline:
+    """多阶段流水线
+
+    stages为 [(阶段名, 处理函数, 并发数)]，相邻阶段之间用有界队列连接，每个阶段有各自的工作线程。
+    一项在某个阶段处理完后立即进入下一阶段，不必等同批的其他项；下游队列满时上游阻塞（背压）。
+    整批耗时取决于最慢的阶段，而不是各阶段耗时之和。
+    """
+
+    _STOP = object()
+
+    def __init__(self, name, stages, queue_size=16):
+        self.name = name
+        self.stages = [(stage_name, func, max(1, int(concurrency))) for stage_name, func, concurrency in stages]
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._stats = {stage_name: {'items': 0, 'errors': 0, 'busy': 0.0} for stage_name, _, _ in self.stages}
+
+    def run(self, items, on_item_done=None):
+        """处理所有项并阻塞到全部完成，返回与输入顺序一致的结果列表（失败项为异常对象）
+
+        on_item_done(序号, 结果或异常) 在某一项走完流水线或中途失败时调用（在工作线程中）。
+        """
+        items = list(items)
+        results = [None] * len(items)
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        started = time.monotonic()
+
+        def finish(index, outcome):
+            results[index] = outcome
+            if on_item_done:
+                try:
+                    on_item_done(index, outcome)
+                except Exception as e:
+                    logging.error(f"[{self.name}] 进度回调出错: {str(e)}", exc_info=True)
+
+        def worker(stage_index):
+            stage_name, func, _ = self.stages[stage_index]
+            inbox = queues[stage_index]
+            while True:
+                entry = inbox.get()
+                if entry is self._STOP:
+                    return
+                index, value = entry
+                stage_started = time.monotonic()
+                try:
+                    value = func(value)
+                except Exception as e:
+                    with self._lock:
+                        self._stats[stage_name]['errors'] += 1
+                        self._stats[stage_name]['busy'] += time.monotonic() - stage_started
+                    logging.error(f"[{self.name}] 第 {index + 1} 项在{stage_name}阶段失败: {str(e)}")
+                    finish(index, e)
+                    continue
+                with self._lock:
+                    self._stats[stage_name]['items'] += 1
+                    self._stats[stage_name]['busy'] += time.monotonic() - stage_started
+                if stage_index + 1 < len(self.stages):
+                    queues[stage_index + 1].put((index, value))
+                else:
+                    finish(index, value)
+
+        stage_threads = []
+        for stage_index, (stage_name, _, concurrency) in enumerate(self.stages):
+            threads = [
+                threading.Thread(target=worker, args=(stage_index,), name=f"{self.name}-{stage_name}-{n}", daemon=True)
+                for n in range(concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            stage_threads.append(threads)
+
+        for index, item in enumerate(items):
+            queues[0].put((index, item))
+        # 上游阶段的线程全部结束后，下游队列中不会再有新项，再通知下游阶段结束
+        for stage_index, threads in enumerate(stage_threads):
+            for _ in threads:
+                queues[stage_index].put(self._STOP)
+            for thread in threads:
+                thread.join()
+
+        self.log_stats(len(items), time.monotonic() - started)
+        return results
+
+    def log_stats(self, total, elapsed):
+        with self._lock:
+            stats = {stage_name: dict(values) for stage_name, values in self._stats.items()}
+        parts = []
+        for stage_name, _, concurrency in self.stages:
+            values = stats[stage_name]
+            handled = values['items'] + values['errors']
+            average = values['busy'] / handled if handled else 0.0
+            parts.append(f"{stage_name}({concurrency}线程) {values['items']}成功/{values['errors']}失败 平均{average:.2f}秒")
+        logging.info(f"[{self.name}] {total} 项完成，总耗时 {elapsed:.2f} 秒；" + "，".join(parts))
+
+
+class DownloadCancelled(Exception):
+    """下载被用户取消"""
+
+
+class DownloadJob:
+    """下载队列中的一项，由下载线程更新，界面只读取"""
+
+    __slots__ = ('id', 'task_id', 'url', 'save_path', 'priority', 'label', 'state', 'downloaded', 'total',
+                 'speed', 'error', 'attempts', 'queued_at', 'started_at', 'finished_at', 'cancel_event')
+
+    def __init__(self, job_id, task_id, url, save_path, priority, label):
+        self.id = job_id
+        self.task_id = task_id
+        self.url = url
+        self.save_path = save_path
+        self.priority = priority
+        self.label = label
+        self.state = 'queued'
+        self.downloaded = 0
+        self.total = 0
+        self.speed = 0.0
+        self.error = None
+        self.attempts = 0
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.state in DownloadManager.FINISHED_STATES
+
+    @property
+    def manual(self):
+        return self.priority == DownloadManager.PRIORITY_MANUAL
+
+
+class DownloadManager:
+    """视频下载队列
+
+    下载按(优先级, 入队顺序)排队，最多max_parallel个同时进行，手动下载排在自动下载之前。
+    每个下载先写入.part临时文件，完成后再改名，连接错误和超时会重试。
+    on_update(job)在下载线程中调用，用于把进度转交给界面；进度最多每PROGRESS_INTERVAL秒报告一次。
+    """
+
+    PRIORITY_MANUAL = 0
+    PRIORITY_AUTO = 1
+    PRIORITY_BULK = 2
+    FINISHED_STATES = frozenset(('completed', 'failed', 'cancelled'))
+    PROGRESS_INTERVAL = 0.25
+
+    def __init__(self, config=None, on_update=None, keep_alive=True):
+        config = config or merge_network_config(None)['download']
+        self.max_parallel = max(1, int(config['max_parallel']))
+        self.max_retries = max(1, int(config['max_retries']))
+        self.chunk_size = int(config['chunk_size'])
+        self.timeout = tuple(config['timeout'])
+        self.on_update = on_update
+        self.http = PooledHttpSession(pool_connections=4, pool_maxsize=int(config['pool_maxsize']), keep_alive=keep_alive)
+        self.http.session.headers['User-Agent'] = 'Mozilla/5.0'
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count(1)
+        self._jobs = OrderedDict()
+        self._active = 0
+        self._busy_since = None
+        self._stopped = False
+        self._stats = {'completed': 0, 'failed': 0, 'cancelled': 0, 'bytes': 0, 'busy_time': 0.0, 'max_parallel_seen': 0}
+        self._threads = [
+            threading.Thread(target=self._run, name=f"sora-download-{n}", daemon=True)
+            for n in range(self.max_parallel)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, task_id, url, save_path, priority=PRIORITY_AUTO, label=''):
+        """加入下载队列并返回DownloadJob；同一地址下载到同一路径的任务已在队列中时返回原任务
+
+        原任务还在排队且新请求的优先级更高（如自动下载排队时用户手动点了下载），按新的优先级提前。
+        """
+        with self._cond:
+            for job in self._jobs.values():
+                if not job.finished and job.url == url and job.save_path == save_path:
+                    if job.state == 'queued' and priority < job.priority:
+                        # 旧的堆条目留在堆中，取出时任务已不在排队状态，会被跳过
+                        job.priority = priority
+                        heapq.heappush(self._heap, (priority, job.id))
+                        self._cond.notify()
+                        logging.info(f"下载 #{job.id} 已在队列中，优先级提升为 {priority}")
+                    return job
+            job = DownloadJob(next(self._seq), task_id, url, save_path, priority,
+                              label or os.path.basename(save_path))
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (priority, job.id))
+            self._cond.notify()
+        logging.info(f"下载已加入队列 #{job.id}: {task_id[:8]}... -> {save_path}（优先级 {priority}）")
+        self._notify(job)
+        return job
+
+    def cancel(self, job_id):
+        """取消排队中或进行中的下载，返回是否找到未结束的下载"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return False
+            job.cancel_event.set()
+            if job.state == 'queued':
+                # 排队中的直接结束，下载线程取出时会跳过
+                self._finish(job, 'cancelled')
+        if job.state == 'cancelled':
+            self._notify(job)
+        return True
+
+    def clear_finished(self):
+        """移除已结束的下载记录，返回被移除的下载ID"""
+        with self._cond:
+            removed = [job_id for job_id, job in self._jobs.items() if job.finished]
+            for job_id in removed:
+                del self._jobs[job_id]
+        return removed
+
+    def jobs(self):
+        with self._cond:
+            return list(self._jobs.values())
+
+    def shutdown(self):
+        """取消所有未结束的下载并停止下载线程"""
+        with self._cond:
+            self._stopped = True
+            for job in self._jobs.values():
+                job.cancel_event.set()
+            self._cond.notify_all()
+        self.http.close()
+
+    def _notify(self, job):
+        if self.on_update:
+            try:
+                self.on_update(job)
+            except Exception as e:
+                logging.error(f"下载进度回调出错: {str(e)}", exc_info=True)
+
+    def _finish(self, job, state, error=None):
+        # 调用方持有self._cond
+        job.state = state
+        job.error = error
+        job.finished_at = time.time()
+        self._stats[state] += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and not self._heap:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                _, job_id = heapq.heappop(self._heap)
+                job = self._jobs.get(job_id)
+                if job is None or job.state != 'queued':
+                    continue
+                job.state = 'downloading'
+                job.started_at = time.time()
+                self._active += 1
+                self._stats['max_parallel_seen'] = max(self._stats['max_parallel_seen'], self._active)
+                if self._active == 1:
+                    self._busy_since = time.monotonic()
+            self._notify(job)
+            state, error = 'completed', None
+            try:
+                self._download(job)
+            except DownloadCancelled:
+                state = 'cancelled'
+            except Exception as e:
+                state, error = 'failed', str(e)
+                logging.error(f"下载失败 #{job.id}: {job.task_id[:8]}... - {error}")
+            with self._cond:
+                self._active -= 1
+                if self._active == 0 and self._busy_since is not None:
+                    self._stats['busy_time'] += time.monotonic() - self._busy_since
+                    self._busy_since = None
+                self._finish(job, state, error)
+                if state == 'completed':
+                    self._stats['bytes'] += job.downloaded
+            self._notify(job)
+            if state == 'completed':
+                elapsed = max(job.finished_at - job.started_at, 1e-6)
+                logging.info(f"视频下载成功 #{job.id}: {job.save_path} ({job.downloaded} 字节, {job.downloaded / elapsed / 1048576:.2f} MB/s)")
+                self.log_stats()
+
+    def _download(self, job):
+        partial_path = job.save_path + '.part'
+        os.makedirs(os.path.dirname(job.save_path) or '.', exist_ok=True)
+        try:
+            while True:
+                job.attempts += 1
+                try:
+                    self._fetch(job, partial_path)
+                    break
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    # 取消时正在进行的请求常以连接错误结束，应按取消处理而不是失败
+                    if job.cancel_event.is_set():
+                        raise DownloadCancelled(f"下载已取消: {job.save_path}") from e
+                    if job.attempts >= self.max_retries:
+                        raise
+                    logging.warning(f"下载超时或连接错误，正在重试 #{job.id} ({job.attempts}/{self.max_retries}): {str(e)}")
+                    if job.cancel_event.wait(2):
+                        raise DownloadCancelled(f"下载已取消: {job.save_path}")
+            os.replace(partial_path, job.save_path)
+        except BaseException:
+            # 重试耗尽、取消或其他失败都不保留未完成的临时文件
+            self._remove_partial(partial_path)
             raise
 
+    def _fetch(self, job, partial_path):
+        with self.http.request('GET', job.url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            job.total = int(response.headers.get('content-length', 0))
+            job.downloaded = 0
+            started = last_report = time.monotonic()
+            with open(partial_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if job.cancel_event.is_set():
+                        raise DownloadCancelled(f"下载已取消: {job.save_path}")
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    job.downloaded += len(chunk)
+                    now = time.monotonic()
+                    if now - last_report >= self.PROGRESS_INTERVAL:
+                        last_report = now
+                        job.speed = job.downloaded / max(now - started, 1e-6)
+                        self._notify(job)
+            job.speed = job.downloaded / max(time.monotonic() - started, 1e-6)
+        if job.total and job.downloaded < job.total:
+            raise requests.exceptions.ConnectionError(f"文件下载不完整，预期大小: {job.total}，实际大小: {job.downloaded}")
+
+    @staticmethod
+    def _remove_partial(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get_stats(self):
+        """汇总统计：busy_time为至少有一个下载在进行的总时长，throughput为这段时间内的平均速度（字节/秒）"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['busy_time'] += time.monotonic() - self._busy_since if self._busy_since is not None else 0.0
+            active = [job for job in self._jobs.values() if job.state == 'downloading']
+            stats['active'] = len(active)
+            stats['queued'] = sum(1 for job in self._jobs.values() if job.state == 'queued')
+            stats['current_speed'] = sum(job.speed for job in active)
+            stats['bytes_in_flight'] = sum(job.downloaded for job in active)
+        transferred = stats['bytes'] + stats['bytes_in_flight']
+        stats['throughput'] = transferred / stats['busy_time'] if stats['busy_time'] > 0 else 0.0
+        return stats
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logging.info(
+            f"下载统计: 完成 {stats['completed']} 个, 失败 {stats['failed']} 个, 取消 {stats['cancelled']} 个, "
+            f"共 {stats['bytes'] / 1048576:.1f} MB, 平均吞吐 {stats['throughput'] / 1048576:.2f} MB/s, "
+            f"最多同时下载 {stats['max_parallel_seen']} 个, 排队 {stats['queued']} 个"
+        )
+        return stats
+
+
 class TextToVideoTab(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -834,6 +3798,8 @@ class TextToVideoTab(QWidget):
                 "batch_index": i + 1
             }
             task_queue.append(task_info)
+        # 每次点击生成都是一个新批次，提交键只用于本批次内的安全重试
+        assign_submission_keys(task_queue, f"text:{datetime.now().strftime('%Y%m%d%H%M%S%f')}")
         
         # 开始生成
         self.generate_btn.setEnabled(False)
@@ -846,133 +3812,27 @@ class TextToVideoTab(QWidget):
             try:
                 QMetaObject.invokeMethod(
                     self.main_app,
-                    "show_message",
-                    Qt.QueuedConnection,
-                    Q_ARG(str, f"开始处理 {batch_count} 个视频生成任务")
-                )
-            except Exception as e:
-                logging.error(f"无法更新状态栏: {str(e)}")
-        
-        # 在新线程中生成视频
-        thread = threading.Thread(target=self._generate_batch, args=(task_queue,))
-        thread.daemon = True
-        thread.start()  # 确保线程正确启动
-        thread.start()         
-    
-    def _generate_batch(self, task_queue):
-        """执行批量生成任务队列"""
-        generator = self.main_app.generator
-        if not generator:
-            generator = SoraVideoGenerator(self.main_app.api_key, self.main_app.base_url)
-            self.main_app.generator = generator
-            
-        completed = 0
-        success_count = 0
-        
-        try:
-            for i, task_info in enumerate(task_queue):
-                try:
-                    # 显示当前任务信息
-                    current_prompt = task_info["prompt"][:30] + "..." if len(task_info["prompt"]) > 30 else task_info["prompt"]
-                    status_text = f"正在生成视频 {i+1}/{len(task_queue)}: {current_prompt}"
-                    
-                    # 在UI线程中更新状态栏
-                    if hasattr(self.main_app, 'show_message'):
-                        try:
-                            QMetaObject.invokeMethod(
-                                self.main_app,
-                                "show_message",
-                                Qt.QueuedConnection,
-                                Q_ARG(str, status_text)
-                            )
-                        except Exception as e:
-                            logging.error(f"无法更新状态栏: {str(e)}")
-                    
-                    # 调用API创建视频
-                    result = generator.create_video(
-                        prompt=task_info["prompt"],
-                        model=task_info["model"],
-                        orientation=task_info["orientation"],
-                        size=task_info["size"],
-                        duration=task_info["duration"]
-                    )
-                    
-                    # 添加到任务管理
-                    task_id = result.get('id', '')
-                    if task_id:
-                        task_data = {
-                            'id': task_id,
-                            'type': '文生视频',
-                            'prompt': task_info["prompt"],
-                            'model': task_info["model"],
-                            'orientation': task_info["orientation"],
-                            'size': task_info["size"],
-                            'duration': task_info["duration"],
-                            'status': 'pending',
-                            'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            'video_url': None,
-                            'error': None
-                        }
-                        self.main_app.task_manager.add_task(task_data)
-                        success_count += 1
-                        
-                        if hasattr(self.main_app, 'show_message'):
-                            try:
-                                QMetaObject.invokeMethod(
-                                    self.main_app,
-                                    "show_message",
-                                    Qt.QueuedConnection,
-                                    Q_ARG(str, f"任务 {i+1} 创建成功: {task_id[:8]}...")
-                                )
-                            except Exception as e:
-                                logging.error(f"无法更新状态栏: {str(e)}")
-                
-                except Exception as e:
-                    error_msg = str(e)
-                    logging.error(f"生成视频失败 (任务 {i+1}/{len(task_queue)}): {error_msg}")
-                    
-                    # 将失败的任务也添加到任务管理器，标记为失败状态
-                    failed_task_data = {
-                        'id': f"failed_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}",
-                        'type': '文生视频',
-                        'prompt': task_info["prompt"],
-                        'model': task_info["model"],
-                        'orientation': task_info["orientation"],
-                        'size': task_info["size"],
-                        'duration': task_info["duration"],
-                        'status': 'failed',
-                        'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'video_url': None,
-                        'error': error_msg
-                    }
-                    self.main_app.task_manager.add_task(failed_task_data)
-                    
-                    if hasattr(self.main_app, 'show_message'):
-                            try:
-                                QMetaObject.invokeMethod(
-                                    self.main_app,
-                                    "show_message",
-                                    Qt.QueuedConnection,
-                                    Q_ARG(str, f"任务 {i+1} 创建失败: {error_msg[:30]}..."),
-                                    Q_ARG(int, 5000)
-                                )
-                            except Exception as e:
-                                logging.error(f"无法更新状态栏: {str(e)}")
-                
-                # 更新进度
-                    completed += 1
-                    try:
-                        QMetaObject.invokeMethod(
-                            self.progress_bar,
-                            "setValue",
-                            Qt.QueuedConnection,
-                            Q_ARG(int, completed)
-                        )
-                    except Exception as e:
-                        logging.error(f"更新进度条失败: {str(e)}")
-                
-                # 为了避免API请求过于频繁，添加短暂延迟
-                time.sleep(1)
+                    "show_message",
+                    Qt.QueuedConnection,
+                    Q_ARG(str, f"开始处理 {batch_count} 个视频生成任务")
+                )
+            except Exception as e:
+                logging.error(f"无法更新状态栏: {str(e)}")
+        
+        # 在新线程中生成视频
+        thread = threading.Thread(target=self._generate_batch, args=(task_queue,))
+        thread.daemon = True
+        thread.start()  # 确保线程正确启动
+        thread.start()         
+    
+    def _generate_batch(self, task_queue):
+        """执行批量生成任务队列"""
+        generator = self.main_app.get_generator()
+            
+        success_count = 0
+        
+        try:
+            success_count = self._submit_tasks_concurrently(generator, task_queue)
         
         except Exception as e:
             logging.error(f"批量生成任务执行过程中出现严重错误: {str(e)}")
@@ -991,6 +3851,8 @@ class TextToVideoTab(QWidget):
         finally:
             # 无论成功还是失败，都要恢复UI状态
             logging.info(f"批量生成任务完成，成功: {success_count}, 总计: {len(task_queue)}")
+            generator.log_network_stats()
+            generator.release()
             # 使用QMetaObject.invokeMethod在UI线程中安全地更新UI
             try:
                 # 使用QMetaObject.invokeMethod调用_update_ui_after_completion方法
@@ -1022,6 +3884,120 @@ class TextToVideoTab(QWidget):
                 except Exception as inner_e:
                     logging.error(f"请求启用按钮失败: {str(inner_e)}")
     
+    def _submit_tasks_concurrently(self, generator, task_queue):
+        """并发提交任务队列，返回成功数，在工作线程中调用
+
+        所有提交在异步客户端中同时发出，受全局和每主机并发上限约束；
+        实际同时进行中的提交数由生成器的自适应并发控制器（AIMD）根据延迟和错误率动态决定。
+        """
+        total = len(task_queue)
+        client = generator.async_client
+        
+        async def submit_all():
+            completed = 0
+            success_count = 0
+            jobs = [self._submit_single_task(client, i, task_info, total) for i, task_info in enumerate(task_queue)]
+            for job in asyncio.as_completed(jobs):
+                try:
+                    if await job:
+                        success_count += 1
+                except Exception as e:
+                    logging.error(f"提交任务时出现未处理的错误: {str(e)}", exc_info=True)
+                
+                # 更新进度
+                completed += 1
+                try:
+                    QMetaObject.invokeMethod(
+                        self.progress_bar,
+                        "setValue",
+                        Qt.QueuedConnection,
+                        Q_ARG(int, completed)
+                    )
+                except Exception as e:
+                    logging.error(f"更新进度条失败: {str(e)}")
+            return success_count
+        
+        return AsyncBridge.shared().run(submit_all())
+    
+    async def _submit_single_task(self, client, i, task_info, total):
+        """提交单个文生视频任务并记录到任务管理，成功返回True"""
+        try:
+            # 显示当前任务信息
+            current_prompt = task_info["prompt"][:30] + "..." if len(task_info["prompt"]) > 30 else task_info["prompt"]
+            self._post_status_message(f"正在生成视频 {i+1}/{total}: {current_prompt}")
+            
+            # 调用API创建视频
+            result = await client.create_video(
+                prompt=task_info["prompt"],
+                model=task_info["model"],
+                orientation=task_info["orientation"],
+                size=task_info["size"],
+                duration=task_info["duration"],
+                submission_key=task_info.get("submission_key")
+            )
+            
+            # 添加到任务管理
+            task_id = result.get('id', '')
+            if not task_id:
+                return False
+            if result.get('resumed') and self.main_app.task_manager.has_task(task_id):
+                self._post_status_message(f"任务 {i+1} 已提交过，复用任务: {task_id[:8]}...")
+                return True
+            task_data = {
+                'id': task_id,
+                'type': '文生视频',
+                'prompt': task_info["prompt"],
+                'model': task_info["model"],
+                'orientation': task_info["orientation"],
+                'size': task_info["size"],
+                'duration': task_info["duration"],
+                'status': 'pending',
+                'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'video_url': None,
+                'error': None,
+                'submission_key': task_info.get("submission_key")
+            }
+            self.main_app.task_manager.add_task(task_data)
+            self._post_status_message(f"任务 {i+1} 创建成功: {task_id[:8]}...")
+            return True
+        
+        except Exception as e:
+            error_msg = str(e)
+            logging.error(f"生成视频失败 (任务 {i+1}/{total}): {error_msg}")
+            
+            # 将失败的任务也添加到任务管理器，标记为失败状态
+            failed_task_data = {
+                'id': f"failed_{uuid.uuid4().hex}",
+                'type': '文生视频',
+                'prompt': task_info["prompt"],
+                'model': task_info["model"],
+                'orientation': task_info["orientation"],
+                'size': task_info["size"],
+                'duration': task_info["duration"],
+                'status': 'failed',
+                'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'video_url': None,
+                'error': error_msg
+            }
+            self.main_app.task_manager.add_task(failed_task_data)
+            self._post_status_message(f"任务 {i+1} 创建失败: {error_msg[:30]}...", 5000)
+            return False
+    
+    def _post_status_message(self, message, duration=3000):
+        """从工作线程安全地更新状态栏"""
+        if hasattr(self.main_app, 'show_message'):
+            try:
+                QMetaObject.invokeMethod(
+                    self.main_app,
+                    "show_message",
+                    Qt.QueuedConnection,
+                    Q_ARG(str, message),
+                    Q_ARG(int, duration)
+                )
+            except Exception as e:
+                logging.error(f"无法更新状态栏: {str(e)}")
+    
+    @pyqtSlot(int, int)
     def _update_ui_after_completion(self, success_count, total_count):
         """完成后更新UI状态"""
         try:
@@ -1190,6 +4166,9 @@ class TextToVideoTab(QWidget):
                 QMessageBox.information(self, "提示", "没有有效的任务可以生成")
                 return
             
+            assign_table_submission_keys(task_queue, file_path)
+            confirm_table_resubmission(self, task_queue, file_path)
+            
             reply = QMessageBox.question(
                 self, 
                 "确认生成", 
@@ -1393,85 +4372,12 @@ class TextToVideoTab(QWidget):
     
     def _table_import_process(self, task_queue):
         """处理表格导入的批量生成任务"""
-        generator = self.main_app.generator
-        if not generator:
-            generator = SoraVideoGenerator(self.main_app.api_key, self.main_app.base_url)
-            self.main_app.generator = generator
+        generator = self.main_app.get_generator()
             
-        completed = 0
         success_count = 0
         
         try:
-            for i, task_info in enumerate(task_queue):
-                try:
-                    # 显示当前任务信息
-                    current_prompt = task_info["prompt"][:30] + "..." if len(task_info["prompt"]) > 30 else task_info["prompt"]
-                    status_text = f"正在生成视频 {i+1}/{len(task_queue)}: {current_prompt}"
-                    
-                    # 更新状态栏
-                    if hasattr(self.main_app, 'show_message'):
-                        self.main_app.show_message(status_text)
-                    
-                    # 调用API创建视频
-                    result = generator.create_video(
-                        prompt=task_info["prompt"],
-                        model=task_info["model"],
-                        orientation=task_info["orientation"],
-                        size=task_info["size"],
-                        duration=task_info["duration"]
-                    )
-                    
-                    # 添加到任务管理
-                    task_id = result.get('id', '')
-                    if task_id:
-                        task_data = {
-                            'id': task_id,
-                            'type': '文生视频',
-                            'prompt': task_info["prompt"],
-                            'model': task_info["model"],
-                            'orientation': task_info["orientation"],
-                            'size': task_info["size"],
-                            'duration': task_info["duration"],
-                            'status': 'pending',
-                            'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            'video_url': None,
-                            'error': None
-                        }
-                        self.main_app.task_manager.add_task(task_data)
-                        success_count += 1
-                        
-                        if hasattr(self.main_app, 'show_message'):
-                            self.main_app.show_message(f"任务 {i+1} 创建成功: {task_id[:8]}...")
-                
-                except Exception as e:
-                    error_msg = str(e)
-                    logging.error(f"生成视频失败 (任务 {i+1}/{len(task_queue)}): {error_msg}")
-                    
-                    # 将失败的任务也添加到任务管理器，标记为失败状态
-                    failed_task_data = {
-                        'id': f"failed_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}",
-                        'type': '文生视频',
-                        'prompt': task_info["prompt"],
-                        'model': task_info["model"],
-                        'orientation': task_info["orientation"],
-                        'size': task_info["size"],
-                        'duration': task_info["duration"],
-                        'status': 'failed',
-                        'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'video_url': None,
-                        'error': error_msg
-                    }
-                    self.main_app.task_manager.add_task(failed_task_data)
-                    
-                    if hasattr(self.main_app, 'show_message'):
-                        self.main_app.show_message(f"任务 {i+1} 创建失败: {error_msg[:30]}...", 5000)
-                
-                # 更新进度
-                completed += 1
-                QMetaObject.invokeMethod(self.progress_bar, "setValue", Qt.QueuedConnection, Q_ARG(int, completed))
-                
-                # 为了避免API请求过于频繁，添加短暂延迟
-                time.sleep(1)
+            success_count = self._submit_tasks_concurrently(generator, task_queue)
         
         except Exception as e:
             logging.error(f"表格批量生成任务执行过程中出现严重错误: {str(e)}")
@@ -1481,6 +4387,8 @@ class TextToVideoTab(QWidget):
         finally:
             # 无论成功还是失败，都要恢复UI状态
             logging.info(f"表格批量生成任务完成，成功: {success_count}, 总计: {len(task_queue)}")
+            generator.log_network_stats()
+            generator.release()
             # 直接在主线程上调用UI更新方法
             try:
                 QMetaObject.invokeMethod(self, "_update_ui_after_completion", Qt.QueuedConnection, 
@@ -1500,11 +4408,29 @@ class TextToVideoTab(QWidget):
 
 
 class ImageToVideoTab(QWidget):
+    # 表格校验和图片上传在后台线程中进行，进度和结果通过信号交回GUI线程
+    table_import_progress = pyqtSignal(int, int, str)
+    table_import_validated = pyqtSignal(object)
+    # 选择图片后在后台上传，完成时携带上传的Future回到GUI线程
+    image_upload_finished = pyqtSignal(object)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.main_app = parent
         self.image_files = []
+        self.image_url = None
+        self._table_import_cancel = None  # 正在校验表格时为取消事件
+        self._pending_upload = None  # 正在上传的图片：文件路径、Future、开始时间、已发送字节数和取消事件
+        self._generate_after_upload = False  # 上传完成后是否自动开始生成
+        self._upload_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sora-image-upload")
         self.init_ui()
+        self.table_import_progress.connect(self._on_table_import_progress)
+        self.table_import_validated.connect(self._on_table_validated)
+        self.image_upload_finished.connect(self._on_image_upload_finished)
+        # 上传期间定时刷新输入框中的进度
+        self._upload_timer = QTimer(self)
+        self._upload_timer.setInterval(500)
+        self._upload_timer.timeout.connect(self._update_upload_progress)
     
     def init_ui(self):
         layout = QVBoxLayout()
@@ -1520,6 +4446,11 @@ class ImageToVideoTab(QWidget):
         self.import_table_btn.clicked.connect(self.import_table)
         buttons_h_layout.addWidget(self.import_table_btn)
         
+        self.cancel_import_btn = QPushButton("取消导入")
+        self.cancel_import_btn.clicked.connect(self.cancel_table_import)
+        self.cancel_import_btn.setVisible(False)
+        buttons_h_layout.addWidget(self.cancel_import_btn)
+        
         self.export_template_btn = QPushButton("导出模板")
         self.export_template_btn.clicked.connect(self.export_template)
         buttons_h_layout.addWidget(self.export_template_btn)
@@ -1580,6 +4511,11 @@ class ImageToVideoTab(QWidget):
         self.add_image_btn.clicked.connect(self.add_images)
         image_layout.addWidget(self.add_image_btn)
         
+        self.cancel_upload_btn = QPushButton("取消上传")
+        self.cancel_upload_btn.clicked.connect(self.cancel_image_upload)
+        self.cancel_upload_btn.setVisible(False)
+        image_layout.addWidget(self.cancel_upload_btn)
+        
         image_group.setLayout(image_layout)
         layout.addWidget(image_group)
                 
@@ -1632,6 +4568,7 @@ class ImageToVideoTab(QWidget):
             self.image_url = None
     
     def add_images(self):
+        """选择图片后立即在后台开始上传，界面不等待上传完成"""
         # 使用getOpenFileName获取单个文件
         file, _ = QFileDialog.getOpenFileName(
             self, "选择图片文件", "", 
@@ -1644,38 +4581,103 @@ class ImageToVideoTab(QWidget):
         # 清空并重置image_files列表，只保存当前选择的文件
         self.image_files.clear()
         self.image_files.append(file)
+        self.image_url = None
                 
         # 确保有generator实例
-        generator = self.main_app.generator
-        if not generator:
-            generator = SoraVideoGenerator(self.main_app.api_key, self.main_app.base_url)
-            self.main_app.generator = generator
-                
+        generator = self.main_app.get_generator()
+        
+        # 之前未完成的上传直接取消
+        if self._pending_upload is not None:
+            self._pending_upload['cancel'].set()
+        logging.info(f"正在后台上传图片: {file}")
+        orientation = "portrait" if self.orientation_combo.currentText() == "竖屏" else "landscape"
+        size = "large" if self.size_combo.currentText() == "高清1080p" else "small"
+        upload = {'file': file, 'started': time.monotonic(), 'sent': 0, 'total': 0, 'cancel': threading.Event()}
+        
+        def on_progress(sent, total):
+            # 在上传线程中调用，只记录数字，由定时器在GUI线程中显示
+            upload['sent'], upload['total'] = sent, total
+        
+        upload['future'] = self._upload_executor.submit(
+            generator.prepare_and_upload, file, orientation, size, on_progress, upload['cancel']
+        )
+        self._pending_upload = upload
+        self.image_path_edit.setReadOnly(True)
+        self.cancel_upload_btn.setVisible(True)
+        self._update_upload_progress()
+        self._upload_timer.start()
+        upload['future'].add_done_callback(lambda future: generator.release())
+        upload['future'].add_done_callback(self.image_upload_finished.emit)
+    
+    def cancel_image_upload(self):
+        """取消正在进行的图片上传，已发送的部分立即中断"""
+        if self._pending_upload is not None:
+            self._pending_upload['cancel'].set()
+    
+    def _set_image_path_text(self, text):
+        # 临时断开信号连接，避免触发_on_image_path_changed
+        self.image_path_edit.textChanged.disconnect(self._on_image_path_changed)
+        self.image_path_edit.setText(text)
+        self.image_path_edit.textChanged.connect(self._on_image_path_changed)
+    
+    def _update_upload_progress(self):
+        """在输入框中显示上传进度"""
+        upload = self._pending_upload
+        if upload is None:
+            return
+        name = os.path.basename(upload['file'])
+        sent, total = upload['sent'], upload['total']
+        if total:
+            self._set_image_path_text(
+                f"正在上传 {name} ... {sent * 100 // total}% ({sent / 1048576:.1f}/{total / 1048576:.1f}MB)"
+            )
+        else:
+            # 预处理或等待连接期间还没有进度
+            self._set_image_path_text(f"正在处理 {name} ... {time.monotonic() - upload['started']:.0f}秒")
+    
+    @pyqtSlot(object)
+    def _on_image_upload_finished(self, future):
+        """后台上传结束，在GUI线程中更新输入框；有等待中的生成请求时立即开始生成"""
+        if self._pending_upload is None or future is not self._pending_upload['future']:
+            return  # 已经选择了其他图片
+        file = self._pending_upload['file']
+        self._pending_upload = None
+        self._upload_timer.stop()
+        self.image_path_edit.setReadOnly(False)
+        self.cancel_upload_btn.setVisible(False)
+        generate_waiting = self._generate_after_upload
+        self._generate_after_upload = False
+        if generate_waiting:
+            self.generate_btn.setText("生成视频")
+            self.generate_btn.setEnabled(True)
+        
         try:
-            # 上传新图片获取URL
-            logging.info(f"正在上传图片: {file}")
-            image_url = generator.upload_file(file)
-            logging.info(f"图片已添加，URL: {image_url}")
-
-            # 更新输入框显示上传后的URL，而不是本地文件路径
-            # 临时断开信号连接，避免触发_on_image_path_changed
-            self.image_path_edit.textChanged.disconnect(self._on_image_path_changed)
-            self.image_path_edit.setText(image_url)
-            self.image_path_edit.textChanged.connect(self._on_image_path_changed)
-            # 存储URL到self.image_url属性，供_process_generation方法使用
-            self.image_url = image_url
-                        
+            image_url = future.result()
+        except UploadCancelled:
+            logging.info(f"已取消上传图片: {file}")
+            self._set_image_path_text(file)
+            self.image_url = None
+            if hasattr(self.main_app, 'show_message'):
+                self.main_app.show_message("图片上传已取消", 3000)
+            return
         except Exception as e:
             error_msg = f"上传图片失败: {str(e)}"
             logging.error(error_msg)
             QMessageBox.warning(self, "上传失败", error_msg)
-                        # 上传失败时，显示本地文件路径
-            # 临时断开信号连接，避免触发_on_image_path_changed
-            self.image_path_edit.textChanged.disconnect(self._on_image_path_changed)
-            self.image_path_edit.setText(file)
-            self.image_path_edit.textChanged.connect(self._on_image_path_changed)
+            # 上传失败时，显示本地文件路径
+            self._set_image_path_text(file)
             # 清除URL属性
             self.image_url = None
+            return
+        
+        logging.info(f"图片已添加，URL: {image_url}")
+        # 更新输入框显示上传后的URL，而不是本地文件路径
+        self._set_image_path_text(image_url)
+        # 存储URL到self.image_url属性，供流水线上传阶段使用
+        self.image_url = image_url
+        if generate_waiting:
+            logging.info("图片上传完成，开始生成")
+            self.generate_video()
     
     def generate_video(self):
         """基于图片生成视频"""
@@ -1710,6 +4712,15 @@ class ImageToVideoTab(QWidget):
             else:
                 logging.info(f"提示词: {prompt[:50]}..." if len(prompt) > 50 else f"提示词: {prompt}")
             
+            # 图片还在上传时不重复上传，等上传完成后自动开始
+            if self._pending_upload is not None:
+                self._generate_after_upload = True
+                self.generate_btn.setEnabled(False)
+                self.generate_btn.setText("等待图片上传...")
+                if hasattr(self.main_app, 'show_message'):
+                    self.main_app.show_message("图片上传完成后将自动开始生成")
+                return
+            
             # 创建任务队列
             task_queue = []
             logging.info("开始创建任务队列")
@@ -1784,6 +4795,7 @@ class ImageToVideoTab(QWidget):
                     task_queue.append(task_info)
                     logging.info(f"任务 {i+1} 添加到队列: {os.path.basename(image_file)}")
             
+            assign_submission_keys(task_queue, f"image:{datetime.now().strftime('%Y%m%d%H%M%S%f')}")
             logging.info(f"任务队列创建完成，共 {len(task_queue)} 个任务")
             
             # 开始处理 - 更新UI状态
@@ -1827,232 +4839,56 @@ class ImageToVideoTab(QWidget):
                 self.main_app.show_message(f"启动任务时出错: {str(e)[:30]}...", 5000)
     
     def _process_generation(self, task_queue):
-        """处理图片转视频任务队列"""
+        """处理图片转视频任务队列
+
+        预处理、上传和提交是流水线中的三个阶段，各有独立的并发数，第2张图片上传时第1个任务的创建请求可以同时进行。
+        创建成功的任务交给任务管理页，由轮询调度器和自动下载完成后面的查询和下载。
+        """
         logging.info("开始处理图片转视频任务队列")
-        generator = self.main_app.generator
-        if not generator:
-            logging.info("创建SoraVideoGenerator实例")
-            generator = SoraVideoGenerator(self.main_app.api_key, self.main_app.base_url)
-            self.main_app.generator = generator
+        generator = self.main_app.get_generator()
             
         completed = 0
         success_count = 0
+        progress_lock = threading.Lock()
         
         try:
             logging.info(f"任务队列长度: {len(task_queue)}")
-            for i, task_info in enumerate(task_queue):
-                image_file = task_info["image_file"]
-                is_url = task_info.get("is_url", False)  # 获取is_url标志，默认为False
-                
-                # 根据是否为URL决定如何获取图片名称
-                if is_url:
-                    # 从URL中提取文件名或使用URL的一部分作为名称
-                    if '/' in image_file:
-                        image_name = image_file.split('/')[-1]
-                    else:
-                        image_name = image_file[:30] + "..." if len(image_file) > 30 else image_file
-                else:
-                    image_name = os.path.basename(image_file)
-                                
-                logging.info(f"处理任务 {i+1}/{len(task_queue)}: {image_name} (URL: {is_url})")
-                
-                try:
-                    # 更新状态信息
-                    status_text = f"正在处理图片 {i+1}/{len(task_queue)}: {image_name}"
-                    if hasattr(self.main_app, 'show_message'):
-                        self.main_app.show_message(status_text)
-                    
-                    # 尝试获取已上传的URL
-                    image_url = None
-                    logging.info(f"尝试获取图片URL: {image_file}, 是否为URL: {is_url}")
-                    
-                    # 优先检查是否是表格任务，如果是则直接使用任务中的image_url
-                    if task_info.get("from_table", False):
-                        image_url = task_info.get("image_url", None)
-                        logging.info(f"使用表格任务中的图片URL: {image_url}")
-                    else:
-                        # 对于非表格任务，检查是否已经存储了图片URL
-                        if hasattr(self, 'image_url') and self.image_url:
-                            image_url = self.image_url
-                            logging.info(f"使用已存储的图片URL: {image_url}")
-                        else:
-                            logging.info("未找到已存储的图片URL")
-                                            
-                            # 特殊处理: 如果任务标记为URL类型且未找到已存储的URL，则直接使用image_file作为URL
-                            if is_url and not image_url:
-                                image_url = image_file
-                                logging.info(f"直接使用图片URL作为输入: {image_url}")
-                    
-                    # 如果不是URL且没有已上传的URL，则上传图片
-                    if not is_url and not image_url:
-                        logging.info(f"开始上传本地图片: {image_file}")
-                        try:
-                            image_url = generator.upload_file(image_file)
-                            logging.info(f"图片上传完成成功上传结果 - URL: {image_url}")
-                        except Exception as upload_error:
-                            logging.error(f"图片上传过程异常: {str(upload_error)}")
-                            raise
-                        
-                        if not image_url:
-                            error_msg = "图片上传失败，未返回URL"
-                            logging.error(f"图片上传失败: {image_file} - {error_msg}")
-                            raise Exception(error_msg)
-                    
-                    if not image_url:
-                        error_msg = "获取图片URL失败"
-                        logging.error(f"获取图片URL失败: {image_file}")
-                        raise Exception(error_msg)
-
-                    # 验证URL格式
-                    if not image_url.startswith(('http://', 'https://')):
-                        error_msg = f"图片URL格式不正确: {image_url}"
-                        logging.error(error_msg)
-                        raise Exception(error_msg)
-                    
-                    logging.info(f"图片URL验证通过: {image_url}")
-                                        
-                    # 创建视频任务
-                    logging.info(f"准备创建视频任务，使用图片URL: {image_url}")
-                    logging.info(f"任务参数: model={task_info['model']}, orientation={task_info['orientation']}, size={task_info['size']}, duration={task_info['duration']}")
-                    
-                    try:
-                        result = generator.create_video(
-                            prompt=task_info["prompt"],
-                            model=task_info["model"],
-                            orientation=task_info["orientation"],
-                            size=task_info["size"],
-                            duration=task_info["duration"],
-                            images=[image_url]
-                        )
-                        logging.info(f"视频任务创建请求已发送")
-                    except Exception as create_error:
-                        logging.error(f"创建视频任务异常: {str(create_error)}")
-                        raise
-                                        
-                    logging.info(f"视频任务创建成功，返回结果: {result}")
-                    
-                    # 添加到任务管理
-                    task_id = result.get('id', '')
-                    logging.info(f"从API响应中提取任务ID: {task_id}")
-                    
-                    if task_id:
-                        task_data = {
-                            'id': task_id,
-                            'type': '图生视频',
-                            'prompt': task_info["prompt"],
-                            'image': image_name,
-                            'image_path': image_file,
-                            'image_url': image_url,
-                            'model': task_info["model"],
-                            'orientation': task_info["orientation"],
-                            'size': task_info["size"],
-                            'duration': task_info["duration"],
-                            'status': 'pending',
-                            'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            'video_url': None,
-                            'error': None,
-                            'raw_result': result
-                        }
-                        
-                        # 检查任务管理器是否存在
-                        if not hasattr(self.main_app, 'task_manager'):
-                            logging.error("任务管理器不存在，无法添加任务")
-                            raise Exception("任务管理器不存在")
-                        
-                        try:
-                            self.main_app.task_manager.add_task(task_data)
-                            logging.info(f"任务成功添加到任务管理器: {task_id}")
-                            success_count += 1
-                            
-                            if hasattr(self.main_app, 'show_message'):
-                                self.main_app.show_message(f"任务 {i+1} 创建成功: {task_id[:8]}...")
-                        except Exception as add_error:
-                            logging.error(f"添加任务到任务管理器时出错: {str(add_error)}")
-                            raise
-                    else:
-                        logging.warning(f"API返回结果中未包含任务ID: {result}")
-                        # 即使没有任务ID，也创建一个本地任务
-                        local_task_id = f"local_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}"
-                        task_data = {
-                            'id': local_task_id,
-                            'type': '图生视频',
-                            'prompt': task_info["prompt"],
-                            'image': image_name,
-                            'image_path': image_file,
-                            'image_url': image_url,
-                            'model': task_info["model"],
-                            'orientation': task_info["orientation"],
-                            'size': task_info["size"],
-                            'duration': task_info["duration"],
-                            'status': 'pending',
-                            'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                            'video_url': None,
-                            'error': "API未返回任务ID",
-                            'raw_result': result
-                        }
-                        try:
-                            self.main_app.task_manager.add_task(task_data)
-                            logging.info(f"已创建本地任务记录: {local_task_id}")
-                            success_count += 1
-                        except Exception as local_add_error:
-                            logging.error(f"添加本地任务到任务管理器时出错: {str(local_add_error)}")
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    logging.error(f"处理图片 {image_file} 失败: {error_msg}", exc_info=True)
-                    
-                    # 将失败的任务也添加到任务管理器
-                    failed_task_id = f"failed_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{i}"
-                    failed_task_data = {
-                        'id': failed_task_id,
-                        'type': '图生视频',
-                        'prompt': task_info["prompt"],
-                        'image': image_name,
-                        'image_path': image_file,
-                        'image_url': image_url if 'image_url' in locals() and image_url else "上传失败",
-                        'model': task_info["model"],
-                        'orientation': task_info["orientation"],
-                        'size': task_info["size"],
-                        'duration': task_info["duration"],
-                        'status': 'failed',
-                        'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        'video_url': None,
-                        'error': error_msg
-                    }
-                    
-                    # 尝试添加失败任务到任务管理器
-                    try:
-                        if hasattr(self.main_app, 'task_manager'):
-                            self.main_app.task_manager.add_task(failed_task_data)
-                            logging.info(f"失败任务已添加到任务管理器: {failed_task_id}")
-                        else:
-                            logging.error("任务管理器不存在，无法添加失败任务")
-                    except Exception as failed_task_error:
-                        logging.error(f"添加失败任务到任务管理器时出错: {str(failed_task_error)}")
-
-                    # 显示错误消息                    
-                    if hasattr(self.main_app, 'show_message'):
-                        display_error = error_msg[:30] + "..." if len(error_msg) > 30 else error_msg
-                        self.main_app.show_message(f"任务 {i+1} 处理失败: {display_error}", 5000)
-                
-                # 更新进度
-                completed += 1
-                QMetaObject.invokeMethod(self.progress_bar, "setValue", Qt.QueuedConnection, Q_ARG(int, completed))
-                
-                # 为了避免API请求过于频繁，添加短暂延迟
-                time.sleep(1)
+            jobs = [
+                {'index': i, 'total': len(task_queue), 'task_info': task_info,
+                 'image_name': self._image_display_name(task_info), 'image_url': None}
+                for i, task_info in enumerate(task_queue)
+            ]
+            
+            def on_item_done(index, outcome):
+                nonlocal completed, success_count
+                if isinstance(outcome, Exception):
+                    self._record_failed_image_task(jobs[index], outcome)
+                with progress_lock:
+                    completed += 1
+                    if outcome is True:
+                        success_count += 1
+                    value = completed
+                QMetaObject.invokeMethod(self.progress_bar, "setValue", Qt.QueuedConnection, Q_ARG(int, value))
+            
+            pipeline = StagedPipeline("图生视频", [
+                ("预处理", lambda job: self._preprocess_stage(generator, job), generator.network_config['image_preprocess']['workers']),
+                ("上传", lambda job: self._upload_stage(generator, job), generator.network_config['upload_concurrency']),
+                ("提交", lambda job: self._submit_stage(generator, job), generator.submit_controller.max_window)
+            ])
+            pipeline.run(jobs, on_item_done)
         
         except Exception as e:
             error_details = str(e)
             logging.error(f"图片转视频任务执行过程中出现严重错误: {error_details}", exc_info=True)
-            if hasattr(self.main_app, 'show_message'):
-                display_error = error_details[:30] + "..." if len(error_details) > 30 else error_details
-                self.main_app.show_message(f"执行过程中出错: {display_error}", 5000)
+            display_error = error_details[:30] + "..." if len(error_details) > 30 else error_details
+            self._post_status_message(f"执行过程中出错: {display_error}", 5000)
         
         finally:
             # 无论成功还是失败，都要恢复UI状态
             total_tasks = len(task_queue) if 'task_queue' in locals() else 0
             logging.info(f"图片转视频任务完成，成功: {success_count}, 总计: {total_tasks}")
+            generator.log_network_stats()
+            generator.release()
             
             # 直接在主线程上调用UI更新方法
             try:
@@ -2074,6 +4910,197 @@ class ImageToVideoTab(QWidget):
                 except Exception as inner_e:
                     logging.error(f"直接启用按钮失败: {str(inner_e)}")
 
+    @staticmethod
+    def _image_display_name(task_info):
+        """任务列表中显示的图片名称"""
+        image_file = task_info["image_file"]
+        if task_info.get("is_url", False):
+            # 从URL中提取文件名或使用URL的一部分作为名称
+            if '/' in image_file:
+                return image_file.split('/')[-1]
+            return image_file[:30] + "..." if len(image_file) > 30 else image_file
+        return os.path.basename(image_file)
+    
+    @staticmethod
+    def _needs_upload(task_info):
+        """任务是否需要上传本地图片（表格任务和已有URL的任务不需要）
+
+        流水线在工作线程中运行，只根据任务信息判断；界面上的图片URL在主线程创建任务队列时已写入任务。
+        """
+        return not (task_info.get("from_table", False) or task_info.get("is_url", False))
+    
+    def _post_status_message(self, message, duration=3000):
+        """从工作线程安全地更新状态栏"""
+        if hasattr(self.main_app, 'show_message'):
+            try:
+                QMetaObject.invokeMethod(
+                    self.main_app,
+                    "show_message",
+                    Qt.QueuedConnection,
+                    Q_ARG(str, message),
+                    Q_ARG(int, duration)
+                )
+            except Exception as e:
+                logging.error(f"无法更新状态栏: {str(e)}")
+    
+    def _preprocess_stage(self, generator, job):
+        """流水线预处理阶段：需要上传的本地图片先缩放和重新编码"""
+        task_info = job['task_info']
+        if self._needs_upload(task_info):
+            job['upload_path'] = generator.image_preprocessor.prepare(
+                task_info["image_file"], task_info["orientation"], task_info["size"]
+            )
+        return job
+    
+    def _upload_stage(self, generator, job):
+        """流水线上传阶段：确定任务使用的图片URL，本地图片需要先上传"""
+        task_info = job['task_info']
+        image_file = task_info["image_file"]
+        is_url = task_info.get("is_url", False)  # 获取is_url标志，默认为False
+        logging.info(f"处理任务 {job['index']+1}/{job['total']}: {job['image_name']} (URL: {is_url})")
+        
+        # 更新状态信息
+        self._post_status_message(f"正在处理图片 {job['index']+1}/{job['total']}: {job['image_name']}")
+        
+        image_url = None
+        # 优先检查是否是表格任务，如果是则直接使用任务中的image_url
+        if task_info.get("from_table", False):
+            image_url = task_info.get("image_url", None)
+            logging.info(f"使用表格任务中的图片URL: {image_url}")
+        elif is_url:
+            # 输入的或已上传的图片URL在创建任务队列时已作为image_file写入任务
+            image_url = image_file
+            logging.info(f"直接使用图片URL作为输入: {image_url}")
+        
+        # 如果不是URL且没有已上传的URL，则上传图片
+        if not is_url and not image_url:
+            upload_path = job.get('upload_path') or image_file
+            logging.info(f"开始上传本地图片: {upload_path}")
+            image_url = generator.upload_file(upload_path)
+            logging.info(f"图片上传完成成功上传结果 - URL: {image_url}")
+            if not image_url:
+                raise Exception("图片上传失败，未返回URL")
+        
+        if not image_url:
+            raise Exception("获取图片URL失败")
+        
+        # 验证URL格式
+        if not image_url.startswith(('http://', 'https://')):
+            raise Exception(f"图片URL格式不正确: {image_url}")
+        
+        logging.info(f"图片URL验证通过: {image_url}")
+        job['image_url'] = image_url
+        return job
+    
+    def _submit_stage(self, generator, job):
+        """流水线提交阶段：创建视频任务并添加到任务管理，成功返回True"""
+        task_info = job['task_info']
+        image_url = job['image_url']
+        i = job['index']
+        
+        # 创建视频任务
+        logging.info(f"准备创建视频任务，使用图片URL: {image_url}")
+        logging.info(f"任务参数: model={task_info['model']}, orientation={task_info['orientation']}, size={task_info['size']}, duration={task_info['duration']}")
+        result = generator.create_video(
+            prompt=task_info["prompt"],
+            model=task_info["model"],
+            orientation=task_info["orientation"],
+            size=task_info["size"],
+            duration=task_info["duration"],
+            images=[image_url],
+            submission_key=task_info.get("submission_key")
+        )
+        logging.info(f"视频任务创建成功，返回结果: {result}")
+        
+        # 添加到任务管理
+        task_id = result.get('id', '')
+        logging.info(f"从API响应中提取任务ID: {task_id}")
+        
+        task_data = {
+            'id': task_id,
+            'type': '图生视频',
+            'prompt': task_info["prompt"],
+            'image': job['image_name'],
+            'image_path': task_info["image_file"],
+            'image_url': image_url,
+            'model': task_info["model"],
+            'orientation': task_info["orientation"],
+            'size': task_info["size"],
+            'duration': task_info["duration"],
+            'status': 'pending',
+            'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'video_url': None,
+            'error': None,
+            'raw_result': result,
+            'submission_key': task_info.get("submission_key")
+        }
+        
+        # 检查任务管理器是否存在
+        if not hasattr(self.main_app, 'task_manager'):
+            logging.error("任务管理器不存在，无法添加任务")
+            raise Exception("任务管理器不存在")
+        
+        if task_id and result.get('resumed') and self.main_app.task_manager.has_task(task_id):
+            logging.info(f"任务已提交过，复用已有任务: {task_id}")
+            return True
+        if task_id:
+            self.main_app.task_manager.add_task(task_data)
+            logging.info(f"任务成功添加到任务管理器: {task_id}")
+            self._post_status_message(f"任务 {i+1} 创建成功: {task_id[:8]}...")
+            return True
+        
+        logging.warning(f"API返回结果中未包含任务ID: {result}")
+        # 即使没有任务ID，也创建一个本地任务
+        local_task_id = f"local_{uuid.uuid4().hex}"
+        task_data.update({'id': local_task_id, 'error': "API未返回任务ID"})
+        task_data.pop('submission_key')
+        try:
+            self.main_app.task_manager.add_task(task_data)
+            logging.info(f"已创建本地任务记录: {local_task_id}")
+        except Exception as local_add_error:
+            logging.error(f"添加本地任务到任务管理器时出错: {str(local_add_error)}")
+            return False
+        return True
+    
+    def _record_failed_image_task(self, job, error):
+        """把在流水线中失败的任务也添加到任务管理器"""
+        task_info = job['task_info']
+        image_file = task_info["image_file"]
+        error_msg = str(error)
+        logging.error(f"处理图片 {image_file} 失败: {error_msg}")
+        
+        failed_task_id = f"failed_{uuid.uuid4().hex}"
+        failed_task_data = {
+            'id': failed_task_id,
+            'type': '图生视频',
+            'prompt': task_info["prompt"],
+            'image': job['image_name'],
+            'image_path': image_file,
+            'image_url': job['image_url'] or "上传失败",
+            'model': task_info["model"],
+            'orientation': task_info["orientation"],
+            'size': task_info["size"],
+            'duration': task_info["duration"],
+            'status': 'failed',
+            'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'video_url': None,
+            'error': error_msg
+        }
+        
+        # 尝试添加失败任务到任务管理器
+        try:
+            if hasattr(self.main_app, 'task_manager'):
+                self.main_app.task_manager.add_task(failed_task_data)
+                logging.info(f"失败任务已添加到任务管理器: {failed_task_id}")
+            else:
+                logging.error("任务管理器不存在，无法添加失败任务")
+        except Exception as failed_task_error:
+            logging.error(f"添加失败任务到任务管理器时出错: {str(failed_task_error)}")
+        
+        # 显示错误消息
+        display_error = error_msg[:30] + "..." if len(error_msg) > 30 else error_msg
+        self._post_status_message(f"任务 {job['index']+1} 处理失败: {display_error}", 5000)
+
     def export_template(self):
         """导出表格模板，包含图片地址列"""
         try:
@@ -2118,10 +5145,16 @@ class ImageToVideoTab(QWidget):
             logging.error(f"导出表格模板时出错: {str(e)}", exc_info=True)
 
     def import_table(self):
-        """导入表格批量生成图片视频任务"""
+        """导入表格批量生成图片视频任务
+
+        读取表格、校验各行和上传本地图片都在后台线程中进行，界面不会卡住；
+        全部完成后再在GUI线程中显示错误汇总和确认对话框。
+        """
         if not self.main_app.api_key:
             QMessageBox.warning(self, "警告", "请先在设置中配置API Key")
             return
+        if self._table_import_cancel is not None:
+            return  # 上一个表格还在校验中
         
         # 打开文件选择对话框
         file_path, _ = QFileDialog.getOpenFileName(
@@ -2134,106 +5167,212 @@ class ImageToVideoTab(QWidget):
         if not file_path:
             return  # 用户取消选择
         
+        # 初始化生成器实例
+        generator = self.main_app.get_generator()
+        
+        self._table_import_cancel = threading.Event()
+        self.generate_btn.setEnabled(False)
+        self.import_table_btn.setEnabled(False)
+        self.cancel_import_btn.setVisible(True)
+        self.cancel_import_btn.setEnabled(True)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 0)  # 读取表格期间显示忙碌状态
+        if hasattr(self.main_app, 'show_message'):
+            self.main_app.show_message(f"正在读取和校验表格: {os.path.basename(file_path)}")
+        
+        thread = threading.Thread(
+            target=self._validate_table_thread,
+            args=(file_path, generator, self._table_import_cancel),
+            daemon=True
+        )
+        thread.start()
+    
+    def cancel_table_import(self):
+        """取消正在进行的表格校验和图片上传"""
+        if self._table_import_cancel is not None:
+            self._table_import_cancel.set()
+            self.cancel_import_btn.setEnabled(False)
+            if hasattr(self.main_app, 'show_message'):
+                self.main_app.show_message("正在取消表格导入，中断进行中的上传...")
+    
+    @staticmethod
+    def _read_table(file_path):
+        # 根据文件扩展名读取表格
+        if file_path.lower().endswith('.csv'):
+            # 尝试不同的编码
+            try:
+                return pd.read_csv(file_path, encoding='utf-8')
+            except UnicodeDecodeError:
+                return pd.read_csv(file_path, encoding='gbk')
+        # Excel文件
+        return pd.read_excel(file_path)
+    
+    @staticmethod
+    def _parse_table_row(row_number, row):
+        """校验表格中的一行，返回 (任务信息, 错误信息)
+
+        本地图片路径只检查文件，不在这里上传，任务信息中needs_upload为True。
+        """
         try:
-            # 根据文件扩展名读取表格
-            if file_path.lower().endswith('.csv'):
-                # 尝试不同的编码
-                try:
-                    df = pd.read_csv(file_path, encoding='utf-8')
-                except UnicodeDecodeError:
-                    df = pd.read_csv(file_path, encoding='gbk')
-            else:
-                # Excel文件
-                df = pd.read_excel(file_path)
+            # 检查图片地址是否存在
+            image_path_or_url = str(row.iloc[0]) if pd.notna(row.iloc[0]) else ''
+            if not image_path_or_url:
+                return None, f"第{row_number}行: 图片地址不能为空"
+            
+            # 判断是URL还是本地文件路径
+            needs_upload = not image_path_or_url.startswith(('http://', 'https://'))
+            if needs_upload:
+                # 检查文件是否存在
+                if not os.path.exists(image_path_or_url):
+                    return None, f"第{row_number}行: 本地图片文件不存在"
+                
+                # 检查文件是否为图片文件
+                file_ext = os.path.splitext(image_path_or_url)[1].lower()
+                if file_ext not in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
+                    return None, f"第{row_number}行: 文件不是有效的图片格式"
+            
+            # 模型映射: 1=sora-2, 2=sora-2-pro
+            model_value = int(row.iloc[1]) if pd.notna(row.iloc[1]) else 1
+            model = "sora-2" if model_value == 1 else "sora-2-pro"
+            
+            # 时长处理
+            duration = int(row.iloc[2]) if pd.notna(row.iloc[2]) else 10
+            
+            # 方向映射: 1=竖屏(portrait), 2=横屏(landscape)
+            orientation_value = int(row.iloc[3]) if pd.notna(row.iloc[3]) else 1
+            orientation = "portrait" if orientation_value == 1 else "landscape"
+            
+            # 提示词
+            prompt = str(row.iloc[4]) if pd.notna(row.iloc[4]) else ""
+            if not prompt:
+                return None, f"第{row_number}行: 提示词不能为空"
+            
+            return {
+                "image_url": image_path_or_url,
+                "original_path": image_path_or_url,  # 保存原始路径，方便调试
+                "model": model,
+                "duration": duration,
+                "orientation": orientation,
+                "size": "large",  # 默认高清1080p
+                "prompt": prompt,
+                "batch_index": row_number,  # 表格行号，提交键按行区分，不受前面出错行的影响
+                "needs_upload": needs_upload
+            }, None
+        except ValueError as e:
+            return None, f"第{row_number}行: 数值格式错误 - {str(e)}"
+        except Exception as e:
+            return None, f"第{row_number}行: 处理错误 - {str(e)}"
+    
+    def _validate_table_thread(self, file_path, generator, cancel_event):
+        """后台线程：读取并校验表格，用有界线程池并发上传本地图片"""
+        result = {'file_path': file_path, 'task_queue': [], 'errors': [], 'cancelled': False, 'fatal': None}
+        try:
+            df = self._read_table(file_path)
             
             # 验证表格格式
             if len(df.columns) < 5:
-                QMessageBox.warning(self, "格式错误", "表格至少需要包含5列数据（图片地址、模型、时长、方向、提示词）")
+                result['fatal'] = ("格式错误", "表格至少需要包含5列数据（图片地址、模型、时长、方向、提示词）")
                 return
-
-            # 初始化生成器实例
-            generator = self.main_app.generator
-            if not generator:
-                generator = SoraVideoGenerator(self.main_app.api_key, self.main_app.base_url)
-                self.main_app.generator = generator
-                        
-            # 验证并处理数据
-            task_queue = []
-            errors = []
             
+            rows = []  # (行号, 任务信息)
+            errors = []  # (行号, 错误信息)
             for index, row in df.iterrows():
+                if cancel_event.is_set():
+                    result['cancelled'] = True
+                    return
+                task_info, error = self._parse_table_row(index + 2, row)
+                if error:
+                    errors.append((index + 2, error))
+                else:
+                    rows.append((index + 2, task_info))
+            # 提交键由表格行本身决定（原始图片路径、行号、提示词和参数），上传前生成
+            assign_table_submission_keys([task_info for _, task_info in rows], file_path)
+            
+            uploads = [(row_number, task_info) for row_number, task_info in rows if task_info["needs_upload"]]
+            failed_rows = set()
+            if uploads:
+                self.table_import_progress.emit(0, len(uploads), f"开始上传 {len(uploads)} 张本地图片")
+                max_workers = max(1, min(int(generator.network_config['upload_concurrency']), len(uploads)))
+                executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sora-table-upload")
                 try:
-                    # 检查图片地址是否存在
-                    image_path_or_url = str(row.iloc[0]) if pd.notna(row.iloc[0]) else ''
-                    if not image_path_or_url:
-                        errors.append(f"第{index+2}行: 图片地址不能为空")
-                        continue
-                    
-                    # 判断是URL还是本地文件路径
-                    image_url = image_path_or_url
-                    if image_path_or_url.startswith(('http://', 'https://')):
-                        # 已经是URL，直接使用
-                        logging.info(f"第{index+2}行: 检测到图片URL")
-                    else:
-                        # 假设是本地文件路径，需要上传
-                        logging.info(f"第{index+2}行: 检测到本地图片路径，准备上传: {image_path_or_url}")
-                        
-                        # 检查文件是否存在
-                        if not os.path.exists(image_path_or_url):
-                            errors.append(f"第{index+2}行: 本地图片文件不存在")
-                            continue
-                        
-                        # 检查文件是否为图片文件
-                        file_ext = os.path.splitext(image_path_or_url)[1].lower()
-                        if file_ext not in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
-                            errors.append(f"第{index+2}行: 文件不是有效的图片格式")
-                            continue
-                        
-                        # 上传图片获取URL
-                        try:
-                            image_url = generator.upload_file(image_path_or_url)
-                            logging.info(f"第{index+2}行: 图片上传成功，URL: {image_url}")
-                        except Exception as upload_error:
-                            errors.append(f"第{index+2}行: 图片上传失败 - {str(upload_error)}")
-                            continue
-                    
-                    # 模型映射: 1=sora-2, 2=sora-2-pro
-                    model_value = int(row.iloc[1]) if pd.notna(row.iloc[1]) else 1
-                    model = "sora-2" if model_value == 1 else "sora-2-pro"
-                    
-                    # 时长处理
-                    duration = int(row.iloc[2]) if pd.notna(row.iloc[2]) else 10
-                    
-                    # 方向映射: 1=竖屏(portrait), 2=横屏(landscape)
-                    orientation_value = int(row.iloc[3]) if pd.notna(row.iloc[3]) else 1
-                    orientation = "portrait" if orientation_value == 1 else "landscape"
-                    
-                    # 提示词
-                    prompt = str(row.iloc[4]) if pd.notna(row.iloc[4]) else ""
-                    if not prompt:
-                        errors.append(f"第{index+2}行: 提示词不能为空")
-                        continue
-                    
-                    # 尺寸映射
-                    size = "large"  # 默认高清1080p
-                    
-                    # 添加到任务队列
-                    task_info = {
-                        "image_url": image_url,
-                        "original_path": image_path_or_url,  # 保存原始路径，方便调试
-                        "model": model,
-                        "duration": duration,
-                        "orientation": orientation,
-                        "size": size,
-                        "prompt": prompt
+                    futures = {
+                        executor.submit(generator.prepare_and_upload, task_info["original_path"],
+                                        task_info["orientation"], task_info["size"],
+                                        cancel_event=cancel_event): (row_number, task_info)
+                        for row_number, task_info in uploads
                     }
-                    task_queue.append(task_info)
-                    
-                except ValueError as e:
-                    errors.append(f"第{index+2}行: 数值格式错误 - {str(e)}")
-                except Exception as e:
-                    errors.append(f"第{index+2}行: 处理错误 - {str(e)}")
-            
+                    pending = set(futures)
+                    done_count = 0
+                    while pending:
+                        # 定期醒来检查取消，不必等到某个上传结束
+                        finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                        if cancel_event.is_set():
+                            # 尚未开始的上传直接取消，进行中的上传在下一个数据块时中断
+                            for future in pending:
+                                future.cancel()
+                            result['cancelled'] = True
+                            return
+                        for future in finished:
+                            done_count += 1
+                            row_number, task_info = futures[future]
+                            try:
+                                task_info["image_url"] = future.result()
+                                message = f"第{row_number}行: 图片上传成功"
+                                logging.info(f"{message}，URL: {task_info['image_url']}")
+                            except Exception as upload_error:
+                                failed_rows.add(row_number)
+                                message = f"第{row_number}行: 图片上传失败 - {str(upload_error)}"
+                                errors.append((row_number, message))
+                                logging.error(message)
+                            self.table_import_progress.emit(done_count, len(uploads), message)
+                finally:
+                    # 取消后进行中的上传很快会中断；等它们结束再释放生成器，避免上传仍在使用已关闭的连接池
+                    executor.shutdown(wait=True)
+            
+            for row_number, task_info in rows:
+                if row_number not in failed_rows:
+                    task_info.pop("needs_upload", None)
+                    result['task_queue'].append(task_info)
+            result['errors'] = [message for _, message in sorted(errors, key=lambda item: item[0])]
+        except Exception as e:
+            logging.error(f"表格导入错误: {str(e)}", exc_info=True)
+            result['fatal'] = ("导入失败", f"无法导入表格文件: {str(e)}")
+        finally:
+            generator.release()
+            self.table_import_validated.emit(result)
+    
+    @pyqtSlot(int, int, str)
+    def _on_table_import_progress(self, done, total, message):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        if hasattr(self.main_app, 'show_message'):
+            self.main_app.show_message(f"上传图片 {done}/{total} - {message}")
+    
+    @pyqtSlot(object)
+    def _on_table_validated(self, result):
+        """表格校验和上传结束后在GUI线程中确认并开始生成"""
+        self._table_import_cancel = None
+        self.cancel_import_btn.setVisible(False)
+        self.progress_bar.setVisible(False)
+        self.generate_btn.setEnabled(True)
+        self.import_table_btn.setEnabled(True)
+        
+        if result['cancelled']:
+            logging.info(f"表格导入已取消: {result['file_path']}")
+            if hasattr(self.main_app, 'show_message'):
+                self.main_app.show_message("表格导入已取消", 3000)
+            return
+        if result['fatal']:
+            title, message = result['fatal']
+            if title == "导入失败":
+                QMessageBox.critical(self, title, message)
+            else:
+                QMessageBox.warning(self, title, message)
+            return
+        
+        task_queue = result['task_queue']
+        errors = result['errors']
+        try:
             if errors:
                 error_msg = "导入过程中发现以下错误:\n" + "\n".join(errors)
                 QMessageBox.warning(self, "数据验证错误", error_msg)
@@ -2254,6 +5393,8 @@ class ImageToVideoTab(QWidget):
                 QMessageBox.information(self, "提示", "没有发现有效的任务数据")
                 return
             
+            confirm_table_resubmission(self, task_queue, result['file_path'])
+            
             # 确认导入
             reply = QMessageBox.question(
                 self, 
@@ -2266,14 +5407,10 @@ class ImageToVideoTab(QWidget):
                 return
             
             # 开始生成
-            if hasattr(self, 'generate_btn'):
-                self.generate_btn.setEnabled(False)
+            self.generate_btn.setEnabled(False)
             self.import_table_btn.setEnabled(False)
             
             # 初始化进度条
-            if not hasattr(self, 'progress_bar'):
-                self.progress_bar = QProgressBar()
-                self.layout().addWidget(self.progress_bar)
             self.progress_bar.setVisible(True)
             self.progress_bar.setRange(0, len(task_queue))
             self.progress_bar.setValue(0)
@@ -2293,29 +5430,32 @@ class ImageToVideoTab(QWidget):
     
     def _table_import_process(self, task_queue):
         """处理表格导入的批量任务"""
-        # 为_process_generation方法准备任务队列格式
-        processed_task_queue = []
-        for task in task_queue:
-            # 创建符合_process_generation方法预期的任务格式
-            processed_task = {
-                "prompt": task["prompt"],
-                "model": task["model"],
-                "duration": task["duration"],
-                "orientation": task["orientation"],
-                "size": task["size"],
-                "image_url": task["image_url"],
-                "original_path": task.get("original_path", ""),
-                # 添加一个临时的image_file字段，因为_process_generation方法中使用了它
-                "image_file": task.get("original_path", task["image_url"]),
-                # 添加表格任务标记，确保优先使用表格中的图片URL
-                "from_table": True,
-                # 对于URL类型的图片，设置is_url标志
-                "is_url": task["image_url"].startswith(("http://", "https://"))
-            }
-            processed_task_queue.append(processed_task)
-        
+        generation_started = False
         try:
-            # 直接将处理好的任务队列传递给_process_generation方法
+            # 为_process_generation方法准备任务队列格式
+            processed_task_queue = []
+            for task in task_queue:
+                # 创建符合_process_generation方法预期的任务格式
+                processed_task = {
+                    "prompt": task["prompt"],
+                    "model": task["model"],
+                    "duration": task["duration"],
+                    "orientation": task["orientation"],
+                    "size": task["size"],
+                    "image_url": task["image_url"],
+                    "original_path": task.get("original_path", ""),
+                    # 添加一个临时的image_file字段，因为_process_generation方法中使用了它
+                    "image_file": task.get("original_path", task["image_url"]),
+                    # 添加表格任务标记，确保优先使用表格中的图片URL
+                    "from_table": True,
+                    # 对于URL类型的图片，设置is_url标志
+                    "is_url": task["image_url"].startswith(("http://", "https://")),
+                    "submission_key": task.get("submission_key")
+                }
+                processed_task_queue.append(processed_task)
+            
+            # 直接将处理好的任务队列传递给_process_generation方法，它在结束时会自行更新UI
+            generation_started = True
             self._process_generation(processed_task_queue)
         except Exception as e:
             logging.error(f"表格导入任务处理过程中出错: {str(e)}", exc_info=True)
@@ -2327,9 +5467,11 @@ class ImageToVideoTab(QWidget):
                 Q_ARG(str, f"表格导入任务处理失败: {str(e)}")
             )
         finally:
-            # 所有任务完成后更新UI
-            QMetaObject.invokeMethod(self, "_update_ui_after_completion", Qt.QueuedConnection, Q_ARG(int, 1), Q_ARG(int, len(task_queue)))
+            # 没有进入_process_generation时才需要在这里恢复UI
+            if not generation_started:
+                QMetaObject.invokeMethod(self, "_update_ui_after_completion", Qt.QueuedConnection, Q_ARG(int, 0), Q_ARG(int, len(task_queue)))
             
+    @pyqtSlot(int, int)
     def _update_ui_after_completion(self, success_count, total_count):
         """完成后更新UI状态"""
         logging.debug(f"ImageToVideoTab: _update_ui_after_completion called with success_count={success_count}, total_count={total_count}")
@@ -2348,14 +5490,229 @@ class ImageToVideoTab(QWidget):
         
         QMessageBox.information(self, "完成", f"已提交 {success_count} 个视频生成任务")
 
+class TaskListModel(QAbstractListModel):
+    """分页加载的任务列表模型
+
+    行数据按页从任务数据库读取，排序在SQL中完成；只缓存最近访问的若干页，
+    滚动时通过canFetchMore/fetchMore逐页扩展行数，内存占用与历史任务总数无关。
+    新任务通过rowsInserted插入，状态变化只对缓存中变化的行发出dataChanged。
+    """
+
+    PAGE_SIZE = 200
+    MAX_CACHED_PAGES = 20
+
+    # 状态中文映射
+    STATUS_TEXT = {
+        'pending': '等待中',
+        'completed': '已完成',
+        'failed': '失败',
+        'processing': '处理中',
+        'queued': '排队中',
+        'in_progress': '进行中'
+    }
+
+    def __init__(self, registry, parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self.sort_order = 'newest'
+        self.filters = {}
+        self._total = 0  # 数据库中的任务总数
+        self._loaded = 0  # 已暴露给视图的行数
+        self._pages = OrderedDict()  # 页号 -> [(seq, 任务)]，按最近访问排序
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.PAGE_SIZE, self._total - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        entry = self._entry(index.row())
+        if entry is None:
+            return None
+        seq, task = entry
+        if role == Qt.DisplayRole:
+            return self.display_text(seq, task)
+        if role == Qt.UserRole:
+            return task
+        return None
+
+    @classmethod
+    def display_text(cls, number, task):
+        status = task.get('status', 'unknown')
+        status_icon = "🟡" if status in ['pending', 'queued'] else "🟢" if status == 'completed' else "🔴"
+        status_text = cls.STATUS_TEXT.get(status, status)
+        prompt = task.get('prompt', '无提示词')[:20] + '...' if len(task.get('prompt', '')) > 20 else task.get('prompt', '无提示词')
+        return f"{number}. {status_icon} {status_text} - {task['type']} - {prompt}"
+
+    def _entry(self, row):
+        page_number = row // self.PAGE_SIZE
+        page = self._pages.get(page_number)
+        if page is None:
+            page = self.registry.page(self.sort_order, page_number * self.PAGE_SIZE, self.PAGE_SIZE, self.filters)
+            self._pages[page_number] = page
+            while len(self._pages) > self.MAX_CACHED_PAGES:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(page_number)
+        offset = row - page_number * self.PAGE_SIZE
+        return page[offset] if offset < len(page) else None
+
+    def task_at(self, row):
+        if not 0 <= row < self._loaded:
+            return None
+        entry = self._entry(row)
+        return entry[1] if entry else None
+
+    @property
+    def total(self):
+        return self._total
+
+    def reload(self):
+        """重新读取任务总数并回到第一页（加载、清空、切换排序时使用）"""
+        self.beginResetModel()
+        self._pages.clear()
+        self._total = self.registry.count(self.filters)
+        self._loaded = min(self.PAGE_SIZE, self._total)
+        self.endResetModel()
+
+    def set_filters(self, filters):
+        self.filters = dict(filters)
+        self.reload()
+
+    def set_sort_order(self, order):
+        if order != self.sort_order and order in TaskRepository.ORDER_BY:
+            self.sort_order = order
+            self.reload()
+
+    def tasks_inserted(self, count=1):
+        """新任务已写入数据库后调用"""
+        if self.filters:
+            # 有筛选条件时无法直接确定新任务是否可见，重新加载
+            self.reload()
+        elif self.sort_order == 'newest':
+            # 新任务排在最前面
+            self.beginInsertRows(QModelIndex(), 0, count - 1)
+            self._pages.clear()
+            self._total += count
+            self._loaded += count
+            self.endInsertRows()
+        elif self.sort_order == 'oldest':
+            # 新任务排在最后，已经加载到末尾时直接追加，否则等滚动到底部时再加载
+            fully_loaded = self._loaded == self._total
+            self._total += count
+            if fully_loaded:
+                self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+                self._pages.pop((self._loaded - 1) // self.PAGE_SIZE if self._loaded else 0, None)
+                self._loaded += count
+                self.endInsertRows()
+        else:
+            self.reload()
+
+    def row_of(self, task_id):
+        """任务在已缓存页中的行号，不在缓存中时返回-1"""
+        for page_number, page in self._pages.items():
+            for offset, (_, task) in enumerate(page):
+                if task.get('id') == task_id:
+                    return page_number * self.PAGE_SIZE + offset
+        return -1
+
+    def remove_task(self, task_id):
+        """任务已从注册表删除后调用，按ID定位所在行"""
+        row = self.row_of(task_id)
+        if row >= 0:
+            self.remove_row(row)
+        else:
+            self.reload()
+
+    def remove_row(self, row):
+        if not 0 <= row < self._loaded:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._pages.clear()
+        self._total -= 1
+        self._loaded -= 1
+        self.endRemoveRows()
+
+    def update_tasks(self, tasks):
+        """任务状态变化后调用：替换缓存页中的任务快照，并对这些行发出dataChanged
+
+        只有版本号比缓存中新的快照才会替换，晚到的旧快照不会覆盖新数据。
+        """
+        updated = {task.get('id'): task for task in tasks}
+        rows = []
+        for page_number, page in self._pages.items():
+            for offset, (seq, task) in enumerate(page):
+                task_id = task.get('id')
+                if task_id in updated and getattr(updated[task_id], 'version', 0) > getattr(task, 'version', 0):
+                    page[offset] = (seq, updated[task_id])
+                    rows.append(page_number * self.PAGE_SIZE + offset)
+        rows.sort()
+        start = previous = None
+        for row in rows + [None]:
+            if start is not None and (row is None or row != previous + 1):
+                self.dataChanged.emit(self.index(start), self.index(previous), [Qt.DisplayRole, Qt.UserRole])
+                start = None
+            if row is not None and start is None:
+                start = row
+            previous = row
+
+
 class TaskManagerTab(QWidget):
-    task_added = pyqtSignal(dict)
+    # 新任务先进入缓冲区，在短暂的合并窗口后批量写入数据库并一次性更新界面
+    INGEST_FLUSH_MS = 200
+    # 没有新写入一段时间后执行WAL检查点，把数据同步到磁盘
+    IDLE_SYNC_MS = 2000
+    
+    flush_requested = pyqtSignal()
+    refresh_finished = pyqtSignal(object)
+    download_updated = pyqtSignal(object)
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.main_app = parent
-        self.tasks = []
-        self.tasks_file = 'sora_tasks.json'  # 任务保存文件
+        self.tasks_file = 'sora_tasks.json'  # 旧版任务文件，首次启动时迁移到数据库
+        # 所有线程都通过注册表读写任务，界面只拿到只读快照
+        self.registry = TaskRegistry(TaskRepository(TASKS_DB_FILE))
+        self.task_model = TaskListModel(self.registry, self)
+        # 只轮询未结束的任务，已结束的任务只在手动刷新选中任务时查询
+        self.poll_scheduler = PollScheduler.from_config(getattr(parent, 'network_config', None))
+        self._ingest_lock = threading.Lock()
+        self._ingest_buffer = []
+        self._flush_pending = False
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.INGEST_FLUSH_MS)
+        self.flush_timer.timeout.connect(self.flush_tasks)
+        self.flush_requested.connect(self.flush_timer.start)
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setSingleShot(True)
+        self.sync_timer.setInterval(self.IDLE_SYNC_MS)
+        self.sync_timer.timeout.connect(self.registry.sync)
+        self.refresh_finished.connect(self._update_ui_on_main_thread)
+        # 定时刷新和手动刷新都交给同一个常驻线程，同一时间最多执行一轮查询
+        self.poll_worker = SingleFlightWorker("任务轮询", self._safe_refresh)
+        # 手动、自动和批量下载共用一个有界的下载队列，进度通过信号转到主线程显示
+        network_config = merge_network_config(getattr(parent, 'network_config', None))
+        self.download_manager = DownloadManager(network_config['download'], on_update=self.download_updated.emit,
+                                                keep_alive=network_config['keep_alive'])
+        self._download_items = {}
+        self._download_notified = set()
+        self.download_updated.connect(self._on_download_updated)
         self.init_ui()
         self.setup_timer()
         self.load_tasks()  # 加载保存的任务
@@ -2364,9 +5721,24 @@ class TaskManagerTab(QWidget):
         layout = QVBoxLayout()
         
         # 任务列表
-        self.task_list = QListWidget()
-        self.task_list.itemClicked.connect(self.on_task_selected)
-        layout.addWidget(QLabel("任务列表:"))
+        self.task_list = QListView()
+        self.task_list.setModel(self.task_model)
+        # 统一行高，视图只需要读取可见行的数据
+        self.task_list.setUniformItemSizes(True)
+        self.task_list.clicked.connect(self.on_task_selected)
+        list_header = QHBoxLayout()
+        self.task_count_label = QLabel("任务列表:")
+        list_header.addWidget(self.task_count_label)
+        list_header.addStretch()
+        list_header.addWidget(QLabel("排序:"))
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItem("最新在前", 'newest')
+        self.sort_combo.addItem("最早在前", 'oldest')
+        self.sort_combo.addItem("按状态", 'status')
+        self.sort_combo.currentIndexChanged.connect(self.on_sort_changed)
+        list_header.addWidget(self.sort_combo)
+        layout.addLayout(list_header)
+        layout.addWidget(self._create_filter_bar())
         layout.addWidget(self.task_list)
         
         # 任务详情
@@ -2388,17 +5760,24 @@ class TaskManagerTab(QWidget):
         detail_group.setLayout(detail_layout)
         layout.addWidget(detail_group)
                 
-        # 下载进度条
-        self.download_progress_layout = QHBoxLayout()
-        self.download_progress_label = QLabel("下载进度:")
-        self.download_progress_bar = QProgressBar()
-        self.download_progress_bar.setValue(0)
-        self.download_progress_bar.setFormat("%p%")  # 显示百分比
-        self.download_progress_bar.setVisible(False)  # 初始隐藏
-        
-        self.download_progress_layout.addWidget(self.download_progress_label)
-        self.download_progress_layout.addWidget(self.download_progress_bar)
-        layout.addLayout(self.download_progress_layout)
+        # 下载队列：每个下载一行，显示状态、进度和速度
+        download_group = QGroupBox("下载队列")
+        download_layout = QVBoxLayout()
+        self.download_list = QListWidget()
+        self.download_list.setMaximumHeight(120)
+        download_layout.addWidget(self.download_list)
+        download_btn_layout = QHBoxLayout()
+        self.download_stats_label = QLabel("")
+        self.cancel_download_btn = QPushButton("取消下载")
+        self.cancel_download_btn.clicked.connect(self.cancel_selected_download)
+        self.clear_downloads_btn = QPushButton("清除已完成")
+        self.clear_downloads_btn.clicked.connect(self.clear_finished_downloads)
+        download_btn_layout.addWidget(self.download_stats_label, 1)
+        download_btn_layout.addWidget(self.cancel_download_btn)
+        download_btn_layout.addWidget(self.clear_downloads_btn)
+        download_layout.addLayout(download_btn_layout)
+        download_group.setLayout(download_layout)
+        layout.addWidget(download_group)
 
         # 操作按钮
         btn_layout = QHBoxLayout()
@@ -2425,58 +5804,346 @@ class TaskManagerTab(QWidget):
         self.timer.timeout.connect(self.refresh_all_tasks)
         self.timer.start(10000)  # 每10秒自动刷新一次
     
-    def add_task(self, task_data):
-        self.tasks.append(task_data)
-        self.update_task_list()
-        self.save_tasks()  # 保存任务
+    def _create_filter_bar(self):
+        """筛选栏：状态、类型、模型、方向、日期范围和提示词搜索，以及对筛选结果的批量操作"""
+        filter_group = QGroupBox("筛选")
+        filter_layout = QVBoxLayout()
+        
+        row1 = QHBoxLayout()
+        self.status_filter = QComboBox()
+        self.status_filter.addItem("全部状态", None)
+        self.status_filter.addItem("未结束", 'active')
+        for status, text in TaskListModel.STATUS_TEXT.items():
+            self.status_filter.addItem(text, status)
+        self.type_filter = QComboBox()
+        for text, value in [("全部类型", None), ("文生视频", '文生视频'), ("图生视频", '图生视频')]:
+            self.type_filter.addItem(text, value)
+        self.model_filter = QComboBox()
+        for text, value in [("全部模型", None), ("sora-2", 'sora-2'), ("sora-2-pro", 'sora-2-pro')]:
+            self.model_filter.addItem(text, value)
+        self.orientation_filter = QComboBox()
+        for text, value in [("全部方向", None), ("竖屏", 'portrait'), ("横屏", 'landscape')]:
+            self.orientation_filter.addItem(text, value)
+        for combo in (self.status_filter, self.type_filter, self.model_filter, self.orientation_filter):
+            combo.currentIndexChanged.connect(self.apply_filters)
+            row1.addWidget(combo)
+        filter_layout.addLayout(row1)
+        
+        row2 = QHBoxLayout()
+        self.date_filter_check = QCheckBox("日期")
+        self.date_filter_check.toggled.connect(self.apply_filters)
+        self.date_from_edit = QDateEdit(QDate.currentDate().addDays(-7))
+        self.date_to_edit = QDateEdit(QDate.currentDate())
+        for date_edit in (self.date_from_edit, self.date_to_edit):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+            date_edit.dateChanged.connect(self.apply_filters)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索提示词或错误信息")
+        # 输入停顿后再查询，避免每个字符都重新加载列表
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.apply_filters)
+        self.search_edit.textChanged.connect(self.search_timer.start)
+        clear_filter_btn = QPushButton("清除筛选")
+        clear_filter_btn.clicked.connect(self.clear_filters)
+        row2.addWidget(self.date_filter_check)
+        row2.addWidget(self.date_from_edit)
+        row2.addWidget(QLabel("至"))
+        row2.addWidget(self.date_to_edit)
+        row2.addWidget(self.search_edit, 1)
+        row2.addWidget(clear_filter_btn)
+        filter_layout.addLayout(row2)
+        
+        row3 = QHBoxLayout()
+        row3.addWidget(QLabel("对筛选结果:"))
+        self.bulk_poll_btn = QPushButton("重新查询")
+        self.bulk_poll_btn.clicked.connect(self.bulk_repoll)
+        self.bulk_download_btn = QPushButton("重新下载")
+        self.bulk_download_btn.clicked.connect(self.bulk_redownload)
+        self.bulk_resubmit_btn = QPushButton("重新提交")
+        self.bulk_resubmit_btn.clicked.connect(self.bulk_resubmit)
+        row3.addWidget(self.bulk_poll_btn)
+        row3.addWidget(self.bulk_download_btn)
+        row3.addWidget(self.bulk_resubmit_btn)
+        row3.addStretch()
+        filter_layout.addLayout(row3)
+        
+        filter_group.setLayout(filter_layout)
+        return filter_group
     
-    def update_task_list(self):
-        self.task_list.clear()
-        # 状态中文映射
-        status_map = {
-            'pending': '等待中',
-            'completed': '已完成',
-            'failed': '失败',
-            'processing': '处理中',
-            'queued': '排队中',
-            'in_progress': '进行中'
+    def current_filters(self):
+        """当前筛选栏的条件，未设置的项不包含在结果中"""
+        filters = {
+            'status': self.status_filter.currentData(),
+            'type': self.type_filter.currentData(),
+            'model': self.model_filter.currentData(),
+            'orientation': self.orientation_filter.currentData(),
+            'text': self.search_edit.text().strip()
         }
-      
-        for index, task in enumerate(self.tasks, 1):
-            status = task.get('status', 'unknown')
-            status_icon = "🟡" if status in ['pending', 'queued'] else "🟢" if status == 'completed' else "🔴"
-            status_text = status_map.get(status, status)
-            prompt = task.get('prompt', '无提示词')[:20] + '...' if len(task.get('prompt', '')) > 20 else task.get('prompt', '无提示词')
-            item_text = f"{index}. {status_icon} {status_text} - {task['type']} - {prompt}"
-            item = QListWidgetItem(item_text)
-            item.setData(Qt.UserRole, task)
-            self.task_list.addItem(item)
+        if self.date_filter_check.isChecked():
+            filters['date_from'] = self.date_from_edit.date().toString("yyyy-MM-dd")
+            filters['date_to'] = self.date_to_edit.date().toString("yyyy-MM-dd")
+        return {key: value for key, value in filters.items() if value}
+    
+    def apply_filters(self, *args):
+        started = time.perf_counter()
+        self.task_model.set_filters(self.current_filters())
+        self.update_task_count()
+        logging.info(f"筛选任务: {self.task_model.filters}，结果 {self.task_model.total} 个，耗时 {(time.perf_counter() - started) * 1000:.1f} 毫秒")
+    
+    def clear_filters(self):
+        for combo in (self.status_filter, self.type_filter, self.model_filter, self.orientation_filter):
+            combo.blockSignals(True)
+            combo.setCurrentIndex(0)
+            combo.blockSignals(False)
+        self.date_filter_check.blockSignals(True)
+        self.date_filter_check.setChecked(False)
+        self.date_filter_check.blockSignals(False)
+        self.search_edit.blockSignals(True)
+        self.search_edit.clear()
+        self.search_edit.blockSignals(False)
+        self.apply_filters()
+    
+    def _confirm_bulk_action(self, action, count):
+        if count == 0:
+            QMessageBox.information(self, "提示", f"当前筛选结果中没有可以{action}的任务")
+            return False
+        reply = QMessageBox.question(
+            self,
+            "确认批量操作",
+            f"将对筛选结果中的 {count} 个任务执行\"{action}\"，是否继续？",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        return reply == QMessageBox.Yes
+    
+    def bulk_repoll(self):
+        """立即重新查询筛选结果中的任务（包括已结束的任务）"""
+        if not self.main_app.api_key:
+            QMessageBox.warning(self, "警告", "请先在设置中配置API Key")
+            return
+        task_ids = [task.get('id') for task in self.registry.find(self.task_model.filters) if PollScheduler.is_pollable(task)]
+        if not self._confirm_bulk_action("重新查询", len(task_ids)):
+            return
+        self.poll_scheduler.request(task_ids)
+        self.poll_worker.trigger()
+        self.main_app.show_message(f"已安排重新查询 {len(task_ids)} 个任务")
+    
+    def bulk_redownload(self):
+        """把筛选结果中已完成的视频重新下载到输出目录"""
+        tasks = [task for task in self.registry.find(self.task_model.filters)
+                 if task.get('status') == 'completed' and task.get('video_url')]
+        if not self._confirm_bulk_action("重新下载", len(tasks)):
+            return
+        output_dir = self.main_app.output_dir or os.getcwd()
+        for task in tasks:
+            task_id = task.get('id', 'unknown')
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            save_path = os.path.join(output_dir, f"{self.registry.seq_of(task_id)}_sora_{task.get('type', 'video')}_{task_id[:8]}_{timestamp}.mp4")
+            self.download_manager.submit(task_id, task['video_url'], save_path, DownloadManager.PRIORITY_BULK)
+        self.main_app.show_message(f"已加入下载队列 {len(tasks)} 个，保存在 {output_dir}", 5000)
+    
+    def bulk_resubmit(self):
+        """用筛选结果中任务的参数重新提交生成（图生视频需要有可用的图片URL）"""
+        if not self.main_app.api_key:
+            QMessageBox.warning(self, "警告", "请先在设置中配置API Key")
+            return
+        task_queue = []
+        for task in self.registry.find(self.task_model.filters):
+            image_url = task.get('image_url') or ''
+            if task.get('type') == '图生视频' and not image_url.startswith(('http://', 'https://')):
+                continue
+            task_queue.append({
+                "type": task.get('type', '文生视频'),
+                "prompt": task.get('prompt', ''),
+                "model": task.get('model', 'sora-2'),
+                "orientation": task.get('orientation', 'portrait'),
+                "size": task.get('size', 'large'),
+                "duration": task.get('duration', 10),
+                "images": [image_url] if task.get('type') == '图生视频' else [],
+                "image": task.get('image'),
+                "resubmitted_from": task.get('id')
+            })
+        if not self._confirm_bulk_action("重新提交", len(task_queue)):
+            return
+        assign_submission_keys(task_queue, f"resubmit:{datetime.now().strftime('%Y%m%d%H%M%S%f')}")
+        threading.Thread(target=self._resubmit_thread, args=(task_queue,), daemon=True).start()
+    
+    def _resubmit_thread(self, task_queue):
+        generator = self.main_app.get_generator()
+        client = generator.async_client
+        
+        async def resubmit_all():
+            success_count = 0
+            jobs = [self._resubmit_one(client, task_info) for task_info in task_queue]
+            for index, job in enumerate(asyncio.as_completed(jobs), 1):
+                if await job:
+                    success_count += 1
+                self._post_status_message(f"重新提交 {index}/{len(task_queue)}，成功 {success_count} 个")
+            return success_count
+        
+        try:
+            success_count = AsyncBridge.shared().run(resubmit_all())
+            generator.log_network_stats()
+        finally:
+            generator.release()
+        self._post_status_message(f"重新提交完成: 成功 {success_count}/{len(task_queue)} 个", 5000)
+    
+    async def _resubmit_one(self, client, task_info):
+        try:
+            result = await client.create_video(
+                prompt=task_info["prompt"],
+                model=task_info["model"],
+                orientation=task_info["orientation"],
+                size=task_info["size"],
+                duration=task_info["duration"],
+                images=task_info["images"] or None,
+                submission_key=task_info["submission_key"]
+            )
+            task_id = result.get('id', '')
+            if not task_id:
+                return False
+            task_data = {
+                'id': task_id,
+                'type': task_info["type"],
+                'prompt': task_info["prompt"],
+                'model': task_info["model"],
+                'orientation': task_info["orientation"],
+                'size': task_info["size"],
+                'duration': task_info["duration"],
+                'status': 'pending',
+                'created_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'video_url': None,
+                'error': None,
+                'submission_key': task_info["submission_key"],
+                'resubmitted_from': task_info["resubmitted_from"]
+            }
+            if task_info["images"]:
+                task_data['image'] = task_info.get("image")
+                task_data['image_url'] = task_info["images"][0]
+            self.add_task(task_data)
+            return True
+        except Exception as e:
+            logging.error(f"重新提交任务 {task_info['resubmitted_from']} 失败: {str(e)}")
+            return False
+    
+    def _post_status_message(self, message, duration=3000):
+        """从工作线程安全地更新状态栏"""
+        try:
+            QMetaObject.invokeMethod(
+                self.main_app,
+                "show_message",
+                Qt.QueuedConnection,
+                Q_ARG(str, message),
+                Q_ARG(int, duration)
+            )
+        except Exception as e:
+            logging.error(f"无法更新状态栏: {str(e)}")
+    
+    def on_sort_changed(self, index):
+        self.task_model.set_sort_order(self.sort_combo.itemData(index))
+    
+    def update_task_count(self):
+        if self.task_model.filters:
+            self.task_count_label.setText(f"任务列表（筛选结果 {self.task_model.total} 个）:")
+        else:
+            self.task_count_label.setText(f"任务列表（共 {self.task_model.total} 个）:")
+    
+    def current_row(self):
+        """当前选中的行号，没有选中时返回-1"""
+        return self.task_list.currentIndex().row()
+    
+    def add_task(self, task_data):
+        self.add_tasks([task_data])
+    
+    def add_tasks(self, tasks):
+        """批量添加任务，可以在任意线程调用
+
+        任务先放入缓冲区，合并窗口结束后在GUI线程中一次写入数据库并更新界面。
+        """
+        tasks = [task for task in tasks if task]
+        if not tasks:
+            return
+        with self._ingest_lock:
+            self._ingest_buffer.extend(tasks)
+            schedule = not self._flush_pending
+            self._flush_pending = True
+        if schedule:
+            # 定时器属于GUI线程，从工作线程通过信号启动
+            if QThread.currentThread() != self.thread():
+                self.flush_requested.emit()
+            else:
+                self.flush_timer.start()
+    
+    def flush_tasks(self):
+        """把缓冲区中的任务一次写入数据库，并只通知界面一次"""
+        with self._ingest_lock:
+            batch = self._ingest_buffer
+            self._ingest_buffer = []
+            self._flush_pending = False
+        if not batch:
+            return
+        try:
+            inserted = self.registry.add_many(batch)
+        except Exception as e:
+            logging.error(f"保存新任务失败: {e}")
+            return
+        if inserted == len(batch):
+            self.task_model.tasks_inserted(inserted)
+        else:
+            # 有任务ID已经存在，写入的是覆盖而不是新增行，按数据库重新加载行数和缓存页
+            self.task_model.reload()
+        self.update_task_count()
+        for task in batch:
+            self.poll_scheduler.track(task)
+        self.sync_timer.start()
+        logging.info(f"已批量添加 {len(batch)} 个任务")
+    
+    def has_task(self, task_id):
+        """任务列表（包括尚未写入数据库的缓冲区）中是否已有该任务ID"""
+        with self._ingest_lock:
+            if any(task.get('id') == task_id for task in self._ingest_buffer):
+                return True
+        return self.registry.exists(task_id)
     
-    def save_tasks(self):
-        """保存任务列表到文件"""
+    def update_task_list(self, tasks=None):
+        """通知列表视图任务数据已变化，未指定任务时重新加载"""
+        if tasks is None:
+            self.task_model.reload()
+        else:
+            self.task_model.update_tasks(tasks)
+        self.update_task_count()
+    
+    def save_tasks(self, changes):
+        """把 {任务ID: 变化的字段} 写入注册表，返回更新后的任务快照"""
         try:
-            # 只保存最近30个任务，避免文件过大
-            tasks_to_save = self.tasks[-30:]
-            with open(self.tasks_file, 'w', encoding='utf-8') as f:
-                json.dump(tasks_to_save, f, ensure_ascii=False, indent=2)
-            logging.info(f"已保存 {len(tasks_to_save)} 个任务")
+            updated = self.registry.apply_updates(changes)
+            logging.info(f"已保存 {len(updated)} 个任务")
+            return updated
         except Exception as e:
             logging.error(f"保存任务失败: {e}")
+            return []
     
     def load_tasks(self):
-        """从文件加载任务列表"""
+        """从数据库加载任务列表，首次启动时先迁移旧版JSON文件"""
         try:
-            if os.path.exists(self.tasks_file):
-                with open(self.tasks_file, 'r', encoding='utf-8') as f:
-                    self.tasks = json.load(f)
-                logging.info(f"已加载 {len(self.tasks)} 个任务")
-                self.update_task_list()
+            self.registry.migrate_json(self.tasks_file)
+            # 列表按页加载，这里只读取需要轮询的未结束任务
+            self.update_task_list()
+            for task in self.registry.load_active():
+                self.poll_scheduler.track(task)
+            logging.info(f"已加载 {self.task_model.total} 个任务，其中 {self.poll_scheduler.active_count} 个未结束")
         except Exception as e:
             logging.error(f"加载任务失败: {e}")
     
-    def on_task_selected(self, item):
-        task_data = item.data(Qt.UserRole)
+    def on_task_selected(self, index):
+        task_data = index.data(Qt.UserRole)
         self.task_id_label.setText(task_data.get('id', ''))
+        # 原始API响应只在打开任务详情时从数据库读取
+        raw_result = self.registry.raw_result(task_data.get('id', ''))
+        self.task_id_label.setToolTip(json.dumps(raw_result, ensure_ascii=False, indent=2)[:2000] if raw_result else "")
         self.task_type_label.setText(task_data.get('type', ''))
         # 状态中文映射
         status_map = {
@@ -2506,7 +6173,10 @@ class TaskManagerTab(QWidget):
             # 4. 尝试从detail中获取message
             elif 'detail' in task_data and isinstance(task_data['detail'], dict) and 'message' in task_data['detail']:
                 error_message = task_data['detail']['message']
-            # 5. 从prompt中提取提示词作为参考（如果有）
+            # 5. 尝试从提交时的原始响应中获取
+            elif isinstance(raw_result, dict) and isinstance(raw_result.get('error'), dict) and raw_result['error'].get('message'):
+                error_message = raw_result['error']['message']
+            # 6. 从prompt中提取提示词作为参考（如果有）
             elif 'prompt' in task_data:
                 # 截取前30个字符作为提示
                 error_message = f"提示词: {task_data['prompt'][:30]}..."
@@ -2532,154 +6202,77 @@ class TaskManagerTab(QWidget):
         self.refresh_btn.setText("刷新中...")
         
         # 保存当前选中的任务
-        current_row = self.task_list.currentRow()
+        current_row = self.current_row()
         
-        thread = threading.Thread(target=self._refresh_tasks_thread, args=(current_row,))
-        thread.daemon = True
-        thread.start()
+        # 手动刷新：所有未结束的任务立即查询，选中的任务即使已结束也重新查询
+        self.poll_scheduler.request_all_active()
+        selected_task = self.task_model.task_at(current_row)
+        if selected_task and PollScheduler.is_pollable(selected_task):
+            self.poll_scheduler.request([selected_task.get('id')])
+        
+        if self.poll_worker.trigger():
+            logging.info("已有刷新正在进行，本次手动刷新将合并到下一轮")
     
-    def _refresh_tasks_thread(self, current_row):
+    def _refresh_tasks_thread(self):
+        generator = None
         try:
-            generator = self.main_app.generator
+            generator = self.main_app.get_generator()
             updated_count = 0
             error_count = 0
             completed_count = 0
 
-            logging.info(f"开始刷新任务线程，总任务数: {len(self.tasks)}")
+            logging.info(f"开始刷新任务线程，跟踪中的任务数: {self.poll_scheduler.active_count}")
             
-             # 重要：不仅刷新进行中的任务，还刷新所有任务，确保状态同步
-            # 即使任务显示为已完成，也重新检查以确保最新状态
-            tasks_to_refresh = []
-            for task in self.tasks:
-                task_status = task.get('status')
-                # 刷新所有状态的任务，特别是那些可能已完成但未正确更新的任务
-                tasks_to_refresh.append(task)
-                logging.info(f"任务 {task.get('id', 'unknown')[:8]}... 状态: {task_status}")
+            # 只查询调度器中到期的任务，已结束的任务不会自动查询
+            due_ids = self.poll_scheduler.pop_due()
+            tasks_by_id = self.registry.get_many(due_ids)
+            tasks_to_refresh = [tasks_by_id[task_id] for task_id in due_ids if task_id in tasks_by_id]
             
             logging.info(f"需要刷新的任务数: {len(tasks_to_refresh)}")
             
-            for task in tasks_to_refresh:
+            # 并发查询所有到期任务，全部返回后再一次性更新任务数据，界面一次看到整轮结果
+            results = self._query_tasks_concurrently(generator, tasks_to_refresh)
+            
+            # 查询结果写在快照的副本上，只把变化的字段交给注册表合并
+            changes = {}
+            for snapshot in tasks_to_refresh:
+                task_id = snapshot.get('id', 'unknown')
+                task = snapshot.to_dict()
                 try:
-                    task_id = task.get('id', 'unknown')
-                    logging.info(f"开始查询任务状态: {task_id[:8]}...")
-                    
-                    # 调用查询方法
-                    result = generator.query_task(task_id)
-                                        
-                    # 详细记录API响应
-                    logging.debug(f"任务 {task_id[:8]}... API响应: {json.dumps(result, ensure_ascii=False)}")
-                    
-                    # 更新任务状态
-                    new_status = result.get('status', task.get('status'))
-                    old_status = task.get('status', 'unknown')
-                                       
-                    # 特殊处理响应中的detail嵌套结构
-                    if 'detail' in result and isinstance(result['detail'], dict):
-                        detail = result['detail']
-                        # 从detail中提取更详细的状态信息
-                        if 'status' in detail:
-                            detail_status = detail['status']
-                            # 如果detail中的状态不同，更新为detail中的状态
-                            if detail_status != new_status:
-                                logging.info(f"发现detail中状态: {detail_status}，覆盖外层状态: {new_status}")
-                                new_status = detail_status
-                        
-                        # 从detail中提取视频URL（如果有的话）
-                        if 'url' in detail and not task.get('video_url'):
-                            task['video_url'] = detail['url']
-                            logging.info(f"从detail中提取视频URL: {task['video_url'][:50]}...")
-                        
-                        # 从detail中提取缩略图URL
-                        if 'thumbnail_url' in detail and not task.get('thumbnail_url'):
-                            task['thumbnail_url'] = detail['thumbnail_url']
-                            logging.info(f"从detail中提取缩略图URL: {task['thumbnail_url'][:50]}...")
-                        
-                         # 已经在上方处理了error和detail中的错误信息，这里不再重复处理
-                                                
-                    # 确保error字段中的错误信息被正确提取
-                    if 'error' in result:
-                        error_data = result['error']
-                        # 处理error是字典的情况
-                        if isinstance(error_data, dict) and 'message' in error_data:
-                            task['error_message'] = error_data['message']
-                            logging.info(f"从error.message中提取错误信息: {task['error_message']}")
-                        # 处理error是字符串的情况
-                        elif isinstance(error_data, str):
-                            task['error_message'] = error_data
-                            logging.info(f"从error字符串中提取错误信息: {task['error_message']}")
-                                            # 然后尝试从detail中提取错误信息（作为备用）
-                    elif 'detail' in result:
-                        detail_data = result['detail']
-                        if isinstance(detail_data, dict) and 'message' in detail_data:
-                            task['error_message'] = detail_data['message']
-                            logging.info(f"从detail.message中提取错误信息: {task['error_message']}")
-                        elif isinstance(detail_data, str):
-                            task['error_message'] = detail_data
-                            logging.info(f"从detail字符串中提取错误信息: {task['error_message']}")
-                                      
-                    # 更新任务状态                    
-                    task['status'] = new_status
-
-                    # 处理完成状态的任务 
-                    if new_status == 'completed':
-                        # 确保视频URL和缩略图URL被正确设置
-                        if result.get('video_url'):
-                            task['video_url'] = result['video_url']
-                        if result.get('thumbnail_url'):
-                            task['thumbnail_url'] = result['thumbnail_url']
-                        
-                        # 额外检查任务是否真的有视频URL
-                        if task.get('video_url'):
-                            completed_count += 1
-                            logging.info(f"✓ 任务完成: {task_id[:8]}... - 状态从 {old_status} 变为 {new_status}")
-                            logging.info(f"✓ 视频URL: {task['video_url'][:50]}...")
-                                                        
-                            # 如果是新完成的任务（状态从非completed变为completed），触发自动下载
-                            if old_status != 'completed':
-                                logging.info(f"任务 {task_id[:8]}... 是新完成的任务，准备自动下载")
-                                # 使用QMetaObject.invokeMethod在主线程中触发自动下载
-                                try:
-                                    # 创建自动下载标志
-                                    task['auto_downloaded'] = False  # 标记任务尚未自动下载
-                                    logging.info(f"已为任务 {task_id[:8]}... 设置自动下载标志")
-                                except Exception as auto_dl_error:
-                                    logging.error(f"设置自动下载标志失败: {str(auto_dl_error)}")
-                        else:
-                            logging.warning(f"⚠ 任务显示为completed但没有视频URL: {task_id[:8]}...")
-                    elif new_status != old_status:
-                        logging.info(f"✓ 任务状态更新: {task_id[:8]}... - {old_status} -> {new_status}")
-                    else:
-                        logging.info(f"任务状态未变: {task_id[:8]}... - 仍然是 {new_status}")
-
+                    outcome = results.get(task_id)
+                    if isinstance(outcome, Exception):
+                        raise outcome
+                    if self._apply_query_result(task, outcome):
+                        completed_count += 1
                     updated_count += 1
                     
                 except requests.exceptions.RequestException as e:
                     error_msg = f"网络请求失败: {str(e)}"
-                    logging.error(f"查询任务 {task.get('id', 'unknown')[:8]}... 失败: {error_msg}")
+                    logging.error(f"查询任务 {task_id[:8]}... 失败: {error_msg}")
                     error_count += 1
                 except Exception as e:
                     error_msg = f"未知错误: {str(e)}"
-                    logging.error(f"查询任务 {task.get('id')} 失败: {error_msg}", exc_info=True)
+                    logging.error(f"查询任务 {task_id} 失败: {error_msg}", exc_info=True)
                     error_count += 1
-                
-                # 为了避免API请求过于频繁
-                time.sleep(0.5)
-        
-                logging.info(f"任务刷新完成: 总计 {updated_count} 个任务, 新完成 {completed_count} 个, 失败 {error_count} 个")
+                delta = {key: value for key, value in task.items() if key not in snapshot or snapshot[key] != value}
+                if delta:
+                    changes[task_id] = delta
+            
+            # 本轮变化的任务一次写入数据库（查询期间被删除的任务不会写回）
+            updated_tasks = self.save_tasks(changes)
+            latest = {task.get('id'): task for task in updated_tasks}
+            for snapshot in tasks_to_refresh:
+                # 按新状态重新安排下次查询，已结束的任务移出调度队列
+                self.poll_scheduler.track(latest.get(snapshot.get('id'), snapshot))
             
-             # 使用QTimer.singleShot在主线程中安全地更新UI
-            # 这是PyQt中推荐的跨线程UI更新方式
+            logging.info(f"任务刷新完成: 总计 {updated_count} 个任务, 新完成 {completed_count} 个, 失败 {error_count} 个")
+            
+             # 通过信号在主线程中安全地更新UI
             try:
-               # 设置标志位
-                if not hasattr(self, '_needs_ui_update'):
-                    self._needs_ui_update = False
-                self._needs_ui_update = True
-                
-                # 使用QTimer.singleShot确保在主线程中执行UI更新
-                # 时间设置为0，表示尽快执行但仍然在主线程事件循环中
-                QTimer.singleShot(0, self._update_ui_on_main_thread)
+                # 轮询线程没有Qt事件循环，跨线程信号会排队到主线程执行
+                self.refresh_finished.emit(updated_tasks)
                 
-                logging.info("任务状态数据已更新，UI更新已通过QTimer调度在主线程执行")
+                logging.info("任务状态数据已更新，UI更新已通过信号调度在主线程执行")
             except Exception as e:
                 logging.error(f"调度UI更新时出错: {str(e)}")
              
@@ -2688,51 +6281,156 @@ class TaskManagerTab(QWidget):
                 logging.warning(f"部分任务刷新失败 ({error_count}/{len(tasks_to_refresh)})")
               
             logging.info(f"任务状态刷新完成: 更新 {updated_count} 个, 失败 {error_count} 个, 总计 {len(tasks_to_refresh)} 个任务")
+            if generator:
+                generator.log_network_stats()
             
         except KeyboardInterrupt:
             logging.info("刷新任务线程捕获到KeyboardInterrupt，优雅退出")
         except Exception as e:
             logging.error(f"刷新任务线程发生异常: {str(e)}", exc_info=True)
+        finally:
+            if generator:
+                generator.release()
+    
+    def _query_tasks_concurrently(self, generator, tasks):
+        """通过异步客户端并发查询任务状态，返回 {任务ID: 查询结果或异常}
+
+        同时进行中的查询数不超过轮询并发数，所有查询共用生成器的连接池和限流器，
+        实际查询速率仍受限流器控制。
+        """
+        if not tasks:
+            return {}
+        polling = merge_network_config(self.main_app.network_config)['polling']
+        task_ids = [task.get('id') for task in tasks]
+        outcomes = AsyncBridge.shared().run(
+            generator.async_client.query_many(task_ids, limit=polling['concurrency'])
+        )
+        return dict(zip(task_ids, outcomes))
+    
+    def _apply_query_result(self, task, result):
+        """把一次查询结果写回任务数据，任务完成且有视频URL时返回True"""
+        task_id = task.get('id', 'unknown')
+        completed = False
+        
+        # 详细记录API响应
+        logging.debug(f"任务 {task_id[:8]}... API响应: {json.dumps(result, ensure_ascii=False)}")
+
+        # 更新任务状态
+        new_status = result.get('status', task.get('status'))
+        old_status = task.get('status', 'unknown')
+
+        # 特殊处理响应中的detail嵌套结构
+        if 'detail' in result and isinstance(result['detail'], dict):
+            detail = result['detail']
+            # 从detail中提取更详细的状态信息
+            if 'status' in detail:
+                detail_status = detail['status']
+                # 如果detail中的状态不同，更新为detail中的状态
+                if detail_status != new_status:
+                    logging.info(f"发现detail中状态: {detail_status}，覆盖外层状态: {new_status}")
+                    new_status = detail_status
+
+            # 从detail中提取视频URL（如果有的话）
+            if 'url' in detail and not task.get('video_url'):
+                task['video_url'] = detail['url']
+                logging.info(f"从detail中提取视频URL: {task['video_url'][:50]}...")
+
+            # 从detail中提取缩略图URL
+            if 'thumbnail_url' in detail and not task.get('thumbnail_url'):
+                task['thumbnail_url'] = detail['thumbnail_url']
+                logging.info(f"从detail中提取缩略图URL: {task['thumbnail_url'][:50]}...")
+
+             # 已经在上方处理了error和detail中的错误信息，这里不再重复处理
+
+        # 确保error字段中的错误信息被正确提取
+        if 'error' in result:
+            error_data = result['error']
+            # 处理error是字典的情况
+            if isinstance(error_data, dict) and 'message' in error_data:
+                task['error_message'] = error_data['message']
+                logging.info(f"从error.message中提取错误信息: {task['error_message']}")
+            # 处理error是字符串的情况
+            elif isinstance(error_data, str):
+                task['error_message'] = error_data
+                logging.info(f"从error字符串中提取错误信息: {task['error_message']}")
+                                # 然后尝试从detail中提取错误信息（作为备用）
+        elif 'detail' in result:
+            detail_data = result['detail']
+            if isinstance(detail_data, dict) and 'message' in detail_data:
+                task['error_message'] = detail_data['message']
+                logging.info(f"从detail.message中提取错误信息: {task['error_message']}")
+            elif isinstance(detail_data, str):
+                task['error_message'] = detail_data
+                logging.info(f"从detail字符串中提取错误信息: {task['error_message']}")
+
+        # 更新任务状态                    
+        task['status'] = new_status
+
+        # 处理完成状态的任务 
+        if new_status == 'completed':
+            # 确保视频URL和缩略图URL被正确设置
+            if result.get('video_url'):
+                task['video_url'] = result['video_url']
+            if result.get('thumbnail_url'):
+                task['thumbnail_url'] = result['thumbnail_url']
+
+            # 额外检查任务是否真的有视频URL
+            if task.get('video_url'):
+                completed = True
+                logging.info(f"✓ 任务完成: {task_id[:8]}... - 状态从 {old_status} 变为 {new_status}")
+                logging.info(f"✓ 视频URL: {task['video_url'][:50]}...")
+
+                # 如果是新完成的任务（状态从非completed变为completed），触发自动下载
+                if old_status != 'completed':
+                    logging.info(f"任务 {task_id[:8]}... 是新完成的任务，准备自动下载")
+                    # 使用QMetaObject.invokeMethod在主线程中触发自动下载
+                    try:
+                        # 创建自动下载标志
+                        task['auto_downloaded'] = False  # 标记任务尚未自动下载
+                        logging.info(f"已为任务 {task_id[:8]}... 设置自动下载标志")
+                    except Exception as auto_dl_error:
+                        logging.error(f"设置自动下载标志失败: {str(auto_dl_error)}")
+            else:
+                logging.warning(f"⚠ 任务显示为completed但没有视频URL: {task_id[:8]}...")
+        elif new_status != old_status:
+            logging.info(f"✓ 任务状态更新: {task_id[:8]}... - {old_status} -> {new_status}")
+        else:
+            logging.info(f"任务状态未变: {task_id[:8]}... - 仍然是 {new_status}")
+        return completed
     
-    def _update_ui_on_main_thread(self):
+    def _update_ui_on_main_thread(self, tasks):
         """在主线程中执行UI更新的辅助方法"""
         try:
-            if hasattr(self, '_needs_ui_update') and self._needs_ui_update:
-                self.update_ui_after_refresh()
-                self._needs_ui_update = False
-                logging.info("UI更新已在主线程中完成")
+            # 每轮查询的结果都只包含本轮变化的任务，必须逐个应用，不能合并或丢弃
+            self.update_ui_after_refresh(tasks)
+            logging.info("UI更新已在主线程中完成")
         except Exception as e:
              logging.error(f"在主线程中更新UI时出错: {str(e)}")
  
-    def update_ui_after_refresh(self):
-        """在主线程中更新UI的槽函数"""
+    def update_ui_after_refresh(self, tasks):
+        """在主线程中更新UI的槽函数，只更新本轮查询过的任务所在的行"""
         try:
             logging.info("开始在主线程中更新UI")
 
-            # 检查并处理需要自动下载的任务
+            # 检查并处理需要自动下载的任务（只有本轮变化的任务可能新完成）
             tasks_to_auto_download = []
-            if hasattr(self, 'tasks'):
-                for task in self.tasks:
+            for task in tasks:
+                if task is not None:
                     # 检查任务是否满足自动下载条件
                     if (task.get('status') == 'completed' and 
                         task.get('video_url') and 
                         'auto_downloaded' in task and 
                         not task['auto_downloaded']):
                         tasks_to_auto_download.append(task)
-                        # 立即标记为已处理，避免重复下载
-                        task['auto_downloaded'] = True
                         logging.info(f"检测到需要自动下载的任务: {task['id'][:8]}...")
+            if tasks_to_auto_download:
+                # 立即标记为已处理，避免重复下载
+                marked = self.registry.apply_updates({task['id']: {'auto_downloaded': True} for task in tasks_to_auto_download})
+                tasks = list(tasks) + marked
                         
-            # 保存当前选中的行
-            current_row = -1
-            if hasattr(self, 'task_list') and self.task_list.count() > 0:
-                current_row = self.task_list.currentRow()
-                logging.info(f"保存当前选中行: {current_row}")
-            
-            # 直接更新任务列表
-            if hasattr(self, 'update_task_list'):
-                self.update_task_list()
-                logging.info("已在主线程更新任务列表UI")
+            # 只通知变化的行，选中状态由视图保持
+            self.update_task_list(tasks)
+            logging.info(f"已在主线程更新 {len(tasks)} 个任务的列表UI")
             
             # 恢复按钮状态
             if hasattr(self, 'refresh_btn'):
@@ -2740,17 +6438,6 @@ class TaskManagerTab(QWidget):
                 self.refresh_btn.setText("刷新状态")
                 logging.info("已恢复刷新按钮状态")
 
-             # 恢复选中状态
-            if hasattr(self, 'task_list') and self.task_list.count() > 0 and current_row >= 0:
-                # 确保索引有效
-                if current_row < self.task_list.count():
-                    self.task_list.setCurrentRow(current_row)
-                    logging.info(f"已恢复选中行: {current_row}")
-                else:
-                    # 如果之前选中的行不存在，尝试选中第一行
-                    self.task_list.setCurrentRow(0)
-                    logging.info("已选中第一行作为替代")
-
             # 执行自动下载
             for task in tasks_to_auto_download:
                 logging.info(f"开始自动下载任务: {task['id'][:8]}...")
@@ -2764,10 +6451,9 @@ class TaskManagerTab(QWidget):
         # 这个新方法替代了auto_refresh_tasks，使用不同的实现方式
         # 目标是刷新所有任务状态，包括已完成但未正确更新的任务
         try:
-            if hasattr(self, 'main_app') and self.main_app and hasattr(self, 'tasks') and self.tasks:
-                thread = threading.Thread(target=self._safe_refresh)
-                thread.daemon = True
-                thread.start()
+            if hasattr(self, 'main_app') and self.main_app and self.poll_scheduler.active_count:
+                # 上一轮还没结束时不再另起线程，定时触发合并到下一轮
+                self.poll_worker.trigger()
         except:
             pass
     
@@ -2786,21 +6472,16 @@ class TaskManagerTab(QWidget):
                 logging.info("API Key未配置")
                 return
             
-             # 获取当前选中行
-            current_row = -1
-            if hasattr(self, 'task_list'):
-                current_row = self.task_list.currentRow()
-            
-             # 调用刷新方法
-            self._refresh_tasks_thread(current_row)
+            # 在轮询线程中执行，不能读取界面控件；选中的任务由refresh_tasks在GUI线程中加入调度器
+            self._refresh_tasks_thread()
             
         except Exception as e:
             logging.error(f"安全刷新过程出错: {str(e)}", exc_info=True)
     
     def delete_task(self):
-        current_row = self.task_list.currentRow()
+        current_row = self.current_row()
         if current_row >= 0:
-            task = self.tasks[current_row]
+            task = self.task_model.task_at(current_row)
             task_id = task.get('id', 'unknown')
             task_type = task.get('type', 'unknown')
             
@@ -2815,8 +6496,11 @@ class TaskManagerTab(QWidget):
             
             if reply == QMessageBox.Yes:
                 try:
-                    self.tasks.pop(current_row)
-                    self.update_task_list()
+                    # 按任务ID删除：确认对话框打开期间列表可能已插入新任务，原来的行号不再可靠
+                    self.registry.delete(task_id)
+                    self.poll_scheduler.untrack(task_id)
+                    self.task_model.remove_task(task_id)
+                    self.update_task_count()
                     logging.info(f"已删除任务: {task_id}")
                     
                     if hasattr(self.main_app, 'show_message'):
@@ -2828,9 +6512,9 @@ class TaskManagerTab(QWidget):
             QMessageBox.warning(self, "警告", "请先选择一个任务")
     
     def download_video(self):
-        current_row = self.task_list.currentRow()
+        current_row = self.current_row()
         if current_row >= 0:
-            task = self.tasks[current_row]
+            task = self.task_model.task_at(current_row)
             task_id = task.get('id', 'unknown')
             task_status = task.get('status', 'unknown')
             video_url = task.get('video_url', None)
@@ -2843,7 +6527,7 @@ class TaskManagerTab(QWidget):
                     logging.info(f"开始下载任务视频: {task_id}")
                     
                     # 选择保存位置，添加序号前缀
-                    task_index = current_row + 1  # 任务序号从1开始
+                    task_index = self.registry.seq_of(task_id)  # 与列表中显示的序号一致
                     default_filename = f"{task_index}_sora_video_{task['id'][:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
                     save_path, _ = QFileDialog.getSaveFileName(
                         self, "保存视频", 
@@ -2868,18 +6552,9 @@ class TaskManagerTab(QWidget):
                             logging.error(f"创建或访问目录失败: {save_dir}, 错误: {e}")
                             return
                         
-                        # 显示并重置进度条
-                        self.download_progress_bar.setVisible(True)
-                        self.download_progress_bar.setValue(0)
-                        
-                         # 在新线程中下载视频
-                        self.download_btn.setEnabled(False)
-                        thread = threading.Thread(
-                            target=self._download_video_thread, 
-                            args=(video_url, save_path, task_id)
-                        )
-                        thread.daemon = True
-                        thread.start()
+                        # 手动下载排在自动下载之前
+                        self.download_manager.submit(task_id, video_url, save_path, DownloadManager.PRIORITY_MANUAL)
+                        self.main_app.show_message("已加入下载队列")
                 else:
                     # 特殊情况：任务状态为completed但没有视频URL
                     QMessageBox.warning(self, "警告", "任务标记为已完成，但系统未返回有效的视频链接。请尝试刷新任务状态后再试。")
@@ -2900,244 +6575,86 @@ class TaskManagerTab(QWidget):
         else:
             QMessageBox.warning(self, "警告", "请先选择一个任务")
     
-    def _download_video_thread(self, video_url, save_path, task_id):
-        logging.debug(f"[下载线程开始] 任务ID: {task_id}, 视频URL: {video_url}, 保存路径: {save_path}")
-        try:
-            logging.info(f"开始下载视频文件: {task_id} -> {os.path.basename(save_path)}")
-            logging.debug(f"视频URL分析: {video_url}")
-            logging.debug(f"保存路径分析: {save_path}, 目录: {os.path.dirname(save_path)}")
-            
-            # 安全地显示初始消息
-            try:
-                logging.debug("检查main_app和show_message方法是否存在")
-                if hasattr(self, 'main_app') and hasattr(self.main_app, 'show_message'):
-                    logging.debug("调用QMetaObject.invokeMethod显示初始下载消息")
-                    QMetaObject.invokeMethod(
-                        self.main_app, 
-                        "show_message", 
-                        Qt.QueuedConnection, 
-                        Q_ARG(str, "正在下载视频...")
-                    )
-                else:
-                    logging.warning("main_app或show_message方法不存在")
-                logging.debug("初始消息调用成功")
-            except Exception as msg_error:
-                logging.warning(f"更新状态栏消息失败: {str(msg_error)}")
-            
-            # 设置更合理的超时和重试
-            max_retries = 3
-            retry_count = 0
-            success = False
-            
-            logging.debug(f"开始下载循环，最大重试次数: {max_retries}")
-            while retry_count < max_retries and not success:
-                try:
-                    logging.debug(f"下载尝试 {retry_count + 1}/{max_retries}")
-                    # 下载视频
-                    logging.debug(f"发送GET请求到: {video_url}")
-                    response = requests.get(
-                        video_url, 
-                        stream=True, 
-                        timeout=(10, 60),  # 连接超时10秒，读取超时60秒
-                        headers={'User-Agent': 'Mozilla/5.0'}
-                    )
-                    logging.debug(f"请求响应状态码: {response.status_code}")
-                    response.raise_for_status()
-                    
-                    total_size = int(response.headers.get('content-length', 0))
-                    logging.debug(f"获取到文件大小: {total_size} 字节")
-                    downloaded_size = 0
-                    last_progress_update = 0
-                    
-                    # 确保目录存在
-                    logging.debug(f"准备创建目录: {os.path.dirname(save_path)}")
-                    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                    logging.debug(f"目录创建成功或已存在")
-
-                    logging.debug(f"开始写入文件: {save_path}") 
-                    with open(save_path, 'wb') as f:
-                        for chunk_idx, chunk in enumerate(response.iter_content(chunk_size=8192)):
-                            if chunk:
-                                f.write(chunk)
-                                downloaded_size += len(chunk)
-                                
-                                # 每5%进度更新一次UI，减少调用频率
-                                if total_size > 0:
-                                    progress = int(downloaded_size / total_size * 100)
-                                    if progress - last_progress_update >= 5 or progress == 100:
-                                        last_progress_update = progress
-                                        logging.debug(f"进度更新: {progress}%, 已下载: {downloaded_size}/{total_size} 字节")
-                                        
-                                        # 安全地更新进度条
-                                        try:
-                                            if hasattr(self, 'download_progress_bar') and self.download_progress_bar is not None:
-                                                logging.debug("调用QMetaObject.invokeMethod更新进度条")
-                                                QMetaObject.invokeMethod(
-                                                    self.download_progress_bar, 
-                                                    "setValue", 
-                                                    Qt.QueuedConnection, 
-                                                    Q_ARG(int, progress)
-                                                )
-                                                logging.debug("进度条更新调用成功")
-                                        except Exception as pb_error:
-                                            logging.warning(f"更新进度条失败: {str(pb_error)}")
-                                        
-                                        # 安全地更新状态栏消息
-                                        try:
-                                            if hasattr(self, 'main_app') and hasattr(self.main_app, 'show_message'):
-                                                logging.debug("调用QMetaObject.invokeMethod更新状态栏消息")
-                                                QMetaObject.invokeMethod(
-                                                    self.main_app, 
-                                                    "show_message", 
-                                                    Qt.QueuedConnection, 
-                                                    Q_ARG(str, f"正在下载视频... {progress}%")
-                                                )
-                                                logging.debug("状态栏消息更新调用成功")
-                                        except Exception as msg_error:
-                                            logging.warning(f"更新状态栏消息失败: {str(msg_error)}")
-                                                                       # 每100个chunk记录一次
-                            if chunk_idx % 100 == 0:
-                                logging.debug(f"下载进度: 已处理 {chunk_idx} 个chunk, 已下载: {downloaded_size} 字节")
-                    
-                    # 验证文件是否下载完整
-                    logging.debug("验证文件下载完整性")
-                    file_exists = os.path.exists(save_path)
-                    actual_size = os.path.getsize(save_path) if file_exists else 0
-                    logging.debug(f"文件存在: {file_exists}, 实际大小: {actual_size} 字节")
-                    
-                    if file_exists and actual_size >= total_size * 0.99:
-                        success = True
-                        logging.info(f"文件下载完整，满足验证条件")
-                        break
-                    else:
-                         raise Exception(f"文件下载不完整，预期大小: {total_size}，实际大小: {actual_size}")
-                    
-                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        logging.warning(f"下载超时或连接错误，正在重试 ({retry_count}/{max_retries}): {str(e)}")
-                        time.sleep(2)  # 等待2秒后重试
-                    else:
-                        raise
-            
-            # 下载完成
-            if success:
-                final_size = os.path.getsize(save_path)
-                logging.info(f"视频下载成功: {save_path} ({final_size} 字节)")
-                                
-               # 安全地隐藏进度条
-                try:
-                    if hasattr(self, 'download_progress_bar') and self.download_progress_bar is not None:
-                        logging.debug("调用QMetaObject.invokeMethod隐藏进度条")
-                        QMetaObject.invokeMethod(
-                            self.download_progress_bar, 
-                            "setVisible", 
-                            Qt.QueuedConnection, 
-                            Q_ARG(bool, False)
-                        )
-                        logging.debug("进度条隐藏调用成功")
-                except Exception as pb_error:
-                    logging.warning(f"隐藏进度条失败: {str(pb_error)}")
-                
-                # 显示成功消息
-                try:
-                    logging.debug("调用QMetaObject.invokeMethod显示成功消息")
-                    QMetaObject.invokeMethod(
-                        self, 
-                        "_show_download_success", 
-                        Qt.QueuedConnection,
-                        Q_ARG(str, save_path)
-                    )
-                    logging.debug("成功消息显示调用成功")
-                except Exception as show_error:
-                    logging.error(f"显示成功消息失败: {str(show_error)}")
-            
-        except requests.exceptions.HTTPError as e:
-            error_msg = f"HTTP错误: {str(e)}"
-            logging.error(f"下载视频失败 (HTTP错误): {task_id} - {error_msg}")
-            try:
-                logging.debug("调用QMetaObject.invokeMethod显示HTTP错误消息")
-                QMetaObject.invokeMethod(
-                    self, 
-                    "_show_download_error", 
-                    Qt.QueuedConnection,
-                    Q_ARG(str, error_msg)
-                )
-                logging.debug("HTTP错误消息显示调用成功")
-            except Exception as show_error:
-                logging.error(f"显示错误消息失败: {str(show_error)}")
-        except requests.exceptions.RequestException as e:
-            error_msg = f"网络请求失败: {str(e)}"
-            logging.error(f"下载视频失败 (网络错误): {task_id} - {error_msg}")
-            try:
-                logging.debug("调用QMetaObject.invokeMethod显示网络错误消息")
-                QMetaObject.invokeMethod(
-                    self, 
-                    "_show_download_error", 
-                    Qt.QueuedConnection,
-                    Q_ARG(str, error_msg)
-                )
-                logging.debug("网络错误消息显示调用成功")
-            except Exception as show_error:
-                logging.error(f"显示错误消息失败: {str(show_error)}")
-        except Exception as e:
-            error_msg = f"下载失败: {str(e)}"
-            logging.error(f"下载视频失败 (未知错误): {task_id} - {error_msg}")
-            try:
-                # 隐藏进度条
-                if hasattr(self, 'download_progress_bar') and self.download_progress_bar is not None:
-                    logging.debug("调用QMetaObject.invokeMethod隐藏进度条(错误处理)")
-                    QMetaObject.invokeMethod(
-                        self.download_progress_bar, 
-                        "setVisible", 
-                        Qt.QueuedConnection,
-                        Q_ARG(bool, False)
-                    )
-                    logging.debug("进度条隐藏调用成功(错误处理)")
-                # 显示错误消息
-                logging.debug("调用QMetaObject.invokeMethod显示未知错误消息")
-                QMetaObject.invokeMethod(
-                    self, 
-                    "_show_download_error", 
-                    Qt.QueuedConnection,
-                    Q_ARG(str, error_msg)
-                    )
-                logging.debug("未知错误消息显示调用成功")
-            except Exception as show_error:
-                logging.error(f"清理UI和显示错误消息失败: {str(show_error)}")
-        finally:
-            logging.debug("进入finally块，准备启用下载按钮")
-            # 安全地启用下载按钮
-            try:
-                if hasattr(self, 'download_btn') and self.download_btn is not None:
-                    logging.debug("调用QMetaObject.invokeMethod启用下载按钮")
-                    QMetaObject.invokeMethod(
-                        self.download_btn, 
-                        "setEnabled", 
-                        Qt.QueuedConnection,
-                        Q_ARG(bool, True)
-                    )
-                    logging.debug("下载按钮启用调用成功")
-                else:
-                    logging.warning("download_btn不存在")
-            except Exception as btn_error:
-                logging.warning(f"启用下载按钮失败: {str(btn_error)}")
-            logging.debug(f"[下载线程结束] 任务ID: {task_id}, 成功: {success if 'success' in locals() else False}")
+    def _on_download_updated(self, job):
+        """在主线程中更新下载队列里对应的一行"""
+        item = self._download_items.get(job.id)
+        if item is None:
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, job.id)
+            self.download_list.addItem(item)
+            self._download_items[job.id] = item
+        item.setText(self._format_download(job))
+        if job.state == 'completed':
+            item.setForeground(QColor('#2e7d32'))
+        elif job.state in ('failed', 'cancelled'):
+            item.setForeground(QColor('#c62828') if job.state == 'failed' else QColor('#757575'))
+        self._update_download_stats()
+        # 排队的进度信号送达时下载可能已经结束，结束提示只显示一次
+        if not job.finished or job.id in self._download_notified:
+            return
+        self._download_notified.add(job.id)
+        if job.state == 'completed':
+            if job.manual:
+                self._show_download_success(job.save_path)
+            else:
+                self.main_app.show_message(f"下载完成: {os.path.basename(job.save_path)}")
+        elif job.state == 'failed':
+            if job.manual:
+                self._show_download_error(f"下载失败: {job.error}")
+            else:
+                self.main_app.show_message(f"下载失败: {os.path.basename(job.save_path)}")
+    
+    @staticmethod
+    def _format_download(job):
+        kind = "手动" if job.manual else ("自动" if job.priority == DownloadManager.PRIORITY_AUTO else "批量")
+        text = f"[{kind}] {job.label}"
+        if job.state == 'queued':
+            return f"{text}  排队中"
+        if job.state == 'downloading':
+            size = f"{job.downloaded / 1048576:.1f}/{job.total / 1048576:.1f} MB" if job.total else f"{job.downloaded / 1048576:.1f} MB"
+            percent = f"{job.downloaded * 100 // job.total}%  " if job.total else ""
+            return f"{text}  {percent}{size}  {job.speed / 1048576:.2f} MB/s"
+        if job.state == 'completed':
+            return f"{text}  已完成 {job.downloaded / 1048576:.1f} MB"
+        if job.state == 'cancelled':
+            return f"{text}  已取消"
+        return f"{text}  失败: {job.error}"
+    
+    def _update_download_stats(self):
+        stats = self.download_manager.get_stats()
+        self.download_stats_label.setText(
+            f"下载中 {stats['active']} / 排队 {stats['queued']} / 完成 {stats['completed']}  "
+            f"当前 {stats['current_speed'] / 1048576:.2f} MB/s  平均 {stats['throughput'] / 1048576:.2f} MB/s"
+        )
+    
+    def cancel_selected_download(self):
+        """取消下载队列中选中的下载"""
+        item = self.download_list.currentItem()
+        if item is None:
+            QMessageBox.warning(self, "警告", "请先在下载队列中选择一个下载")
+            return
+        if not self.download_manager.cancel(item.data(Qt.UserRole)):
+            self.main_app.show_message("该下载已结束")
+    
+    def clear_finished_downloads(self):
+        """从下载队列中移除已结束的下载"""
+        for job_id in self.download_manager.clear_finished():
+            item = self._download_items.pop(job_id, None)
+            self._download_notified.discard(job_id)
+            if item is not None:
+                self.download_list.takeItem(self.download_list.row(item))
+        self._update_download_stats()
     
+    @pyqtSlot(str)
     def _show_download_success(self, save_path):
         """显示下载成功消息"""
-        self.download_btn.setEnabled(True)
-        # 隐藏进度条
-        self.download_progress_bar.setVisible(False)
         if hasattr(self.main_app, 'show_message'):
             self.main_app.show_message("下载完成")
         QMessageBox.information(self, "成功", f"视频已保存到:\n{save_path}")
     
+    @pyqtSlot(str)
     def _show_download_error(self, error_msg):
         """显示下载错误消息"""
-        self.download_btn.setEnabled(True)
-        # 隐藏进度条
-        self.download_progress_bar.setVisible(False)
         if hasattr(self.main_app, 'show_message'):
             self.main_app.show_message("下载失败")
         QMessageBox.critical(self, "错误", error_msg)
@@ -3147,13 +6664,13 @@ class TaskManagerTab(QWidget):
         """清除所有任务"""
         try:
             # 检查是否有任务可清除
-            if not hasattr(self, 'tasks') or len(self.tasks) == 0:
+            total_tasks = self.registry.count()
+            if total_tasks == 0:
                 QMessageBox.information(self, "提示", "任务列表已经为空")
                 logging.info("尝试清除空任务列表")
                 return
             
             # 显示确认对话框
-            total_tasks = len(self.tasks)
             reply = QMessageBox.question(
                 self, 
                 "确认清除", 
@@ -3165,16 +6682,13 @@ class TaskManagerTab(QWidget):
             if reply == QMessageBox.Yes:
                 logging.info(f"开始清除所有 {total_tasks} 个任务")
                 
-                # 清空任务列表
-                task_ids = [task.get('id', 'unknown')[:8] + '...' for task in self.tasks]
-                self.tasks.clear()
+                # 清空数据库中的任务和轮询队列
+                self.poll_scheduler.clear()
+                self.registry.clear()
                 
                 # 更新UI
                 self.update_task_list()
                 
-                # 保存清空后的任务列表
-                self.save_tasks()
-                
                 # 清空详情面板
                 self.task_id_label.setText("")
                 self.task_type_label.setText("")
@@ -3182,10 +6696,7 @@ class TaskManagerTab(QWidget):
                 self.task_prompt_label.setText("")
                 self.task_time_label.setText("")
                 
-                # 隐藏进度条
-                self.download_progress_bar.setVisible(False)
-                
-                logging.info(f"已成功清除所有任务: {', '.join(task_ids)}")
+                logging.info(f"已成功清除所有 {total_tasks} 个任务")
                 
                 # 显示成功消息
                 if hasattr(self.main_app, 'show_message'):
@@ -3219,7 +6730,7 @@ class TaskManagerTab(QWidget):
             
             # 生成默认文件名，添加序号前缀
             # 查找任务在列表中的索引（序号从1开始）
-            task_index = next((i for i, t in enumerate(self.tasks, 1) if t.get('id') == task_id), 0)
+            task_index = self.registry.seq_of(task_id)
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             default_filename = f"{task_index}_sora_{task_type}_{task_id[:8]}_{timestamp}.mp4"
             save_path = os.path.join(output_dir, default_filename)
@@ -3240,28 +6751,10 @@ class TaskManagerTab(QWidget):
                 logging.error(f"无法创建或访问保存目录: {str(e)}")
                 return
             
-            # 显示并重置进度条
-            self.download_progress_bar.setVisible(True)
-            self.download_progress_bar.setValue(0)
-            
-            # 禁用下载按钮以避免冲突
-            self.download_btn.setEnabled(False)
-            
-            # 在新线程中下载视频
-            thread = threading.Thread(
-                target=self._download_video_thread, 
-                args=(video_url, save_path, task_id)
-            )
-            thread.daemon = True
-            thread.start()
-            
-            logging.info(f"已启动自动下载线程: {task_id[:8]}...")
+            self.download_manager.submit(task_id, video_url, save_path, DownloadManager.PRIORITY_AUTO)
             
         except Exception as e:
             logging.error(f"自动下载任务 {task.get('id', 'unknown')[:8]}... 失败: {str(e)}")
-            # 确保下载按钮恢复可用
-            self.download_btn.setEnabled(True)
-            self.download_progress_bar.setVisible(False)
 
 class SettingsTab(QWidget):
     def __init__(self, parent=None):
@@ -3492,19 +6985,18 @@ class SettingsTab(QWidget):
         self.main_app.base_url = self.base_url_edit.text().strip()
         self.main_app.output_dir = self.output_dir_edit.text().strip()
         
-        # 更新生成器
-        self.main_app.generator = SoraVideoGenerator(self.main_app.api_key, self.main_app.base_url)
+        # 更新生成器，旧生成器在正在使用它的任务结束后释放连接池
+        self.main_app.replace_generator()
         
-        # 保存到配置文件
-        config = {
+        # 保存到配置文件，保留文件中已有的其他配置项（如network和endpoint_cache）
+        settings = {
             'api_key': self.main_app.api_key,
             'base_url': self.main_app.base_url,
-            'output_dir': self.main_app.output_dir
+            'output_dir': self.main_app.output_dir,
+            'network': self.main_app.network_config
         }
-        
         try:
-            with open('sora_app_config.json', 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            update_config_file(lambda config: config.update(settings))
         except Exception as e:
             logging.error(f"保存配置失败: {e}")
               
@@ -3695,7 +7187,9 @@ class SoraVideoApp(QMainWindow):
         self.api_key = ""
         self.base_url = "https://api.sora2.email"
         self.output_dir = ""
+        self.network_config = {}
         self.generator = None
+        self._generator_lock = threading.Lock()
         self.load_config()
         
         # 设置窗口图标
@@ -3820,19 +7314,29 @@ class SoraVideoApp(QMainWindow):
         # 添加状态信息标签
         self.status_label = QLabel()
         self.statusBar().addPermanentWidget(self.status_label)
+        
+        # 提交并发窗口标签，定时刷新
+        self.concurrency_label = QLabel()
+        self.statusBar().addPermanentWidget(self.concurrency_label)
+        if not hasattr(self, 'concurrency_timer'):
+            self.concurrency_timer = QTimer(self)
+            self.concurrency_timer.timeout.connect(self.update_concurrency_info)
+            self.concurrency_timer.start(1000)
         self.update_status_info()
+        self.update_concurrency_info()
 
     def load_config(self):
         try:
-            if os.path.exists('sora_app_config.json'):
-                with open('sora_app_config.json', 'r', encoding='utf-8') as f:
+            if os.path.exists(CONFIG_FILE):
+                with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
                     config = json.load(f)
                     self.api_key = config.get('api_key', '')
                     self.base_url = config.get('base_url', 'https://api.sora2.email')
                     self.output_dir = config.get('output_dir', '')
+                    self.network_config = config.get('network', {})
                     
                 if self.api_key:
-                    self.generator = SoraVideoGenerator(self.api_key, self.base_url)
+                    self.generator = SoraVideoGenerator(self.api_key, self.base_url, self.network_config)
         except Exception as e:
             logging.error(f"加载配置失败: {e}")
             
@@ -3985,6 +7489,41 @@ class SoraVideoApp(QMainWindow):
         else:
             self.status_label.setText("未配置API")
     
+    def get_generator(self):
+        """获取共享的API客户端并登记为使用者，用完必须调用generator.release()
+
+        多个工作线程同时调用时只创建一个实例。
+        """
+        with self._generator_lock:
+            if self.generator is None:
+                self.generator = SoraVideoGenerator(self.api_key, self.base_url, self.network_config)
+            return self.generator.acquire()
+
+    def replace_generator(self):
+        """按当前设置创建新的API客户端；旧实例等进行中的批量任务和轮询结束后再释放"""
+        with self._generator_lock:
+            old_generator = self.generator
+            self.generator = SoraVideoGenerator(self.api_key, self.base_url, self.network_config)
+        if old_generator:
+            old_generator.retire()
+
+    def update_concurrency_info(self):
+        """在状态栏显示自适应并发控制器的当前窗口"""
+        if not self.generator:
+            self.concurrency_label.setText("")
+            return
+        stats = self.generator.submit_controller.get_stats()
+        self.concurrency_label.setText(
+            f"提交并发: {stats['in_flight']}/{stats['window']:.1f}"
+        )
+        self.concurrency_label.setToolTip(
+            f"并发窗口上限: {stats['max_window']}\n"
+            f"p95延迟: {stats['p95_latency']:.1f}秒\n"
+            f"近期过载比例: {stats['error_rate']:.0%}"
+        )
+    
+    @pyqtSlot(str)
+    @pyqtSlot(str, int)
     def show_message(self, message, duration=3000):
         """显示临时消息"""
         self.statusBar().showMessage(message, duration)
@@ -4187,4 +7726,6 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
+    # 图片预处理使用进程池，打包成可执行文件时子进程需要这一行
+    multiprocessing.freeze_support()
     main()
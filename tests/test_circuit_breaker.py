@@ -0,0 +1,64 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("requests")
+pytest.importorskip("pandas")
+
+import sora
+
+
+class _NoopRateLimiter:
+    def acquire(self, kind):
+        pass
+
+    def observe(self, kind, status_code, headers):
+        return None
+
+
+class _RaisingHttp:
+    def __init__(self, error):
+        self.error = error
+
+    def request(self, method, url, **kwargs):
+        raise self.error
+
+
+def _open_breaker():
+    breaker = sora.CircuitBreaker('test', failure_threshold=1, reset_timeout=0.01)
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == sora.CircuitBreaker.OPEN
+    time.sleep(0.02)
+    return breaker
+
+
+def _fake_generator(breaker):
+    return SimpleNamespace(
+        http=None,
+        rate_limiter=_NoopRateLimiter(),
+        _breaker_for=lambda kind, url: breaker,
+    )
+
+
+@pytest.mark.parametrize("error", [OSError("读取本地文件失败"), sora.UploadCancelled("已取消")])
+def test_probe_released_when_request_raises_non_requests_error(error):
+    breaker = _open_breaker()
+    generator = _fake_generator(breaker)
+
+    with pytest.raises(type(error)):
+        sora.SoraVideoGenerator._send(generator, 'upload', 'POST', 'https://example.com/upload',
+                                      http=_RaisingHttp(error))
+
+    assert breaker.state == sora.CircuitBreaker.HALF_OPEN
+    # 探测名额已释放，下一次请求可以作为新的探测发出
+    breaker.before_request()
+
+
+def test_probe_still_exclusive_while_in_flight():
+    breaker = _open_breaker()
+    breaker.before_request()
+    with pytest.raises(sora.CircuitOpenError):
+        breaker.before_request()